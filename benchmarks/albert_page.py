@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Synthetic Albert class roster pages for benchmarks
+
+The markup imitates a saved "view photos in list" roster: a course header
+followed by one table row per student, padded with the decorative
+elements and unrelated ids PeopleSoft scatters around the data, with
+entity and character references where Albert has them.  write_roster
+saves a page together with its photos, as the browser would.
+"""
+import io
+import os
+import random
+
+HEADER = (u'<html><head><title>Class Roster</title></head><body>\n'
+    u'<div id="win0divDERIVED_SSR_FC_SSR_CLASSNAME_LONG">'
+    u'<span class="PALEVEL0SECONDARY" id="DERIVED_SSR_FC_SSR_CLASSNAME_LONG">%(code)s</span></div>\n'
+    u'<div id="win0divDERIVED_SSR_FC_SSS_PAGE_KEYDESCR2">'
+    u'<span class="PAPAGETITLE" id="DERIVED_SSR_FC_SSS_PAGE_KEYDESCR2">%(description)s</span></div>\n'
+    u'<span class="PSEDITBOX_DISPONLY" id="DERIVED_SSR_FC_DESCR254">%(name)s</span>\n'
+    u'<table class="PSLEVEL1GRIDWBO" id="MTG$scroll$0"><tr>'
+    u'<td><span id="MTG_SCHED$0">MoWe 9:30AM - 10:45AM</span></td>'
+    u'<td><span id="MTG_LOC$0">Warren Weaver Hall 102</span></td>'
+    u'<td><span id="MTG_INSTR$0">Staff</span></td>'
+    u'<td><span id="MTG_DATE$0">09/02/2014 - 12/19/2014</span></td></tr></table>\n'
+    u'<table class="PSLEVEL1GRIDWBO" id="CLASS_ROSTER_VW$scroll$0">\n')
+
+ROW = (u'<tr id="trCLASS_ROSTER_VW$0_row%(row)d">'
+    u'<td class="PSLEVEL1GRIDODDROW"><div id="win0divEMPL_PHOTO_EMPLOYEE_PHOTO$%(i)d">'
+    u'<img src="%(photo)s" alt="Photo" width="60" height="80" border="0"></div></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><div id="win0divCLASS_ROSTER_VW_EMPLID$%(i)d">'
+    u'<span class="PSEDITBOX_DISPONLY" id="CLASS_ROSTER_VW_EMPLID$%(i)d">N%(i)08d</span></div></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><div id="win0divHCR_PERSON_NM_I_NAME$%(i)d">'
+    u'<span class="PSEDITBOX_DISPONLY" id="HCR_PERSON_NM_I_NAME$%(i)d">%(last)s,%(first)s</span></div></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><div id="win0divDERIVED_SSSMAIL_EMAIL_ADDR$%(i)d">'
+    u'<a id="DERIVED_SSSMAIL_EMAIL_ADDR$%(i)d" class="PSHYPERLINK" href="mailto:%(email)s">%(email)s</a></div></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><span class="PSEDITBOX_DISPONLY" id="SCC_PREF_PHN_VW_PHONE$%(i)d">'
+    u'212/555-%(phone)04d</span></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><span class="PSEDITBOX_DISPONLY" id="PROGPLAN$%(i)d">'
+    u'%(program)s</span></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><span class="PSEDITBOX_DISPONLY" id="PROGPLAN1$%(i)d">%(level)s</span></td>'
+    u'<td class="PSLEVEL1GRIDODDROW"><span class="PSEDITBOX_DISPONLY" id="PSXLATITEM_XLATLONGNAME$%(i)d">'
+    u'%(status)s</span></td></tr>\n')
+
+FOOTER = u'</table>\n</body></html>\n'
+
+PROGRAMS = [u'College of Arts &amp; Science\nMathematics BA',
+    u'College of Arts &amp; Science\nEconomics BA',
+    u'Stern School of Business\nBusiness BS',
+    u'Tandon School of Engineering\nComputer Science BS']
+LEVELS = [u'Freshman',u'Sophomore',u'Junior',u'Senior']
+STATUSES = [u'Enrolled']*9 + [u'Dropped']
+
+PHOTO_DIRECTORY = u'SA_LEARNING_MANAGEMENT.SS_CLASS_ROSTER_files'
+
+
+def student_fields(i):
+    """
+    The fields of the *i*th synthetic student.
+    """
+    return {
+        'i'       : i,
+        'row'     : i + 1,
+        # every seventh name has an apostrophe, which Albert writes as a
+        # character reference
+        'last'    : (u'O&#39;Last%05d' if i % 7 == 0 else u'Last%05d') % i,
+        'first'   : u'First%d' % (i % 97),
+        'email'   : u'st%d@nyu.edu' % i,
+        'phone'   : i % 10000,
+        'program' : PROGRAMS[i % len(PROGRAMS)],
+        'level'   : LEVELS[i % len(LEVELS)],
+        'status'  : STATUSES[i % len(STATUSES)],
+        'photo'   : PHOTO_DIRECTORY + u'/photo%d.jpg' % i,
+    }
+
+
+def roster_page(count,code=u'MATH-UA 123-001',
+        description=u'Fall 2014 | Regular Academic Session | College of Arts and Science | Undergraduate',
+        name=u'Calculus III'):
+    """
+    Return the text of a roster page listing *count* students.
+    """
+    parts = [HEADER % {'code':code,'description':description,'name':name}]
+    parts.extend(ROW % student_fields(i) for i in range(count))
+    parts.append(FOOTER)
+    return u''.join(parts)
+
+
+def photo_data(i,size=4096,placeholder_every=4):
+    """
+    The JPEG bytes of the *i*th student's photo.  One student in every
+    *placeholder_every* has the same "no photo" image.
+    """
+    if placeholder_every and i % placeholder_every == 0:
+        i = -1
+    rng = random.Random(i)
+    body = bytearray(rng.getrandbits(8) for j in range(size))
+    return b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + bytes(body) + b'\xff\xd9'
+
+
+def write_roster(directory,count,name=u'SA_LEARNING_MANAGEMENT.SS_CLASS_ROSTER.html',**kwargs):
+    """
+    Save a roster page listing *count* students, and their photos, in
+    *directory*.  Return the page's file name.  Photo paths in the page
+    are relative to *directory*.
+    """
+    photos = os.path.join(directory,PHOTO_DIRECTORY)
+    if not os.path.isdir(photos):
+        os.makedirs(photos)
+    for i in range(count):
+        with open(os.path.join(photos,'photo%d.jpg' % i),'wb') as fh:
+            fh.write(photo_data(i))
+    filename = os.path.join(directory,name)
+    with io.open(filename,'w',encoding='utf-8') as fh:
+        fh.write(roster_page(count,**kwargs))
+    return filename
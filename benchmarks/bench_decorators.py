@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Cost of the debug decorators on a trivial function.
+
+Calls are timed with logging off (the usual case) and on, against the
+undecorated function and against decorators written the old way, which
+looked the logger up and formatted the result on every call.  With
+logging on, output goes to a handler that discards it.
+
+    python -m benchmarks.bench_decorators
+"""
+from __future__ import print_function
+
+import logging
+import timeit
+
+from plg.utils.decorators import debug_entry, debug_result
+
+CALLS = 100000
+
+
+def old_debug_entry(f):
+    def new_f(*args,**kwargs):
+        logger=logging.getLogger(f.__name__)
+        logger.debug("Entering: arguments=%s, keyword arguments=%s",args,kwargs)
+        return f(*args,**kwargs)
+    new_f.__name__ = f.__name__
+    return new_f
+
+
+def old_debug_result(f):
+    def new_f(*args,**kwargs):
+        logger=logging.getLogger(f.__name__)
+        result=f(*args,**kwargs)
+        logger.debug("Result: %s",repr(result))
+        return result
+    new_f.__name__ = f.__name__
+    return new_f
+
+
+def plain(x):
+    return x
+
+
+@old_debug_entry
+@old_debug_result
+def plain_old(x):
+    return x
+
+
+@debug_entry
+@debug_result
+def plain_new(x):
+    return x
+
+
+@debug_entry(sample=100)
+@debug_result(sample=100)
+def plain_sampled(x):
+    return x
+
+
+class NullHandler(logging.Handler):
+
+    def emit(self,record):
+        self.format(record)
+
+
+def main():
+    root = logging.getLogger()
+    root.addHandler(NullHandler())
+    functions = [('undecorated',plain),('old decorators',plain_old),
+        ('new decorators',plain_new),('new, 1 in 100',plain_sampled)]
+    print("%d calls of each" % CALLS)
+    for (level,label) in ((logging.WARNING,'logging off'),(logging.DEBUG,'logging on')):
+        root.setLevel(level)
+        for (name,f) in functions:
+            seconds = min(timeit.repeat(lambda: f(1),number=CALLS,repeat=3))
+            print("%-12s %-16s %7.3f s  %6.2f us/call" % (label,name,seconds,seconds / CALLS * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Memory footprint of the enrollment model at term scale.
+
+Reports the bytes each Student costs on top of its field values, for the
+slotted model classes and for a dict-backed class with the same fields
+(which is what the model classes used to be).  Run from the top of the
+source tree:
+
+    python -m benchmarks.bench_memory
+"""
+from __future__ import print_function
+
+import gc
+import sys
+
+from plg.model.enrollment import Student
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+class DictStudent:
+    """A dict-backed student, for comparison"""
+    def __init__(self,last_name,first_name,other_names=None,phone_number=None,email_address=None):
+        self.last_name = last_name
+        self.first_name = first_name
+        self.other_names = other_names
+        self.phone_number = phone_number
+        self.email_address = email_address
+
+
+def make_fields(count):
+    """
+    Field values for *count* students, built ahead of measurement so that
+    only the model objects themselves are counted.
+    """
+    return [('Last%d' % i,'First%d' % i,None,'212-555-%04d' % (i % 10000),
+        'st%d@nyu.edu' % i) for i in range(count)]
+
+
+def bytes_per_student(cls,fields):
+    """
+    Return the average number of bytes allocated per instance of *cls*.
+    """
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        students = [cls(*values) for values in fields]
+        (current,peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    else:
+        students = [cls(*values) for values in fields]
+        current = sys.getsizeof(students)
+        for student in students:
+            current += sys.getsizeof(student)
+            if hasattr(student,'__dict__'):
+                current += sys.getsizeof(student.__dict__)
+    return float(current) / len(students)
+
+
+def main():
+    for count in (10000,100000):
+        fields = make_fields(count)
+        for cls in (Student,DictStudent):
+            print("%-12s %7d students: %6.1f bytes/student" %
+                (cls.__name__,count,bytes_per_student(cls,fields)))
+
+
+if __name__ == "__main__":
+    main()
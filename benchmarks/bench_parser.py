@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Time the Albert roster parser engines on a synthetic 5,000-row page.
+
+    python -m benchmarks.bench_parser
+"""
+from __future__ import print_function
+
+import io
+import timeit
+
+from plg.albert import ENGINES
+from benchmarks.albert_page import roster_page
+
+ROWS = 5000
+REPEAT = 3
+
+
+def parse(engine,page):
+    return ENGINES[engine]().parse(io.StringIO(page))
+
+
+def main():
+    page = roster_page(ROWS)
+    results = dict((engine,parse(engine,page)) for engine in ENGINES)
+    assert results['fast'] == results['standard'], "engines disagree"
+    print("%d students, %d characters" % (ROWS,len(page)))
+    for engine in sorted(ENGINES):
+        seconds = min(timeit.repeat(lambda: parse(engine,page),repeat=REPEAT,number=1))
+        print("%-10s %7.3f s  %8.0f students/s" % (engine,seconds,ROWS / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Start-up time of the bin scripts.
+
+Each command runs REPEAT times in a fresh interpreter (the one running
+this benchmark), and the best and median wall times are reported, next to
+that of an interpreter doing nothing.  The enimport dry run builds no
+notes, so it needs neither the Evernote SDK nor the network.
+
+    python -m benchmarks.bench_startup
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPEAT = 10
+
+BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,'bin')
+
+
+def commands(directory):
+    csv = os.path.join(directory,'mfst.csv')
+    with open(csv,'w') as fh:
+        for i in range(20):
+            scan = os.path.join(directory,'quiz_%02d.pdf' % i)
+            with open(scan,'wb') as scan_fh:
+                scan_fh.write(b'%PDF-1.4\n' * 1000)
+            fh.write('%s,netid%d,Last%d__First_%d\n' % (scan,i,i,i))
+    return [
+        ('python (nothing)',['-c','pass']),
+        ('ps2vcard.py -h',[os.path.join(BIN,'ps2vcard.py'),'-h']),
+        ('ps2fields.py -h',[os.path.join(BIN,'ps2fields.py'),'-h']),
+        ('enimport.py -h',[os.path.join(BIN,'enimport.py'),'-h']),
+        ('enimport.py --dry-run',[os.path.join(BIN,'enimport.py'),'--dry-run',
+            '--docname','Quiz 1','--course','Calculus I',
+            '--guid-cache',os.path.join(directory,'guids.json'),csv]),
+    ]
+
+
+def run(args,cwd):
+    with open(os.devnull,'w') as devnull:
+        start = time.time()
+        status = subprocess.call([sys.executable] + args,cwd=cwd,stdout=devnull,stderr=devnull)
+        return (time.time() - start,status)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print("%d runs each with %s" % (REPEAT,sys.executable))
+        for (label,args) in commands(directory):
+            times = []
+            for i in range(REPEAT):
+                (seconds,status) = run(args,directory)
+                if status != 0:
+                    break
+                times.append(seconds)
+            if not times:
+                print("%-22s failed (exit status %d)" % (label,status))
+                continue
+            times.sort()
+            print("%-22s best %6.1f ms  median %6.1f ms" %
+                (label,times[0] * 1000,times[len(times) // 2] * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
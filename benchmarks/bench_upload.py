@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Throughput of enimport uploads against a FakeNoteStore.
+
+Each simulated createNote call takes LATENCY seconds, about one round trip
+to the service.  The second set of runs also imposes a rate limit.
+
+    python -m benchmarks.bench_upload
+"""
+from __future__ import print_function
+
+import logging
+import time
+
+from plg.enimport.fake import FakeNoteStore
+from plg.enimport.upload import Uploader
+
+NOTES = 300
+LATENCY = 0.02
+
+
+class Note(object):
+    """A stand-in for an Evernote note"""
+
+    def __init__(self,title):
+        self.title = title
+
+
+def run(workers,rate_limit=None,window=1.0):
+    store = FakeNoteStore(latency=LATENCY,rate_limit=rate_limit,window=window)
+    uploader = Uploader(lambda: store,build=Note,workers=workers)
+    start = time.time()
+    results = list(uploader.upload(['note %d' % i for i in range(NOTES)]))
+    seconds = time.time() - start
+    assert all(result.ok for result in results) and len(store.notes) == NOTES
+    return (seconds,store.calls)
+
+
+def main():
+    # rate limit warnings would swamp the report
+    logging.basicConfig(level=logging.ERROR)
+    print("%d notes, %g s per round trip" % (NOTES,LATENCY))
+    for (rate_limit,label) in ((None,'no rate limit'),(100,'100 notes/s limit')):
+        for workers in (1,4,8,16):
+            (seconds,calls) = run(workers,rate_limit)
+            print("%-18s %2d workers: %6.2f s  %6.1f notes/s  %d calls" %
+                (label,workers,seconds,NOTES / seconds,calls))
+
+
+if __name__ == "__main__":
+    main()
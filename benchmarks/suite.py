@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+The benchmark suite: timings of the main paths, kept for comparison.
+
+Each case runs REPEAT times on a synthetic roster saved with its photos
+(see albert_page), and its best time is kept.  The results are compared
+with those of the last run on the same Python version, and cases more
+than THRESHOLD slower are flagged, before the new results replace them.
+Cases whose optional dependency (vobject, the Evernote SDK) is missing
+are skipped.
+
+    python -m benchmarks.suite [--students N] [--results FILE] [--baseline FILE]
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+from benchmarks.albert_page import write_roster
+from plg.albert import ENGINES
+from plg.albert.diff import SyncState, fingerprint
+from plg.albert.ingest import student_from_record
+from plg.albert.photos import PhotoLoader
+from plg.enimport.batch import batches
+from plg.enimport.fake import FakeNoteStore
+from plg.enimport.plan import NotePlan
+from plg.enimport.scan import scan_file
+from plg.enimport.upload import Uploader
+from plg.model.enrollment import (AcademicSession, AcademicTerm, Course,
+    CourseOffering, CourseSection, Enrollment, Roster)
+from plg.vcard import VCardStreamWriter, student_card
+
+REPEAT = 5
+
+#: Slowdown beyond which a case is flagged
+THRESHOLD = 0.15
+
+#: Seconds each createNote takes in the enimport cases
+LATENCY = 0.002
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),'results')
+
+
+class Skip(Exception):
+    """A case cannot run here"""
+
+
+def default_results_file():
+    return os.path.join(RESULTS,'py%d%d.json' % sys.version_info[:2])
+
+
+class Fixture(object):
+    """
+    A roster page of *students* students, with photos and scans, in a
+    temporary directory, parsed once for the cases that start from records.
+    """
+
+    def __init__(self,students):
+        self.students = students
+        self.directory = tempfile.mkdtemp()
+        self.page = write_roster(self.directory,students)
+        (self.course,student_data) = ENGINES['fast']().parse(self.page)
+        self.records = [student_data[index] for index in sorted(student_data)]
+        for record in self.records:
+            record['photo'] = os.path.join(self.directory,record['photo'])
+        # one scan per student, four pages to a student in the batched case
+        self.rows = []
+        for (i,record) in enumerate(self.records):
+            filename = os.path.join(self.directory,'quiz_%05d.pdf' % i)
+            with open(filename,'wb') as fh:
+                fh.write(b'%PDF-1.4\n' + os.urandom(16 * 1024))
+            (last,first) = record['name'].split(',')
+            self.rows.append((filename,'netid%d' % (i // 4),'%s__%s' % (last,first.replace(' ','_'))))
+
+    def close(self):
+        shutil.rmtree(self.directory)
+
+
+def parse_standard(fixture):
+    ENGINES['standard']().parse(fixture.page)
+
+
+def parse_fast(fixture):
+    ENGINES['fast']().parse(fixture.page)
+
+
+def roster_index(fixture):
+    roster = Roster(students=[student_from_record(record) for record in fixture.records])
+    roster.add_index('student_id')
+    roster.add_index(('last_name','first_name'))
+    fixture.roster = roster
+
+
+def roster_lookup(fixture):
+    roster = getattr(fixture,'roster',None)
+    if roster is None:
+        roster_index(fixture)
+        roster = fixture.roster
+    for record in fixture.records:
+        roster.lookup_student('student_id',record['id'])
+
+
+def roster_class_list(fixture):
+    roster = getattr(fixture,'roster',None)
+    if roster is None:
+        roster_index(fixture)
+        roster = fixture.roster
+    roster.class_list()
+
+
+#: Sections in the enrollment cases, each student taking SECTIONS_PER_STUDENT
+SECTIONS = 300
+SECTIONS_PER_STUDENT = 4
+
+
+def enrollment_index(fixture):
+    session = AcademicSession(AcademicTerm('Fall',2014),None,None,'Regular Academic Session')
+    sections = [CourseSection(CourseOffering(Course('MATH-UA %d' % n,None),session),'001')
+        for n in range(SECTIONS)]
+    enrollment = Enrollment()
+    for (i,record) in enumerate(fixture.records):
+        student = student_from_record(record)
+        for k in range(SECTIONS_PER_STUDENT):
+            enrollment.enroll(sections[(i + 7 * k) % SECTIONS],student)
+    fixture.enrollment = enrollment
+
+
+def enrollment_queries(fixture):
+    enrollment = getattr(fixture,'enrollment',None)
+    if enrollment is None:
+        enrollment_index(fixture)
+        enrollment = fixture.enrollment
+    sections = enrollment.sections
+    for (a,b) in zip(sections,sections[1:] + sections[:1]):
+        enrollment.students_in_all(a,b)
+        enrollment.students_only_in(a,b)
+    for student in enrollment.students:
+        enrollment.sections_of(student)
+    enrollment.students_in_any(*sections)
+
+
+def vcards(fixture):
+    try:
+        import vobject
+    except ImportError:
+        raise Skip('vobject is not installed')
+    buf = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+    with PhotoLoader() as photos:
+        with VCardStreamWriter(buf) as writer:
+            for (record,photo) in photos.prefetched(fixture.records):
+                writer.write(student_card(record,'College of Arts and Science',
+                    fixture.course['code'] + ', Fall 2014',photo))
+
+
+#: Students changed between runs in the vcard.resync case
+RESYNC_CHANGES = 5
+
+
+def vcards_resync(fixture):
+    """
+    The cards of a nightly resync: the last run's fingerprints are known,
+    and RESYNC_CHANGES students have changed since.  Every photo is read,
+    as photos count in the fingerprints.
+    """
+    try:
+        import vobject
+    except ImportError:
+        raise Skip('vobject is not installed')
+    org = 'College of Arts and Science'
+    label = fixture.course['code'] + ', Fall 2014'
+    def key(record,photo):
+        return fingerprint(dict(record,photo=photo.digest if photo is not None else None),org,label)
+    if not hasattr(fixture,'sync_records'):
+        with PhotoLoader() as photos:
+            fixture.sync_previous = dict((record['id'],[key(record,photo),record['name']])
+                for (record,photo) in photos.prefetched(fixture.records))
+        step = max(len(fixture.records) // RESYNC_CHANGES,1)
+        fixture.sync_records = [dict(record,email='changed.' + record['email']) if i % step == 0 else record
+            for (i,record) in enumerate(fixture.records)]
+    sync = SyncState(None,fixture.sync_previous)
+    buf = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+    with PhotoLoader() as photos:
+        with VCardStreamWriter(buf) as writer:
+            for (record,photo) in photos.prefetched(fixture.sync_records):
+                if sync.update(record['id'],key(record,photo),record['name']):
+                    writer.write(student_card(record,org,label,photo))
+
+
+def _upload(fixture,group_by_student):
+    try:
+        import evernote.edam.type.ttypes
+    except ImportError:
+        raise Skip('the Evernote SDK is not installed')
+    scan_file.cache_clear()
+    plan = NotePlan('notebook-guid','Quiz 1','Calculus I','Fall 2014',tags=['quiz'])
+    jobs = [(row,scan_file(row[0])) for row in fixture.rows]
+    if group_by_student:
+        jobs = batches(jobs,key=lambda row: row[1])
+    else:
+        jobs = batches(jobs)
+    store = FakeNoteStore(latency=LATENCY)
+    uploader = Uploader(lambda: store,build=plan.build_note,workers=4)
+    for result in uploader.upload(jobs):
+        assert result.ok, result.error
+
+
+def enimport_notes(fixture):
+    _upload(fixture,False)
+
+
+def enimport_batched(fixture):
+    _upload(fixture,True)
+
+
+CASES = [
+    ('parser.standard',parse_standard),
+    ('parser.fast',parse_fast),
+    ('roster.add_index',roster_index),
+    ('roster.lookup_student',roster_lookup),
+    ('roster.class_list',roster_class_list),
+    ('enrollment.index',enrollment_index),
+    ('enrollment.queries',enrollment_queries),
+    ('vcard.generate',vcards),
+    ('vcard.resync',vcards_resync),
+    ('enimport.notes',enimport_notes),
+    ('enimport.notes_batched',enimport_batched),
+]
+
+
+def run(students,cases=CASES):
+    """
+    Return {case: best seconds} and the cases skipped, with their reasons.
+    """
+    fixture = Fixture(students)
+    timings = {}
+    skipped = {}
+    try:
+        for (name,case) in cases:
+            try:
+                timings[name] = min(timeit.repeat(lambda: case(fixture),repeat=REPEAT,number=1))
+            except Skip as e:
+                skipped[name] = str(e)
+    finally:
+        fixture.close()
+    return (timings,skipped)
+
+
+def load(filename):
+    try:
+        with open(filename) as fh:
+            return json.load(fh)
+    except (IOError,OSError,ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students',help='students on the roster (default: 2000)',
+        type=int,default=2000)
+    parser.add_argument('--results',help='save the results to FILE (default: %s)' % default_results_file(),
+        metavar='FILE',default=default_results_file())
+    parser.add_argument('--baseline',help='compare with the results in FILE (default: the results file)',
+        metavar='FILE',default=None)
+    parser.add_argument('--no-save',help='do not save the results',
+        action='store_false',dest='save',default=True)
+    args = parser.parse_args()
+
+    baseline = load(args.baseline or args.results)
+    if baseline is not None and baseline.get('students') != args.students:
+        print("Baseline is for %s students, not comparing" % baseline.get('students'))
+        baseline = None
+    (timings,skipped) = run(args.students)
+
+    print("%d students, Python %s" % (args.students,platform.python_version()))
+    regressions = 0
+    for (name,case) in CASES:
+        if name in skipped:
+            print("%-24s skipped: %s" % (name,skipped[name]))
+            continue
+        line = "%-24s %9.4f s" % (name,timings[name])
+        before = baseline and baseline['timings'].get(name)
+        if before:
+            change = timings[name] / before - 1
+            line += "  %+6.1f%%" % (change * 100)
+            if change > THRESHOLD:
+                line += "  SLOWER"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        directory = os.path.dirname(args.results)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(args.results,'w') as fh:
+            json.dump({'students': args.students,'python': platform.python_version(),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),'timings': timings},
+                fh,indent=1,sort_keys=True)
+        print("Saved to %s" % args.results)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,33 +12,31 @@
 #
 # will import into Evernote all the specified files
 
-import hashlib
-import binascii
-import evernote.edam.userstore.constants as UserStoreConstants
-import evernote.edam.type.ttypes as Types
-from evernote.api.client import EvernoteClient
+# The Evernote SDK, dateutil and ConfigParser are imported where they are
+# first needed, so that -h and --dry-run start quickly and work offline.
 import argparse
-import ConfigParser
+import atexit
 import logging
 import csv
+import os
 import sys
-import mimetypes
-import dateutil.parser          # sudo port -v install py27-dateutil
-from dateutil.tz import *
-from datetime import datetime, timedelta
-import time
-
-def toTimestamp(dt, epoch=datetime.fromtimestamp(0,tzutc())):
-	""" 
-	convert a datetime object to a unix timestamp 
-
-	See http://stackoverflow.com/a/8778548/297797
-	"""
-	logging.debug("epoch: %s",repr(epoch))
-	td = dt - epoch
-	# return td.total_seconds()
-	return (td.microseconds + (td.seconds + td.days * 24 * 3600) * 10**6) / 1e6 
 
+try:
+	from plg.enimport.upload import Uploader
+	from plg.enimport.batch import batches
+	from plg.enimport.manifest import UploadManifest
+	from plg.enimport.scan import RESOURCE_SIZE_MAX, oversized, scan_file
+	from plg.enimport.plan import GuidCache, NotePlan, default_cache_file, resolve_notebook, timestamp
+	from plg.utils import timing
+except ImportError:
+	# running from a source checkout
+	sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+	from plg.enimport.upload import Uploader
+	from plg.enimport.batch import batches
+	from plg.enimport.manifest import UploadManifest
+	from plg.enimport.scan import RESOURCE_SIZE_MAX, oversized, scan_file
+	from plg.enimport.plan import GuidCache, NotePlan, default_cache_file, resolve_notebook, timestamp
+	from plg.utils import timing
 
 # Parse any conf_file specification
 # We make this parser with add_help=False so that
@@ -55,10 +53,11 @@ conf_parser.add_argument("-c", "--conf",
 					default="enimport.rc")
 args, remaining_argv = conf_parser.parse_known_args()
 
-if args.conf:
+if args.conf and os.path.exists(args.conf):
+	import ConfigParser
 	config = ConfigParser.SafeConfigParser()
 	config.read([args.conf])
-	defaults = dict(config.items("defaults"))
+	defaults = dict(config.items("defaults")) if config.has_section("defaults") else { }
 else:
 	defaults = { }
 # Parse rest of arguments
@@ -79,7 +78,7 @@ parser.add_argument('-v','--verbose',
     action="store_const",dest="loglevel",const=logging.INFO
 )
 parser.add_argument('--dry-run',
-	help='do not save any notes',
+	help='do not save any notes, or connect to Evernote at all',
 	action='store_true',dest='dry_run')
 parser.add_argument('--auth-token',
 	help='authentication token (visit https://sandbox.evernote.com/api/DeveloperToken.action)',
@@ -111,157 +110,171 @@ parser.add_argument('--term',
 parser.add_argument('--tag',metavar='TAG',
 	help='Add tag to note (as many as you like)',
 	action='append',dest='tags')
+parser.add_argument('-j','--jobs',
+	help='upload this many notes at a time (default: 4)',
+	action='store',dest='jobs',type=int,default=4)
+parser.add_argument('--retries',
+	help='retry a failed upload this many times (default: 3)',
+	action='store',dest='retries',type=int,default=3)
+parser.add_argument('--max-size',metavar='BYTES',
+	help='refuse files bigger than this, and keep grouped notes under it (default: %d, the limit for free accounts)' % RESOURCE_SIZE_MAX,
+	action='store',dest='max_size',type=int,default=RESOURCE_SIZE_MAX)
+parser.add_argument('--group-by',
+	help='put the files of each row in a note of its own (the default), or all of a student\'s files in one note',
+	action='store',dest='group_by',choices=['row','student'],default='row')
+parser.add_argument('--group-size',metavar='N',
+	help='with --group-by, put at most N files in a note',
+	action='store',dest='group_size',type=int)
+parser.add_argument('--manifest',metavar='FILE',
+	help='record uploads in FILE and skip files already uploaded (default: enimport.manifest)',
+	action='store',dest='manifest',default='enimport.manifest')
+parser.add_argument('--no-manifest',
+	help='upload every file, whether or not it has been already',
+	action='store_const',dest='manifest',const=None)
+parser.add_argument('--guid-cache',metavar='FILE',
+	help='remember notebook and tag GUIDs in FILE (default: %s)' % default_cache_file(),
+	action='store',dest='guid_cache',default=default_cache_file())
+parser.add_argument('--refresh-guids',
+	help='look notebook and tag GUIDs up again, e.g. after renaming one',
+	action='store_true',dest='refresh_guids')
+parser.add_argument('--profile',
+	help='time each stage of the run, and print a report on standard error',
+	action='store_true',dest='profile')
+parser.add_argument('--profile-json',metavar='FILE',
+	help='time each stage of the run, and write the timings to FILE as JSON',
+	action='store',dest='profile_json')
 parser.add_argument('csvfile', nargs='?', 
 	help="CSV file from which to read (default: standard input)",
 	type=argparse.FileType('r'),default=sys.stdin)	
 	
 args = parser.parse_args(remaining_argv)    
 logging.basicConfig(level=args.loglevel)
+if args.profile or args.profile_json:
+	timing.registry.enable()
+if args.profile:
+	atexit.register(timing.registry.write,'-')
+if args.profile_json:
+	atexit.register(timing.registry.write,args.profile_json)
 
-if not(args.auth_token):
-    logging.error("Please fill in your developer token. To get a developer token, visit https://sandbox.evernote.com/api/DeveloperToken.action")
-    exit(1)
-client = EvernoteClient(token=args.auth_token, sandbox=args.sandbox)
-user_store = client.get_user_store()
-version_ok = user_store.checkVersion(
-    "Evernote EDAMTest (Python)",
-    UserStoreConstants.EDAM_VERSION_MAJOR,
-    UserStoreConstants.EDAM_VERSION_MINOR
-)
-if (version_ok):
-	logging.debug("Evernote API version up to date: %d",version_ok)
-else:
-	logging.error("Evernote API version NOT up to date")
-	exit(1)
-
-note_store = client.get_note_store()
-
-## get the right notebook
-if (args.notebook):
-	logging.debug("Searching for notebook named '%s'",args.notebook)
-	notebooks = note_store.listNotebooks()
-	found=False
-	for notebook in notebooks:
-		logging.debug("Notebook: name='%s' guid=%s", notebook.name, notebook.guid)
-		if (notebook.name == args.notebook):
-			logging.debug("match")
-			found=True
-			break
-	if (not(found)):
-		logging.error("Notebook named '%s' not found", args.notebook)
-else:
-	logging.debug("Using default notebook")
-	notebook = note_store.getDefaultNotebook()
-logging.info("Using Notebook '%s' with guid %s", notebook.name, notebook.guid)
-
+# check that the first field of each record is a file (it might be a header)
+recs = []
 for rec in csv.reader(args.csvfile):
 	logging.debug("rec: %s", repr(rec))
-	filename,student_netid,student_fname_rev = rec
-	# check if the first field is a valid file (it might be a header)
-	try:
-		file = open(filename, 'rb').read()
-	except IOError:
-		logging.info("Skipping %s as it does not seem to be a file",filename)
+	if not rec or not os.path.isfile(rec[0]):
+		logging.info("Skipping %s as it does not seem to be a file",",".join(rec))
 		continue
+	recs.append(rec)
 
-	student_lname,student_gnames=student_fname_rev.split('__')
-	student_gnames = student_gnames.replace('_',' ')
-	student_fname = "%s %s" % (student_gnames,student_lname)
-	logging.debug("student_fname: '%s'",student_fname)
-	student_tagname="student: %s; %s <%s@nyu.edu>" % (student_lname, student_gnames, student_netid)
-	logging.debug("student_tagname: '%s'",student_tagname)
+# size every file up front, so that nothing is uploaded (or even hashed)
+# if any file is too big
+too_big = oversized([rec[0] for rec in recs],args.max_size)
+for (filename,size) in too_big:
+	logging.error("%s is %d bytes, more than the limit of %d", filename, size, args.max_size)
+if too_big:
+	exit(1)
+scans = [scan_file(rec[0]) for rec in recs]
 
-	# To create a new note, simply create a new Note object and fill in
-	# attributes such as the note's title.
-	note = Types.Note()
-	note.notebookGuid=notebook.guid
-	note.title = "%s for %s from %s" % (args.doc_name,student_fname,args.course)
-	note.tagNames=list(args.tags)
-	note.tagNames.append('student work')
-	note.tagNames.append(student_tagname)
-	if (args.term):
-		note.title += ", " + args.term
-		note.tagNames.append('term: ' + args.term)
-	note.tagNames.append('course: ' + args.course)
-	logging.info("note.title: '%s'", note.title)
-	logging.info("note.tags: %s",repr(note.tagNames))
-	## TODO: add some more note attributes
-	# created - exam date/time (Timestamp) # parse ISO 8601!
-	currentTime = time.time() * 1000
-	if (args.doc_date):
-		createdDate = dateutil.parser.parse(args.doc_date)
-		logging.debug("createdDate: %s",repr(createdDate))
-		createdTimestamp = toTimestamp(createdDate)
-		note.created =  createdTimestamp * 1000
-		logging.info("note.created: %d",note.created)
+# connect to Evernote, unless this is a dry run
+if args.dry_run:
+	note_store = None
+else:
+	if not(args.auth_token):
+	    logging.error("Please fill in your developer token. To get a developer token, visit https://sandbox.evernote.com/api/DeveloperToken.action")
+	    exit(1)
+	import evernote.edam.userstore.constants as UserStoreConstants
+	from evernote.api.client import EvernoteClient
+	client = EvernoteClient(token=args.auth_token, sandbox=args.sandbox)
+	user_store = client.get_user_store()
+	version_ok = user_store.checkVersion(
+	    "Evernote EDAMTest (Python)",
+	    UserStoreConstants.EDAM_VERSION_MAJOR,
+	    UserStoreConstants.EDAM_VERSION_MINOR
+	)
+	if (version_ok):
+		logging.debug("Evernote API version up to date: %d",version_ok)
 	else:
-		note.created=currentTime
-		logging.info("note.created: %d (now)",note.created)
-	# updated - now, obvs (Timestamp)
-	note.updated=currentTime
-	logging.info("note.updated: %d (now)",note.updated)
-	## TODO: add some more attributes with the NoteAttributes type
-	# https://dev.evernote.com/doc/reference/Types.html#Struct_NoteAttributes
-	# latitude
-	# longitude
-	# altitude
-	# author - student <email>
-	# source - progname
-	# placeName - "CIMS"? "Work"?
-
+		logging.error("Evernote API version NOT up to date")
+		exit(1)
 
-	# To include an attachment such as an image in a note, first create a Resource
-	# for the attachment. At a minimum, the Resource contains the binary attachment
-	# data, an MD5 hash of the binary data, and the attachment MIME type.
-	# It can also include attributes such as filename and location.
-	md5 = hashlib.md5()
-	md5.update(file)
-	hash = md5.digest()
-	logging.debug("hash: %s", hash)
-
-	data = Types.Data()
-	data.size = len(file)
-	data.bodyHash = hash
-	data.body = file
-
-	resource = Types.Resource()
-	(resource.mime,encoding) = mimetypes.guess_type(filename)
-	logging.debug("resource.mime: %s",resource.mime)
-	resource.data = data
-	
-	# adding a file name to the resource with a ResourceAttributes type.
-	resource_attributes=Types.ResourceAttributes()
-	resource_attributes.fileName=note.title + mimetypes.guess_extension(resource.mime)
-	resource.attributes=resource_attributes
-	
-	# Now, add the new Resource to the note's list of resources
-	note.resources = [resource]
-	
-	# To display the Resource as part of the note's content, include an <en-media>
-	# tag in the note's ENML content. The en-media tag identifies the corresponding
-	# Resource using the MD5 hash.
-	hash_hex = binascii.hexlify(hash)
-
-	# The content of an Evernote note is represented using Evernote Markup Language
-	# (ENML). The full ENML specification can be found in the Evernote API Overview
-	# at http://dev.evernote.com/documentation/cloud/chapters/ENML.php
-	note.content = '<?xml version="1.0" encoding="UTF-8"?>'
-	note.content += '<!DOCTYPE en-note SYSTEM ' \
-		'"http://xml.evernote.com/pub/enml2.dtd">'
-	note.content += '<en-note>'
-	note.content += '<en-media type="' + resource.mime + '" hash="' + hash_hex + '"/>'
-	note.content += '</en-note>'
-
-	# Finally, send the new note to Evernote using the createNote method
-	# The new Note object that is returned will contain server-generated
-	# attributes such as the new note's unique GUID.
-	if (args.dry_run):
-		logging.info("If this were not a dry run, would save a note here")
-	else:
-		logging.info("Adding note to note_store")
-		created_note = note_store.createNote(note)
-		logging.info("Successfully created a new note with GUID: %s", created_note.guid)
+	note_store = client.get_note_store()
 
+## work out what every note shares: notebook, tags, title and dates
+guids = GuidCache(args.guid_cache,(args.auth_token or '') + ('@sandbox' if args.sandbox else ''))
+if args.refresh_guids:
+	guids.clear()
+if note_store is None:
+	# offline, so make do with what earlier runs found out, if anything
+	notebook_guid = guids.get('notebooks',args.notebook or '')
+else:
+	try:
+		notebook_guid = resolve_notebook(note_store,args.notebook,guids)
+	except KeyError:
+		logging.error("Notebook named '%s' not found", args.notebook)
+		exit(1)
+logging.info("Using Notebook '%s' with guid %s", args.notebook or '(default)', notebook_guid)
+if (args.doc_date):
+	import dateutil.parser          # sudo port -v install py27-dateutil
+	created = timestamp(dateutil.parser.parse(args.doc_date))
+	logging.info("note.created: %d",created)
+else:
+	created = None
+plan = NotePlan(notebook_guid,args.doc_name,args.course,args.term,args.tags or (),created=created)
+if note_store is not None:
+	plan.resolve_tags(note_store,guids)
+	guids.save()
+logging.info("note.tagGuids: %s",repr(plan.tag_guids))
+logging.info("note.tagNames: %s",repr(plan.tag_names))
 
+# skip files that earlier runs have already put in this notebook for the same student
+if args.manifest and os.path.exists(args.manifest):
+	# a dry run only reads it
+	manifest = UploadManifest(args.manifest,readonly=args.dry_run)
+elif args.manifest and not args.dry_run:
+	manifest = UploadManifest(args.manifest)
+else:
+	manifest = None
+jobs = []
+for (rec,scanned) in zip(recs,scans):
+	if manifest is not None and plan.notebook_guid is not None:
+		guid = manifest.lookup(scanned.hexdigest,plan.notebook_guid,rec[1])
+		if guid is not None:
+			logging.info("Skipping %s as it is already in note %s", rec[0], guid)
+			continue
+	jobs.append((rec,scanned))
+if len(jobs) < len(recs):
+	logging.info("%d of %d files already uploaded", len(recs) - len(jobs), len(recs))
 
+# one note per batch
+if args.group_by == 'student':
+	jobs = batches(jobs,key=lambda rec: rec[1],max_size=args.max_size,max_count=args.group_size)
+else:
+	jobs = batches(jobs)
+logging.info("%d files in %d notes", sum(len(batch) for batch in jobs), len(jobs))
 
+if (args.dry_run):
+	# notes are not built, so the Evernote SDK is not needed
+	for batch in jobs:
+		logging.info("Would create note '%s' with %s, tagged %s",plan.record_title(batch[0][0]),
+			", ".join(rec[0] for (rec,scanned) in batch),", ".join(plan.tag_names + [plan.record_tag(batch[0][0])]))
+else:
+	# Finally, send the new notes to Evernote using the createNote method,
+	# several at a time.  The new Note object that is returned will contain
+	# server-generated attributes such as the new note's unique GUID.
+	uploader = Uploader(client.get_note_store,build=plan.build_note,recover=plan.find_note,
+		workers=args.jobs,max_retries=args.retries)
+	failed = 0
+	for result in uploader.upload(jobs):
+		filenames = ", ".join(rec[0] for (rec,scanned) in result.item)
+		if result.ok:
+			logging.info("Successfully created a new note with GUID: %s", result.note.guid)
+			if manifest is not None:
+				# committed at once, so a later run resumes from here
+				for (rec,scanned) in result.item:
+					manifest.record(scanned.hexdigest,plan.notebook_guid,result.note.guid,rec[0],result.note.title,
+						student=rec[1])
+		else:
+			failed += 1
+			logging.error("Could not create a note for %s: %s", filenames, result.error)
+	if failed:
+		logging.error("%d of %d notes were not created", failed, len(jobs))
+		exit(1)
@@ -2,6 +2,12 @@
 """
 Process a roster downloaded from Albert and generate a list of fields for an Acrobat combo box.
 
+By default the combo box options are printed.  Any of --combo, --fdf, --xfdf
+and --json (each given a file name, or - for standard output) can be given
+together, and all of them are written in one pass over the roster.  FDF sets
+the options of a combo box; XFDF, which cannot, fills a text field for each
+student (FIELD.0, FIELD.1, ..., for --field-name FIELD).
+
 To create the source file:
 
   * login to Albert, choose a course, and select "class roster"
@@ -16,121 +22,20 @@ Then run this script on that file.
 
 """
 
-from HTMLParser import HTMLParser
-from htmlentitydefs import entitydefs
-import re
-import vobject # http://vobject.skyhouseconsulting.com/
-
+# Only what the argument parser needs is imported up front; the rest is
+# imported once the arguments are parsed, so that -h answers quickly.
+import atexit
 import logging
 import argparse
+import os
+import sys
 
-class AlbertHTMLParser(HTMLParser,object):
-	student_keys_dict={
-		'CLASS_ROSTER_VW_EMPLID'     : 'id',
-		'HCR_PERSON_NM_I_NAME'       : 'name',
-		'DERIVED_SSSMAIL_EMAIL_ADDR' : 'email',
-		'SCC_PREF_PHN_VW_PHONE'      : 'phone',
-		'PROGPLAN'                   : 'progplan',
-		'PROGPLAN1'                  : 'level',
-		'PSXLATITEM_XLATLONGNAME'    : 'status'
-	}
-	course_keys_dict={
-		'DERIVED_SSR_FC_SSR_CLASSNAME_LONG' : 'code',
-		'DERIVED_SSR_FC_SSS_PAGE_KEYDESCR2' : 'description',
-		'DERIVED_SSR_FC_DESCR254'           : 'name',
-		'MTG_INSTR$0'                       : 'instructor',
-		'MTG_SCHED$0'                       : 'schedule',
-		'MTG_LOC$0'                         : 'room',
-		'MTG_DATE$0'                        : 'dates'
-	}
-
-	def __init__(self):
-		HTMLParser.__init__(self)
-		self.course_data={}
-		self.student_data={}
-		# parsing state variables
-		self.current_key=""
-		self.current_index=0
-		self.data=""
-		self.state='SEEKING_ID'
-		self.data_dest=''
-
-	def handle_starttag(self,tag,attrs):
-		for attr in attrs:
-			(name,value) = attr
-			if name == 'id':
-				logging.debug("parsing id %s" % value)
-				match=re.match("([^$]*)\$(\d+)$",value)
-				if (value in self.course_keys_dict):
-					logging.debug("key %s is in course dictionary",value)
-					self.current_key=self.course_keys_dict[value]
-					self.state='SEEKING_DATA'
-					self.data_dest='COURSE'
-				elif match:
-					(key,index)=match.group(1,2)
-					logging.debug("key=%s",key)
-					if (key in self.student_keys_dict):
-						logging.debug("key %s is in student dictionary",key)
-						self.current_key=self.student_keys_dict[key]
-						self.current_index=int(index)
-						self.state='SEEKING_DATA'
-						self.data_dest='STUDENT'
-					elif key == 'win0divEMPL_PHOTO_EMPLOYEE_PHOTO':
-						self.current_index=int(index)
-						self.state='SEEKING_STUDENT_IMG'
-					else:
-						logging.debug("ignoring key %s",key)
-				else:
-					logging.debug("id doesn't match, moving on")
-		if (tag == 'img' and self.state=='SEEKING_STUDENT_IMG'):
-			for attr in attrs:
-				(name,value)=attr
-				if name=='src':
-					try:
-						self.student_data[self.current_index]
-					except KeyError:
-						self.student_data[self.current_index] = {}
-					self.student_data[self.current_index]['photo'] = value
-			self.current_index=0					
-			self.state='SEEKING_ID'
-	
-	def handle_data(self,data):
-		if self.state == 'SEEKING_DATA':
-			self.data += data
-	
-	def handle_charref(self,name):
-		logging.debug("character ref: %s",name)
-		
-	def handle_entityref(self,name):
-		# logging.debug("entity ref: %s",name)
-		if (self.state == 'SEEKING_DATA'):
-			if (name in entitydefs):
-				self.data += entitydefs[name]
-			
-	def handle_endtag(self,tag):
-		if self.state == 'SEEKING_DATA':
-			# we're done
-			if self.data_dest=='STUDENT':
-				logging.debug("self.current_key=%s, self.current_index=%d",self.current_key,self.current_index)
-				try:
-					self.student_data[self.current_index]
-				except KeyError:
-					self.student_data[self.current_index] = {}
-				self.student_data[self.current_index][self.current_key] = self.data
-			elif self.data_dest=='COURSE':
-				self.course_data[self.current_key] = self.data
-			else:
-				logging.error("Unknown data destination %s",self.data_dest)
-			self.current_index=0
-			self.current_key=""
-			self.data=""
-			self.data_dest=''
-			self.state='SEEKING_ID'
-			
-	def parse(self,file):
-		data = open(file, 'r').read()
-		self.feed(data)
-		return (self.course_data,self.student_data)
+try:
+	from plg.albert import ENGINES
+except ImportError:
+	# running from a source checkout
+	sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+	from plg.albert import ENGINES
 
 argparser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawTextHelpFormatter)
 argparser.add_argument('--verbose',help='be verbose',
@@ -139,36 +44,90 @@ argparser.add_argument('--verbose',help='be verbose',
 argparser.add_argument('--debug',help='show debugging statements',
                     action='store_const',const=logging.DEBUG,dest='debug_level',
                     default=logging.WARNING)
-argparser.add_argument('file',help='HTML file downloaded from Albert',
-					action='store',
-					default='Self Service Class Roster.html')
+argparser.add_argument('files',help='HTML files downloaded from Albert',
+					action='store',nargs='+',metavar='file')
+argparser.add_argument('--jobs',help='parse files with this many processes (default: one per CPU)',
+					action='store',dest='jobs',type=int,default=None)
 argparser.add_argument('--save',help='save vCards',
 					action='store_const',const=True,dest='save',default=False)
 argparser.add_argument('--print',help='pretty-print vCards',
 					action='store_const',const=True,dest='bprint',default=True)
-args = argparser.parse_args()
-logging.basicConfig(level=args.debug_level)
+argparser.add_argument('--parser',help='parser engine (default: fast)',
+					action='store',dest='engine',choices=sorted(ENGINES),default='fast')
+argparser.add_argument('--cache-dir',help='keep parsed pages in this directory (default: ~/.cache/plg/albert)',
+					action='store',dest='cache_dir',default=None)
+argparser.add_argument('--no-cache',help='always parse pages from scratch',
+					action='store_false',dest='cache',default=True)
+argparser.add_argument('--combo',help='write the combo box options to FILE',
+					action='store',dest='combo',metavar='FILE',default=None)
+argparser.add_argument('--fdf',help='write FDF setting the options of a form field to FILE',
+					action='store',dest='fdf',metavar='FILE',default=None)
+argparser.add_argument('--xfdf',help='write XFDF filling a form field for each student to FILE',
+					action='store',dest='xfdf',metavar='FILE',default=None)
+argparser.add_argument('--field-name',help='name of the form field in the FDF or XFDF (default: student)',
+					action='store',dest='field_name',default='student')
+argparser.add_argument('--json',help='write the fields as a JSON list to FILE',
+					action='store',dest='json',metavar='FILE',default=None)
+argparser.add_argument('--profile',help='time each stage of the run, and print a report on standard error',
+					action='store_true',dest='profile',default=False)
+argparser.add_argument('--profile-json',help='time each stage of the run, and write the timings to FILE as JSON',
+					action='store',dest='profile_json',metavar='FILE',default=None)
+
+def main():
+	args = argparser.parse_args()
+	from plg.albert.cache import ParseCache
+	from plg.albert.ingest import iter_pages
+	from plg.fields import ComboBoxExporter, FDFExporter, FieldExporters, JSONExporter, XFDFExporter
+	from plg.utils import timing
+	logging.basicConfig(level=args.debug_level)
+	if args.profile or args.profile_json:
+		timing.registry.enable()
+	if args.profile:
+		atexit.register(timing.registry.write,'-')
+	if args.profile_json:
+		atexit.register(timing.registry.write,args.profile_json)
 
+	if args.cache:
+		cache=ParseCache(args.cache_dir)
+	else:
+		cache=None
 
-parser=AlbertHTMLParser()
-(course,students)=parser.parse(args.file)
-# logging.debug('students: %s',repr(students))
+	exporters=[]
+	if args.combo or not (args.fdf or args.xfdf or args.json):
+		exporters.append(ComboBoxExporter(args.combo or '-'))
+	if args.fdf:
+		exporters.append(FDFExporter(args.fdf,args.field_name))
+	if args.xfdf:
+		exporters.append(XFDFExporter(args.xfdf,args.field_name))
+	if args.json:
+		exporters.append(JSONExporter(args.json))
+	exporters=FieldExporters(exporters)
 
-# course info
-logging.debug('course: %s',repr(course))
-(term,session,org,level) = course['description'].split(' | ')
-logging.debug('term: %s',term)
-logging.debug('session: %s',session)
-logging.debug('org: %s',org)
-logging.debug('level: %s',level)
+	# students are listed once, under the first page they appear on
+	seen=set()
+	for (page,course,records) in iter_pages(args.files,args.engine,args.jobs,cache):
+		# course info
+		logging.debug('course: %s',repr(course))
+		(term,session,org,level) = course['description'].split(' | ')
+		logging.debug('term: %s',term)
+		logging.debug('session: %s',session)
+		logging.debug('org: %s',org)
+		logging.debug('level: %s',level)
 
+		for student in records:
+			if 'id' in student:
+				if student['id'] in seen:
+					logging.info("Skipping %s, already listed",student['name'])
+					continue
+				seen.add(student['id'])
+			    # first and last names
+			(family_name,given_names) = student['name'].split(',')
+			(username,domain) = student['email'].split('@')
+			exporters.write(username,"%s %s" % (given_names,family_name),
+				email=student['email'],id=student.get('id'),course=course.get('code'))
+	exporters.close()
 
-str=""
-for key in students:
-	student = students[key]
-	    # first and last names
-	(family_name,given_names) = student['name'].split(',')
-	(username,domain) = student['email'].split('@')
-	str+="[(%s)(%s %s)]" % (username, given_names, family_name)
 
-print str
+# the parsing pool may start its workers by importing this script afresh
+if __name__ == "__main__":
+	main()
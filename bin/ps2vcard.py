@@ -17,127 +17,33 @@ To create the source file:
     It will probably be called "SA_LEARNING_MANAGEMENT.SS_CLASS_R	OSTER.html"
   
 Then run this script on that file.  You won't get any vCards saved without 
-the --save option, though.
+the --output or --save option, though.  With --output, every card goes into
+one .vcf file (or standard output, for '-'); with --save, each card gets its
+own file.
+
+With --sync, the students' fingerprints (their fields and the contents
+of their photos) are kept in a file between runs, and only the cards of
+students added or changed since the last run are written; the cards of dropped students are deleted (with --save) or
+listed for removal (with --output).
 
 Then you can import the cards into your address book.
 
 """
 
-from HTMLParser import HTMLParser
-from htmlentitydefs import entitydefs
-import re
-import vobject # http://vobject.skyhouseconsulting.com/
-
+# Only what the argument parser needs is imported up front; the rest is
+# imported once the arguments are parsed, so that -h answers quickly.
+import atexit
 import logging
 import argparse
+import os
+import sys
 
-class AlbertHTMLParser(HTMLParser,object):
-	student_keys_dict={
-		'CLASS_ROSTER_VW_EMPLID'     : 'id',
-		'HCR_PERSON_NM_I_NAME'       : 'name',
-		'DERIVED_SSSMAIL_EMAIL_ADDR' : 'email',
-		'SCC_PREF_PHN_VW_PHONE'      : 'phone',
-		'PROGPLAN'                   : 'progplan',
-		'PROGPLAN1'                  : 'level',
-		'PSXLATITEM_XLATLONGNAME'    : 'status'
-	}
-	course_keys_dict={
-		'DERIVED_SSR_FC_SSR_CLASSNAME_LONG' : 'code',
-		'DERIVED_SSR_FC_SSS_PAGE_KEYDESCR2' : 'description',
-		'DERIVED_SSR_FC_DESCR254'           : 'name',
-		'MTG_INSTR$0'                       : 'instructor',
-		'MTG_SCHED$0'                       : 'schedule',
-		'MTG_LOC$0'                         : 'room',
-		'MTG_DATE$0'                        : 'dates'
-	}
-
-	def __init__(self):
-		HTMLParser.__init__(self)
-		self.course_data={}
-		self.student_data={}
-		# parsing state variables
-		self.current_key=""
-		self.current_index=0
-		self.data=""
-		self.state='SEEKING_ID'
-		self.data_dest=''
-
-	def handle_starttag(self,tag,attrs):
-		for attr in attrs:
-			(name,value) = attr
-			if name == 'id':
-				logging.debug("parsing id %s" % value)
-				match=re.match("([^$]*)\$(\d+)$",value)
-				if (value in self.course_keys_dict):
-					logging.debug("key %s is in course dictionary",value)
-					self.current_key=self.course_keys_dict[value]
-					self.state='SEEKING_DATA'
-					self.data_dest='COURSE'
-				elif match:
-					(key,index)=match.group(1,2)
-					logging.debug("key=%s",key)
-					if (key in self.student_keys_dict):
-						logging.debug("key %s is in student dictionary",key)
-						self.current_key=self.student_keys_dict[key]
-						self.current_index=int(index)
-						self.state='SEEKING_DATA'
-						self.data_dest='STUDENT'
-					elif key == 'win0divEMPL_PHOTO_EMPLOYEE_PHOTO':
-						self.current_index=int(index)
-						self.state='SEEKING_STUDENT_IMG'
-					else:
-						logging.debug("ignoring key %s",key)
-				else:
-					logging.debug("id doesn't match, moving on")
-		if (tag == 'img' and self.state=='SEEKING_STUDENT_IMG'):
-			for attr in attrs:
-				(name,value)=attr
-				if name=='src':
-					try:
-						self.student_data[self.current_index]
-					except KeyError:
-						self.student_data[self.current_index] = {}
-					self.student_data[self.current_index]['photo'] = value
-			self.current_index=0					
-			self.state='SEEKING_ID'
-	
-	def handle_data(self,data):
-		if self.state == 'SEEKING_DATA':
-			self.data += data
-	
-	def handle_charref(self,name):
-		logging.debug("character ref: %s",name)
-		
-	def handle_entityref(self,name):
-		# logging.debug("entity ref: %s",name)
-		if (self.state == 'SEEKING_DATA'):
-			if (name in entitydefs):
-				self.data += entitydefs[name]
-			
-	def handle_endtag(self,tag):
-		if self.state == 'SEEKING_DATA':
-			# we're done
-			if self.data_dest=='STUDENT':
-				logging.debug("self.current_key=%s, self.current_index=%d",self.current_key,self.current_index)
-				try:
-					self.student_data[self.current_index]
-				except KeyError:
-					self.student_data[self.current_index] = {}
-				self.student_data[self.current_index][self.current_key] = self.data
-			elif self.data_dest=='COURSE':
-				self.course_data[self.current_key] = self.data
-			else:
-				logging.error("Unknown data destination %s",self.data_dest)
-			self.current_index=0
-			self.current_key=""
-			self.data=""
-			self.data_dest=''
-			self.state='SEEKING_ID'
-			
-	def parse(self,file):
-		data = open(file, 'r').read()
-		self.feed(data)
-		return (self.course_data,self.student_data)
+try:
+	from plg.albert import ENGINES
+except ImportError:
+	# running from a source checkout
+	sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+	from plg.albert import ENGINES
 
 argparser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawTextHelpFormatter)
 argparser.add_argument('--verbose',help='be verbose',
@@ -146,63 +52,120 @@ argparser.add_argument('--verbose',help='be verbose',
 argparser.add_argument('--debug',help='show debugging statements',
                     action='store_const',const=logging.DEBUG,dest='debug_level',
                     default=logging.WARNING)
-argparser.add_argument('file',help='HTML file downloaded from Albert',
-					action='store',
-					default='Self Service Class Roster.html')
-argparser.add_argument('--save',help='save vCards',
+argparser.add_argument('files',help='HTML files downloaded from Albert',
+					action='store',nargs='+',metavar='file')
+argparser.add_argument('--jobs',help='parse files with this many processes (default: one per CPU)',
+					action='store',dest='jobs',type=int,default=None)
+argparser.add_argument('-o','--output',help='save all vCards to this one file (- for standard output)',
+					action='store',dest='output',metavar='FILE',default=None)
+argparser.add_argument('--save',help='save each vCard to its own file',
 					action='store_const',const=True,dest='save',default=False)
-argparser.add_argument('--print',help='pretty-print vCards',
-					action='store_const',const=True,dest='bprint',default=True)
-args = argparser.parse_args()
-logging.basicConfig(level=args.debug_level)
-
-
-parser=AlbertHTMLParser()
-(course,students)=parser.parse(args.file)
-# logging.debug('students: %s',repr(students))
-
-# course info
-logging.debug('course: %s',repr(course))
-(term,session,org,level) = course['description'].split(' | ')
-logging.debug('term: %s',term)
-logging.debug('session: %s',session)
-logging.debug('org: %s',org)
-logging.debug('level: %s',level)
-
-for key in students:
-	student = students[key]
-	card = vobject.vCard()
-    # first and last names
-	(family_name,given_names) = student['name'].split(',')
-	card.add('n')
-	card.n.value = vobject.vcard.Name(family=family_name,given=given_names)
-	# full name
-	card.add('fn')
-	card.fn.value="%s %s" % (given_names,family_name)
-    # email
-	card.add('email')
-	card.email.value=student['email']
-	card.email.type_param='INTERNET'
-    # student info
-	card.add('title').value = "Student"
-	card.add('org').value=[org,student['progplan'].replace('\n','')]
-	try:
-		photo_fh=open(student['photo'],'rb')
-		card.add('photo') 
-		card.photo.value = photo_fh.read()
-		card.photo.encoding_param = "b" 
-		card.photo.type_param = "JPEG" 
-	except KeyError:
-		pass
-	# course (use address book's "Related Names" fields)
-	item = 'item1' 
-	card.add(item + '.X-ABLABEL').value="course"
-	card.add(item + '.X-ABRELATEDNAMES').value=course['code'] + ", " + term
-	if args.bprint:
-		card.prettyPrint()
+argparser.add_argument('--print',help='pretty-print vCards (default when not saving)',
+					action='store_const',const=True,dest='bprint',default=None)
+argparser.add_argument('--parser',help='parser engine (default: fast)',
+					action='store',dest='engine',choices=sorted(ENGINES),default='fast')
+argparser.add_argument('--cache-dir',help='keep parsed pages in this directory (default: ~/.cache/plg/albert)',
+					action='store',dest='cache_dir',default=None)
+argparser.add_argument('--no-cache',help='always parse pages from scratch',
+					action='store_false',dest='cache',default=True)
+argparser.add_argument('--sync',help='keep fingerprints of the students in FILE, and only write cards changed since the last run',
+					action='store',dest='sync',metavar='FILE',default=None)
+argparser.add_argument('--profile',help='time each stage of the run, and print a report on standard error',
+					action='store_true',dest='profile',default=False)
+argparser.add_argument('--profile-json',help='time each stage of the run, and write the timings to FILE as JSON',
+					action='store',dest='profile_json',metavar='FILE',default=None)
+def card_name(student):
+	return student['name'].replace(',','_').replace(' ','_')
+
+def main():
+	args = argparser.parse_args()
+	from plg.albert.cache import ParseCache
+	from plg.albert.diff import SyncState, fingerprint
+	from plg.albert.ingest import iter_pages
+	from plg.albert.photos import PhotoLoader
+	from plg.vcard import VCardFileWriter, VCardStreamWriter, student_card
+	from plg.utils import timing
+	if args.sync and not (args.output or args.save):
+		# the fingerprints saved would be of cards never written
+		argparser.error('--sync needs --output or --save')
+	logging.basicConfig(level=args.debug_level)
+	if args.profile or args.profile_json:
+		timing.registry.enable()
+	if args.profile:
+		atexit.register(timing.registry.write,'-')
+	if args.profile_json:
+		atexit.register(timing.registry.write,args.profile_json)
+	if args.bprint is None:
+		args.bprint = not (args.output or args.save)
+
+	if args.cache:
+		cache=ParseCache(args.cache_dir)
+	else:
+		cache=None
+
+	if args.sync:
+		sync=SyncState(args.sync)
+	else:
+		sync=None
+
+	# students are listed once, under the first page they appear on
+	seen=set()
+	def unseen(records):
+		for student in records:
+			if 'id' in student:
+				if student['id'] in seen:
+					logging.info("Skipping %s, already listed",student['name'])
+					continue
+				seen.add(student['id'])
+			yield student
+
+	def changed(student,photo,*context):
+		"""
+		Whether the student's card has changed since the last run.  The photo
+		counts by its contents, not by where the page keeps it.
+		"""
+		if sync is None or 'id' not in student:
+			return True
+		fields = dict(student,photo=photo.digest if photo is not None else None)
+		return sync.update(student['id'],fingerprint(fields,*context),card_name(student))
+
+	photos=PhotoLoader()
+	writers=[]
+	if args.output:
+		writers.append(VCardStreamWriter(args.output))
 	if args.save:
-		filename=student['name'].replace(',','_').replace(' ','_') + '.vcf'
-		logging.info("Saving %s",filename)
-		fh = open (filename,'w')
-		fh.write(card.serialize())
-		fh.close
+		writers.append(VCardFileWriter())
+	for (page,course,records) in iter_pages(args.files,args.engine,args.jobs,cache):
+		# course info
+		logging.debug('course: %s',repr(course))
+		(term,session,org,level) = course['description'].split(' | ')
+		logging.debug('term: %s',term)
+		logging.debug('session: %s',session)
+		logging.debug('org: %s',org)
+		logging.debug('level: %s',level)
+
+		label = course['code'] + ", " + term
+		for (student,photo) in photos.prefetched(unseen(records)):
+			if not changed(student,photo,org,label):
+				logging.debug("Skipping %s, unchanged",student['name'])
+				continue
+			card = student_card(student,org,label,photo)
+			if args.bprint:
+				card.prettyPrint()
+			for writer in writers:
+				writer.write(card,card_name(student))
+	photos.close()
+	if sync is not None:
+		changes = sync.diff()
+		logging.info("%d added, %d changed, %d dropped",len(changes.added),len(changes.changed),len(changes.dropped))
+		for name in sync.stale():
+			for writer in writers:
+				writer.delete(name)
+		sync.save()
+	for writer in writers:
+		writer.close()
+
+
+# the parsing pool may start its workers by importing this script afresh
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,4 @@
+"""
+Reading class rosters saved from Albert, NYU's student information system
+"""
+from plg.albert.parser import ENGINES, AlbertHTMLParser, FastAlbertHTMLParser
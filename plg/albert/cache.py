@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+An on-disk cache of parsed roster pages
+
+Entries are keyed by a hash of the page's contents together with the
+parser version and the Python version, so an edited page, a changed
+parser, or a different interpreter all miss.  Values are the parser's
+(course_data,student_data) result, written with marshal.  The cache is
+bounded in size: when it grows past its limit the least recently used
+entries are deleted.
+"""
+import errno
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import tempfile
+
+from plg.albert.parser import ENGINES, PARSER_VERSION
+
+#: Bytes hashed at a time
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_directory():
+    """
+    The cache directory used when none is given.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),'.cache')
+    return os.path.join(base,'plg','albert')
+
+
+class ParseCache(object):
+    """
+    A size-bounded, least-recently-used cache of parse results.
+
+    >>> import shutil
+    >>> directory = tempfile.mkdtemp()
+    >>> cache = ParseCache(directory)
+    >>> cache.get('0123') is None
+    True
+    >>> cache.put('0123',({'code':'MATH-UA 123'},{0:{'name':'Kennedy,John'}}))
+    >>> cache.get('0123')
+    ({'code': 'MATH-UA 123'}, {0: {'name': 'Kennedy,John'}})
+    >>> shutil.rmtree(directory)
+    """
+
+    def __init__(self,directory=None,max_bytes=100*1024*1024):
+        if directory is None:
+            directory = default_directory()
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self,filename):
+        """
+        Return the cache key of the page in *filename*.
+        """
+        digest = hashlib.sha1()
+        with open(filename,'rb') as fh:
+            while True:
+                chunk = fh.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return '%s-p%s-py%d%d' % ((digest.hexdigest(),PARSER_VERSION) + tuple(sys.version_info[:2]))
+
+    def _path(self,key):
+        return os.path.join(self.directory,key + '.marshal')
+
+    def get(self,key):
+        """
+        Return the result stored under *key*, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path,'rb') as fh:
+                result = marshal.load(fh)
+        except (IOError,OSError):
+            return None
+        except (EOFError,ValueError,TypeError):
+            logging.warning("Discarding unreadable cache entry %s",path)
+            self._remove(path)
+            return None
+        try:
+            # mark as recently used
+            os.utime(path,None)
+        except OSError:
+            pass
+        logging.debug("Cache hit: %s",key)
+        return result
+
+    def put(self,key,result):
+        """
+        Store *result* under *key*, then trim the cache to size.
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        (fd,temp) = tempfile.mkstemp(dir=self.directory,suffix='.tmp')
+        try:
+            with os.fdopen(fd,'wb') as fh:
+                marshal.dump(result,fh)
+            # rename is atomic, so readers never see a partial entry
+            os.rename(temp,self._path(key))
+        except:
+            self._remove(temp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits its limit.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.marshal'):
+                continue
+            path = os.path.join(self.directory,name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime,stat.st_size,path))
+            total += stat.st_size
+        entries.sort()
+        for (mtime,size,path) in entries:
+            if total <= self.max_bytes:
+                break
+            logging.debug("Evicting %s",path)
+            self._remove(path)
+            total -= size
+
+    def _remove(self,path):
+        try:
+            os.remove(path)
+        except OSError:
+            # someone else got there first
+            pass
+
+    def parse(self,filename,engine='fast'):
+        """
+        Return (course_data,student_data) for *filename*, parsing it only on a miss.
+        """
+        key = self.key(filename)
+        result = self.get(key)
+        if result is None:
+            result = ENGINES[engine]().parse(filename)
+            self.put(key,result)
+        return result
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
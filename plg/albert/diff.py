@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Compare snapshots of rosters by EMPLID
+
+Each student record is reduced to a fingerprint, a hash of its fields, so
+two snapshots of a roster (say, last night's and tonight's) compare by
+EMPLID and fingerprint alone: a student is added, dropped or changed, and
+everyone else can be left alone.  A SyncState remembers the fingerprints
+of a run, and what was made from each record, in a JSON file for the
+next run to compare against.
+"""
+import errno
+import hashlib
+import json
+import os
+import tempfile
+
+
+def fingerprint(record,*context):
+    """
+    Return a hash of the fields of *record* and any *context* (such as
+    the course the record came with) that goes into what is made from it.
+
+    >>> a = fingerprint({'id':'N1','name':'Kennedy,John'},'MATH-UA 123')
+    >>> a == fingerprint({'name':'Kennedy,John','id':'N1'},'MATH-UA 123')
+    True
+    >>> a == fingerprint({'id':'N1','name':'Kennedy,John F.'},'MATH-UA 123')
+    False
+    """
+    text = json.dumps([sorted(record.items()),context],sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class RosterDiff(object):
+    """
+    The EMPLIDs added, dropped and changed between two snapshots.
+    """
+    __slots__ = ('added','dropped','changed')
+
+    def __init__(self,added=(),dropped=(),changed=()):
+        self.added = list(added)
+        self.dropped = list(dropped)
+        self.changed = list(changed)
+
+    def __len__(self):
+        return len(self.added) + len(self.dropped) + len(self.changed)
+
+    def __repr__(self):
+        return 'RosterDiff(added=%r, dropped=%r, changed=%r)' % (self.added,self.dropped,self.changed)
+
+
+def diff(old,new):
+    """
+    Compare two snapshots, each a dictionary from EMPLID to fingerprint.
+
+    >>> diff({'N1':'a','N2':'b','N3':'c'},{'N1':'a','N2':'x','N4':'d'})
+    RosterDiff(added=['N4'], dropped=['N3'], changed=['N2'])
+    """
+    return RosterDiff(
+        added=sorted(emplid for emplid in new if emplid not in old),
+        dropped=sorted(emplid for emplid in old if emplid not in new),
+        changed=sorted(emplid for emplid in new if emplid in old and old[emplid] != new[emplid]))
+
+
+class SyncState(object):
+    """
+    The fingerprints of the last run, and those seen so far in this one.
+
+    For each EMPLID the state keeps its fingerprint and the name of what
+    was made from the record (such as a card's file name), so that the
+    caller can replace or delete it.
+
+    >>> state = SyncState(None)
+    >>> state.update('N1','a','Kennedy_John')
+    True
+    >>> state.save()
+    >>> state = SyncState(None,state.current)
+    >>> state.update('N1','a','Kennedy_John')
+    False
+    >>> state.diff()
+    RosterDiff(added=[], dropped=[], changed=[])
+    """
+
+    def __init__(self,path,previous=None):
+        self.path = path
+        if previous is None:
+            previous = {}
+            if path is not None:
+                try:
+                    with open(path) as fh:
+                        previous = json.load(fh)['students']
+                except (IOError,OSError):
+                    pass
+        self.previous = previous
+        # EMPLID -> [fingerprint,name]
+        self.current = {}
+
+    def update(self,emplid,fingerprint,name=None):
+        """
+        Note *emplid* as seen with *fingerprint*; return whether it is new
+        or has changed since the last run.
+        """
+        self.current[emplid] = [fingerprint,name]
+        before = self.previous.get(emplid)
+        return before is None or before[0] != fingerprint
+
+    def stale(self):
+        """
+        The names saved in the last run that no student of this run has:
+        those of dropped students, and the old names of renamed ones.
+
+        >>> state = SyncState(None,{'N1':['a','Adams_John'],'N2':['b','Kennedy_John']})
+        >>> state.update('N2','c','Kennedy_John_F.')
+        True
+        >>> state.stale()
+        ['Adams_John', 'Kennedy_John']
+        """
+        names = set(entry[1] for entry in self.current.values())
+        return sorted(set(entry[1] for entry in self.previous.values()) - names - set([None]))
+
+    def diff(self):
+        """
+        The differences between the last run and this one so far.
+        """
+        return diff(dict((emplid,entry[0]) for (emplid,entry) in self.previous.items()),
+            dict((emplid,entry[0]) for (emplid,entry) in self.current.items()))
+
+    def save(self):
+        """
+        Save this run's fingerprints, for the next run to compare with.
+        """
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path) or os.curdir
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        (fd,temp) = tempfile.mkstemp(dir=directory,suffix='.tmp')
+        with os.fdopen(fd,'w') as fh:
+            json.dump({'students': self.current},fh,indent=1,sort_keys=True)
+        os.rename(temp,self.path)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+"""
+Parse many Albert roster pages at once
+
+A term's worth of roster pages is parsed across a pool of worker
+processes.  Workers return plain records; the calling process builds the
+model from them, so that courses and terms are interned in one place and
+a student enrolled in several sections is one Student object.  Results
+always follow the order of the input files, whatever order the workers
+finish in.  A record's photo is named relative to its page, as the page
+has it, so records come back with the page's directory joined to it.
+"""
+import datetime
+import itertools
+import logging
+import multiprocessing
+import os
+
+from plg.albert.parser import ENGINES
+from plg.utils import timing
+from plg.model.enrollment import (AcademicSession, AcademicTerm, Course,
+    CourseOffering, CourseSection, Roster, Student)
+
+
+def resolve_photo(filename,record):
+    """
+    Return *record* with its photo, named relative to the page in
+    *filename*, joined to the page's directory.
+
+    The record itself is left alone, as it may be what a cache holds for
+    every copy of the page.
+
+    >>> record = {'name':'Kennedy,John','photo':'roster_files/p0.jpg'}
+    >>> print(resolve_photo(os.path.join('sec1','roster.html'),record)['photo'].replace(os.sep,'/'))
+    sec1/roster_files/p0.jpg
+    >>> print(record['photo'])
+    roster_files/p0.jpg
+    """
+    src = record.get('photo')
+    directory = os.path.dirname(filename)
+    if not src or not directory or '://' in src:
+        return record
+    record = dict(record)
+    record['photo'] = os.path.join(directory,src)
+    return record
+
+
+def parse_file(filename,engine='fast',cache=None):
+    """
+    Parse one roster page, through *cache* (a ParseCache) if given.
+
+    Return (filename,course_data,records), where records is the list of
+    student records in page order, with their photos resolved.
+    """
+    if cache is not None:
+        (course_data,student_data) = cache.parse(filename,engine)
+    else:
+        (course_data,student_data) = ENGINES[engine]().parse(filename)
+    records = [resolve_photo(filename,student_data[index]) for index in sorted(student_data)]
+    return (filename,course_data,records)
+
+
+def _parse_file_star(args):
+    # timed here, as the worker's own registry is never reported
+    start = timing.default_timer()
+    result = parse_file(*args)
+    return (result,timing.default_timer() - start)
+
+
+def parse_files(filenames,engine='fast',processes=None,cache=None):
+    """
+    Parse roster pages in parallel, yielding parse_file results in input order.
+
+    *processes* is the size of the worker pool (default: one per CPU).  With
+    one process, or one file, pages are parsed in this process.  Pages
+    found in *cache* are not parsed again.
+
+    Where workers are spawned rather than forked (the default on Windows,
+    and on macOS from Python 3.8), each one imports the main script
+    afresh, so a script calling this must run under
+    ``if __name__ == "__main__":``.
+    """
+    filenames = list(filenames)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes,len(filenames))
+    if processes <= 1:
+        for filename in filenames:
+            with timing.span('albert.parse'):
+                result = parse_file(filename,engine,cache)
+            yield result
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for (result,seconds) in pool.imap(_parse_file_star,[(filename,engine,cache) for filename in filenames]):
+            if timing.registry.enabled:
+                timing.registry.record('albert.parse',seconds)
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def iter_pages(filenames,engine='fast',processes=None,cache=None):
+    """
+    Yield (filename,course_data,records) for each roster page, in input order.
+
+    *records* iterates over the page's student records.  A single page is
+    streamed with iterparse, so its first records are available before the
+    rest of it has been read; several pages go through parse_files.  Pages
+    found in *cache* are not parsed again, and pages parsed are added to it.
+    Records come with their photos resolved (see resolve_photo); the cache
+    keeps them as the page has them, since its entries are shared by
+    every copy of a page.
+    """
+    filenames = list(filenames)
+    if len(filenames) != 1:
+        for result in parse_files(filenames,engine,processes,cache):
+            yield result
+        return
+    filename = filenames[0]
+    if cache is not None:
+        key = cache.key(filename)
+        result = cache.get(key)
+        if result is not None:
+            (course_data,student_data) = result
+            yield (filename,course_data,[resolve_photo(filename,student_data[index])
+                for index in sorted(student_data)])
+            return
+    parser = ENGINES[engine]()
+    records = timing.timed_iter('albert.parse',parser.iterparse(filename))
+    # the course header precedes the students on the page, so it has been
+    # parsed by the time the first student record is complete
+    first_record = next(records,None)
+    if first_record is not None:
+        records = itertools.chain([first_record],records)
+    if cache is None:
+        yield (filename,parser.course_data,(resolve_photo(filename,record) for (index,record) in records))
+    else:
+        yield (filename,parser.course_data,_caching_records(cache,key,parser,filename,records))
+
+
+def _caching_records(cache,key,parser,filename,records):
+    """
+    Pass on streamed records, caching the whole page once they are all read.
+    """
+    student_data = {}
+    for (index,record) in records:
+        student_data[index] = record
+        yield resolve_photo(filename,record)
+    cache.put(key,(parser.course_data,student_data))
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(value.strip(),'%m/%d/%Y').date()
+    except ValueError:
+        return None
+
+
+def section_from_course(course_data):
+    """
+    Build a CourseSection from a course record.
+
+    The class code (e.g. 'MATH-UA 123-001') names both the course and the
+    section, the class title describes the course, and the page key
+    description ('Fall 2014 | Regular Academic Session | ...') gives the
+    term and session.
+
+    >>> section = section_from_course({'code':'MATH-UA 123-001',
+    ...     'name':'Calculus III','dates':'09/02/2014 - 12/19/2014',
+    ...     'description':'Fall 2014 | Regular Academic Session | CAS | Undergraduate'})
+    >>> (section.name,section.course_description,section.session_name)
+    ('MATH-UA 123-001', 'Calculus III', 'Regular Academic Session')
+    >>> (section.term_name,section.term_year,section.session_start_date.month)
+    ('Fall', 2014, 9)
+    """
+    code = course_data.get('code')
+    (term,session) = course_data['description'].split(' | ')[:2]
+    (term_name,term_year) = term.rsplit(' ',1)
+    dates = course_data.get('dates','').split(' - ')
+    if len(dates) == 2:
+        (start_date,end_date) = [_parse_date(date) for date in dates]
+    else:
+        (start_date,end_date) = (None,None)
+    offering = CourseOffering(
+        course=Course(name=code,description=course_data.get('name')),
+        session=AcademicSession(AcademicTerm(term_name,int(term_year)),
+            start_date,end_date,name=session))
+    return CourseSection(offering,name=code)
+
+
+def student_from_record(record):
+    """
+    Build a Student from a student record.
+
+    >>> student = student_from_record({'id':'N12345678','name':'Adams,John Quincy',
+    ...     'email':'jqa6@nyu.edu','status':'Enrolled'})
+    >>> (student.student_id,student.formatted_full_name,student.status)
+    ('N12345678', 'Adams, John Quincy', 'Enrolled')
+    """
+    (last_name,first_name) = record['name'].split(',',1)
+    return Student(last_name,first_name.strip(),
+        phone_number=record.get('phone'),
+        email_address=record.get('email'),
+        program=record.get('progplan'),
+        status=record.get('status'),
+        student_id=record.get('id'))
+
+
+def ingest(filenames,engine='fast',processes=None,cache=None):
+    """
+    Parse roster pages in parallel and return a list of Rosters.
+
+    Pages of the same section are merged into one Roster, and each student
+    appears once per Roster.  A student found on several pages is the same
+    Student object everywhere, keyed by EMPLID.  Rosters are in order of
+    their section's first page, students in page order, and every Roster
+    is indexed on student_id.  Pages found in *cache* are not parsed again.
+    """
+    rosters = {}
+    order = []
+    students = {}
+    for (filename,course_data,records) in parse_files(filenames,engine,processes,cache):
+        logging.info("Parsed %d students from %s",len(records),filename)
+        section = section_from_course(course_data)
+        try:
+            roster = rosters[section.name]
+        except KeyError:
+            roster = rosters[section.name] = Roster(section)
+            roster.add_index('student_id')
+            order.append(section.name)
+        for record in records:
+            emplid = record.get('id')
+            student = students.get(emplid)
+            if student is None:
+                student = student_from_record(record)
+                if emplid is not None:
+                    students[emplid] = student
+            if emplid is None or not roster.lookup_students('student_id',emplid):
+                roster.add_student(student)
+    return [rosters[name] for name in order]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""
+Parse a class roster page saved from Albert
+
+To create the source file:
+
+  * login to Albert, choose a course, and select "class roster"
+  * select "view photos in list"
+  * select "view all"
+  * save this page, including the frames and photos.  In Chrome, use
+    the "Webpage, complete" option when saving to do this.
+  * change to the created directory (it will likely end in `_files`) and locate the roster file.
+    It will probably be called "SA_LEARNING_MANAGEMENT.SS_CLASS_ROSTER.html"
+"""
+try:
+    from HTMLParser import HTMLParser
+    from htmlentitydefs import entitydefs
+except ImportError:  # Python 3
+    from html.parser import HTMLParser
+    from html.entities import entitydefs
+from functools import partial
+import re
+
+import logging
+
+#: Number of characters fed to the parser at a time
+CHUNK_SIZE = 64 * 1024
+
+#: Version of the parse results; change it whenever they change, so that
+#: cached results are not reused
+PARSER_VERSION = 1
+
+
+class AlbertHTMLParser(HTMLParser,object):
+    """
+    Collect course and student data from an Albert roster page.
+    
+    Student records are dictionaries keyed by the values of
+    student_keys_dict plus 'photo'; the course record is keyed by the
+    values of course_keys_dict.
+    
+    >>> parser = AlbertHTMLParser()
+    >>> page = ('<span id="DERIVED_SSR_FC_SSR_CLASSNAME_LONG">MATH-UA 123</span>'
+    ...     '<div id="win0divEMPL_PHOTO_EMPLOYEE_PHOTO$0"><img src="photo0.jpg"></div>'
+    ...     '<span id="HCR_PERSON_NM_I_NAME$0">Kennedy,John</span>')
+    >>> parser.feed(page)
+    >>> parser.course_data
+    {'code': 'MATH-UA 123'}
+    >>> sorted(parser.student_data[0].items())
+    [('name', 'Kennedy,John'), ('photo', 'photo0.jpg')]
+    """
+    student_keys_dict={
+        'CLASS_ROSTER_VW_EMPLID'     : 'id',
+        'HCR_PERSON_NM_I_NAME'       : 'name',
+        'DERIVED_SSSMAIL_EMAIL_ADDR' : 'email',
+        'SCC_PREF_PHN_VW_PHONE'      : 'phone',
+        'PROGPLAN'                   : 'progplan',
+        'PROGPLAN1'                  : 'level',
+        'PSXLATITEM_XLATLONGNAME'    : 'status'
+    }
+    course_keys_dict={
+        'DERIVED_SSR_FC_SSR_CLASSNAME_LONG' : 'code',
+        'DERIVED_SSR_FC_SSS_PAGE_KEYDESCR2' : 'description',
+        'DERIVED_SSR_FC_DESCR254'           : 'name',
+        'MTG_INSTR$0'                       : 'instructor',
+        'MTG_SCHED$0'                       : 'schedule',
+        'MTG_LOC$0'                         : 'room',
+        'MTG_DATE$0'                        : 'dates'
+    }
+    #: The keys of a complete student record
+    student_record_keys = frozenset(list(student_keys_dict.values()) + ['photo'])
+
+    def __init__(self):
+        try:
+            HTMLParser.__init__(self,convert_charrefs=False)
+        except TypeError:  # Python 2
+            HTMLParser.__init__(self)
+        self.course_data={}
+        self.student_data={}
+        # parsing state variables
+        self.current_key=""
+        self.current_index=0
+        self.data=""
+        self.state='SEEKING_ID'
+        self.data_dest=''
+        # the highest student index seen so far
+        self._row=-1
+
+    def _student_record(self,index):
+        try:
+            record = self.student_data[index]
+        except KeyError:
+            record = self.student_data[index] = {}
+        if index > self._row:
+            self._row = index
+        return record
+
+    def handle_starttag(self,tag,attrs):
+        for attr in attrs:
+            (name,value) = attr
+            if name == 'id':
+                logging.debug("parsing id %s" % value)
+                match=re.match(r"([^$]*)\$(\d+)$",value)
+                if (value in self.course_keys_dict):
+                    logging.debug("key %s is in course dictionary",value)
+                    self.current_key=self.course_keys_dict[value]
+                    self.state='SEEKING_DATA'
+                    self.data_dest='COURSE'
+                elif match:
+                    (key,index)=match.group(1,2)
+                    logging.debug("key=%s",key)
+                    if (key in self.student_keys_dict):
+                        logging.debug("key %s is in student dictionary",key)
+                        self.current_key=self.student_keys_dict[key]
+                        self.current_index=int(index)
+                        self.state='SEEKING_DATA'
+                        self.data_dest='STUDENT'
+                    elif key == 'win0divEMPL_PHOTO_EMPLOYEE_PHOTO':
+                        self.current_index=int(index)
+                        self.state='SEEKING_STUDENT_IMG'
+                    else:
+                        logging.debug("ignoring key %s",key)
+                else:
+                    logging.debug("id doesn't match, moving on")
+        if (tag == 'img' and self.state=='SEEKING_STUDENT_IMG'):
+            for attr in attrs:
+                (name,value)=attr
+                if name=='src':
+                    self._student_record(self.current_index)['photo'] = value
+            self.current_index=0
+            self.state='SEEKING_ID'
+
+    def handle_data(self,data):
+        if self.state == 'SEEKING_DATA':
+            self.data += data
+
+    def handle_charref(self,name):
+        logging.debug("character ref: %s",name)
+
+    def handle_entityref(self,name):
+        # logging.debug("entity ref: %s",name)
+        if (self.state == 'SEEKING_DATA'):
+            if (name in entitydefs):
+                self.data += entitydefs[name]
+
+    def handle_endtag(self,tag):
+        if self.state == 'SEEKING_DATA':
+            # we're done
+            if self.data_dest=='STUDENT':
+                logging.debug("self.current_key=%s, self.current_index=%d",self.current_key,self.current_index)
+                self._student_record(self.current_index)[self.current_key] = self.data
+            elif self.data_dest=='COURSE':
+                self.course_data[self.current_key] = self.data
+            else:
+                logging.error("Unknown data destination %s",self.data_dest)
+            self.current_index=0
+            self.current_key=""
+            self.data=""
+            self.data_dest=''
+            self.state='SEEKING_ID'
+
+    def _chunks(self,file,chunk_size):
+        """
+        Read *file* (a name or an open file) in blocks of *chunk_size*.
+        """
+        if hasattr(file,'read'):
+            fh = file
+        else:
+            fh = open(file,'r')
+        try:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            if fh is not file:
+                fh.close()
+
+    def iterparse(self,file,chunk_size=CHUNK_SIZE):
+        """
+        Parse *file* incrementally, yielding (index,record) for each student.
+        
+        The file is fed to the parser in blocks of *chunk_size* characters,
+        and each student record is yielded, and forgotten, as soon as it is
+        complete: when all its fields and its photo have been seen, or when
+        a field of a later student has, as the page lists each student's
+        fields together, row by row.  So a student missing a field (no
+        phone, or no photo) holds up no one after them.  What is left at
+        the end of the file is yielded then, in index order.  The course
+        record, which precedes the students on the page, is available as
+        self.course_data by the time the first student is yielded.
+        
+        >>> import io
+        >>> page = io.StringIO(u''.join(
+        ...     u'<div id="win0divEMPL_PHOTO_EMPLOYEE_PHOTO$%d"><img src="p%d.jpg"></div>'
+        ...     u'<span id="HCR_PERSON_NM_I_NAME$%d">Student,%d</span>' % (i,i,i,i)
+        ...     for i in range(3)))
+        >>> for (index,record) in AlbertHTMLParser().iterparse(page,chunk_size=50):
+        ...     print("%d %s %s" % (index,record['name'],record['photo']))
+        0 Student,0 p0.jpg
+        1 Student,1 p1.jpg
+        2 Student,2 p2.jpg
+        """
+        for chunk in self._chunks(file,chunk_size):
+            self.feed(chunk)
+            for record in self._complete_records():
+                yield record
+        self.close()
+        for record in self._complete_records():
+            yield record
+        for index in sorted(self.student_data):
+            yield (index,self.student_data.pop(index))
+
+    def _complete_records(self):
+        """
+        Remove and return the complete records, in index order.
+        
+        Only the records not yet yielded are kept, so there are few to
+        look at: the current row, and any before it still to go.
+        """
+        complete = []
+        for index in sorted(self.student_data):
+            if index < self._row or self.student_record_keys.issubset(self.student_data[index]):
+                complete.append((index,self.student_data.pop(index)))
+        return complete
+
+    def parse(self,file,chunk_size=CHUNK_SIZE):
+        """
+        Parse *file* completely and return (course_data,student_data).
+        
+        student_data maps each student index to its record.
+        """
+        for chunk in self._chunks(file,chunk_size):
+            self.feed(chunk)
+        self.close()
+        return (self.course_data,self.student_data)
+
+
+class FastAlbertHTMLParser(AlbertHTMLParser):
+    """
+    An AlbertHTMLParser tuned for large pages, with identical results.
+    
+    Element ids are looked up in dispatch tables built once per parser
+    instead of being matched against a regular expression, debugging
+    messages are only formatted when debugging is enabled, and character
+    data is collected in a list and joined once per field.
+    
+    >>> page = ('<span id="DERIVED_SSR_FC_SSR_CLASSNAME_LONG">MATH-UA 123</span>'
+    ...     '<div id="win0divEMPL_PHOTO_EMPLOYEE_PHOTO$0"><img src="photo0.jpg"></div>'
+    ...     '<span id="HCR_PERSON_NM_I_NAME$0">Kennedy,John</span>')
+    >>> standard = AlbertHTMLParser()
+    >>> standard.feed(page)
+    >>> fast = FastAlbertHTMLParser()
+    >>> fast.feed(page)
+    >>> (fast.course_data,fast.student_data) == (standard.course_data,standard.student_data)
+    True
+    """
+    _index_match = re.compile(r"\d+$").match
+    
+    def __init__(self):
+        AlbertHTMLParser.__init__(self)
+        self._debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        self._buffer = []
+        # full id -> handler
+        self._course_dispatch = dict((id,partial(self._start_course_field,key))
+            for (id,key) in self.course_keys_dict.items())
+        # id up to the '$' -> handler taking the index after it
+        self._student_dispatch = dict((id,partial(self._start_student_field,key))
+            for (id,key) in self.student_keys_dict.items())
+        self._student_dispatch['win0divEMPL_PHOTO_EMPLOYEE_PHOTO'] = self._start_photo
+        
+    def _start_course_field(self,key):
+        self.current_key=key
+        self.state='SEEKING_DATA'
+        self.data_dest='COURSE'
+        
+    def _start_student_field(self,key,index):
+        self.current_key=key
+        self.current_index=index
+        self.state='SEEKING_DATA'
+        self.data_dest='STUDENT'
+        
+    def _start_photo(self,index):
+        self.current_index=index
+        self.state='SEEKING_STUDENT_IMG'
+        
+    def handle_starttag(self,tag,attrs):
+        for (name,value) in attrs:
+            if name == 'id':
+                if self._debug:
+                    logging.debug("parsing id %s",value)
+                handler = self._course_dispatch.get(value)
+                if handler is not None:
+                    handler()
+                    continue
+                (key,dollar,index) = value.partition('$')
+                handler = self._student_dispatch.get(key)
+                if handler is not None and self._index_match(index):
+                    handler(int(index))
+                elif self._debug:
+                    logging.debug("ignoring id %s",value)
+        if (tag == 'img' and self.state=='SEEKING_STUDENT_IMG'):
+            for (name,value) in attrs:
+                if name=='src':
+                    self._student_record(self.current_index)['photo'] = value
+            self.current_index=0
+            self.state='SEEKING_ID'
+            
+    def handle_data(self,data):
+        if self.state == 'SEEKING_DATA':
+            self._buffer.append(data)
+            
+    def handle_charref(self,name):
+        if self._debug:
+            logging.debug("character ref: %s",name)
+            
+    def handle_entityref(self,name):
+        if (self.state == 'SEEKING_DATA'):
+            if (name in entitydefs):
+                self._buffer.append(entitydefs[name])
+                
+    def handle_endtag(self,tag):
+        if self.state == 'SEEKING_DATA':
+            data = ''.join(self._buffer)
+            if self.data_dest=='STUDENT':
+                self._student_record(self.current_index)[self.current_key] = data
+            else:
+                self.course_data[self.current_key] = data
+            self.current_index=0
+            self.current_key=""
+            self._buffer=[]
+            self.data_dest=''
+            self.state='SEEKING_ID'
+
+
+#: The parser engines, by name
+ENGINES = {
+    'standard' : AlbertHTMLParser,
+    'fast'     : FastAlbertHTMLParser
+}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
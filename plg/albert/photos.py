@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Load student photos ahead of need
+
+Photo files are read on a small pool of threads while earlier records are
+still being processed, so building cards does not wait on the disk.
+Identical images (many students share Albert's "no photo" placeholder)
+are kept once, and each is base64-encoded at most once.  Other images
+are let go once nothing refers to them, so memory does not grow with
+the size of the section.
+"""
+import base64
+import collections
+import hashlib
+import logging
+from multiprocessing.pool import ThreadPool
+import weakref
+
+from plg.utils.timing import timed
+
+
+class Photo(object):
+    """
+    An image and its digest.
+
+    >>> photo = Photo(b'JFIF')
+    >>> photo.encoded == u'SkZJRg=='
+    True
+    """
+    __slots__ = ('data','digest','_encoded','__weakref__')
+
+    def __init__(self,data,digest=None):
+        self.data = data
+        if digest is None:
+            digest = hashlib.sha1(data).hexdigest()
+        self.digest = digest
+        self._encoded = None
+
+    @property
+    def encoded(self):
+        """
+        The image in base64, as a vCard PHOTO value with ENCODING=b wants it
+        """
+        if self._encoded is None:
+            self._encoded = base64.b64encode(self.data).decode('ascii')
+        return self._encoded
+
+
+@timed('photos.read')
+def _read_photo(path):
+    with open(path,'rb') as fh:
+        data = fh.read()
+    return (data,hashlib.sha1(data).hexdigest())
+
+
+class PhotoLoader(object):
+    """
+    Read photo files concurrently and share identical images.
+
+    Each path is read once, and paths whose contents are identical load
+    the same Photo.  Use as a context manager, or call close(), to stop
+    the threads.
+    """
+
+    def __init__(self,threads=8):
+        self._pool = ThreadPool(threads)
+        # path -> AsyncResult of _read_photo while it is being read, then
+        # the digest of its contents (None if it could not be read)
+        self._reads = {}
+        # digest -> Photo, for as long as the Photo is in use
+        self._photos = weakref.WeakValueDictionary()
+        # digest -> Photo, for images met more than once
+        self._shared = {}
+        self._seen = set()
+
+    def prefetch(self,path):
+        """
+        Start reading *path* in the background, unless it has been already.
+        """
+        if path not in self._reads:
+            self._reads[path] = self._pool.apply_async(_read_photo,(path,))
+
+    def load(self,path):
+        """
+        Return the Photo in *path*, or None if it cannot be read.
+        """
+        self.prefetch(path)
+        entry = self._reads[path]
+        if entry is None:
+            return None
+        if not hasattr(entry,'get'):
+            photo = self._photos.get(entry)
+            if photo is not None:
+                return photo
+            # the Photo has been let go since: read the file again
+            entry = self._reads[path] = self._pool.apply_async(_read_photo,(path,))
+        try:
+            (data,digest) = entry.get()
+        except (IOError,OSError) as e:
+            logging.warning("Cannot read photo %s: %s",path,e)
+            self._reads[path] = None
+            return None
+        # the bytes are not kept here, only in the Photo
+        self._reads[path] = digest
+        photo = self._photos.get(digest)
+        if photo is None:
+            photo = self._photos[digest] = Photo(data,digest)
+        if digest in self._seen:
+            self._shared[digest] = photo
+        else:
+            self._seen.add(digest)
+        return photo
+
+    def prefetched(self,records,key='photo',window=32):
+        """
+        Yield (record,photo) for each record, reading ahead.
+
+        The photos named by *key* in the next *window* records are read in
+        the background while the current one is handled.  Records without
+        a photo come with None.
+        """
+        pending = collections.deque()
+        for record in records:
+            path = record.get(key)
+            if path is not None:
+                self.prefetch(path)
+            pending.append((record,path))
+            if len(pending) > window:
+                yield self._resolve(*pending.popleft())
+        while pending:
+            yield self._resolve(*pending.popleft())
+
+    def _resolve(self,record,path):
+        if path is None:
+            return (record,None)
+        return (record,self.load(path))
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,3 @@
+"""
+Importing scanned student work into Evernote
+"""
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+A stand-in for the Evernote note store
+
+FakeNoteStore keeps notes in memory and can imitate the service's latency
+and rate limiting, so that imports can be exercised and timed offline.
+It is safe to share between threads.
+"""
+import threading
+import time
+import uuid
+
+from plg.enimport.upload import RATE_LIMIT_REACHED
+
+
+class RateLimitReached(Exception):
+    """
+    Shaped like the EDAMSystemException the service raises for rate limiting
+    """
+
+    def __init__(self,rateLimitDuration):
+        Exception.__init__(self,"rate limit reached; retry in %g seconds" % rateLimitDuration)
+        self.errorCode = RATE_LIMIT_REACHED
+        self.rateLimitDuration = rateLimitDuration
+
+
+class ConnectionDropped(IOError):
+    """
+    The connection dropped before the service's answer arrived
+    """
+
+
+class FakeNotesMetadataList(object):
+
+    def __init__(self,notes,startIndex,totalNotes):
+        self.notes = notes
+        self.startIndex = startIndex
+        self.totalNotes = totalNotes
+
+
+class FakeNotebook(object):
+
+    def __init__(self,name,guid=None):
+        self.name = name
+        self.guid = guid or str(uuid.uuid4())
+
+
+class FakeTag(object):
+
+    def __init__(self,name,guid=None):
+        self.name = name
+        self.guid = guid or str(uuid.uuid4())
+
+
+class FakeNoteStore(object):
+    """
+    An in-memory note store.
+
+    Each call to createNote takes *latency* seconds.  If *rate_limit* is
+    given, at most that many notes are accepted in any *window* seconds; the
+    next one raises RateLimitReached with the time left in the window.
+    The calls numbered in *drop_after_create* (counting from 1) create
+    their note, then raise ConnectionDropped as if the answer were lost.
+
+    >>> store = FakeNoteStore(notebooks=['Calculus'])
+    >>> store.getDefaultNotebook().name
+    'Calculus'
+    >>> class Note(object): pass
+    >>> note = store.createNote(Note())
+    >>> note.guid == store.notes[0].guid
+    True
+    """
+
+    def __init__(self,latency=0.0,rate_limit=None,window=60.0,notebooks=('Default',),tags=(),
+            drop_after_create=()):
+        self.latency = latency
+        self.drop_after_create = set(drop_after_create)
+        self.rate_limit = rate_limit
+        self.window = window
+        self.notebooks = [FakeNotebook(name) for name in notebooks]
+        self.tags = [FakeTag(name) for name in tags]
+        self.notes = []
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._window_start = None
+        self._window_count = 0
+
+    def listNotebooks(self):
+        return list(self.notebooks)
+
+    def getDefaultNotebook(self):
+        return self.notebooks[0]
+
+    def listTags(self):
+        return list(self.tags)
+
+    def _admit(self):
+        if self.rate_limit is None:
+            return
+        now = time.time()
+        if self._window_start is None or now - self._window_start >= self.window:
+            self._window_start = now
+            self._window_count = 0
+        if self._window_count >= self.rate_limit:
+            remaining = self.window - (now - self._window_start)
+            raise RateLimitReached(remaining)
+        self._window_count += 1
+
+    def createNote(self,note):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            self._admit()
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            note.guid = str(uuid.uuid4())
+        except AttributeError:
+            # notes that cannot take a guid (e.g. strings in tests) are kept as is
+            pass
+        with self._lock:
+            self.notes.append(note)
+        if call in self.drop_after_create:
+            raise ConnectionDropped("connection reset by peer")
+        return note
+
+    def findNotesMetadata(self,filter,offset,maxNotes,resultSpec):
+        """
+        The notes of filter.notebookGuid (if set), the last created first:
+        the notes themselves stand for their metadata.
+        """
+        with self._lock:
+            notes = [note for note in reversed(self.notes)
+                if getattr(filter,'notebookGuid',None) in (None,getattr(note,'notebookGuid',None))]
+        return FakeNotesMetadataList(notes[offset:offset + maxNotes],offset,len(notes))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
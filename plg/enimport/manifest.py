@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+A local record of the notes an import has created
+
+The manifest is a SQLite database mapping each uploaded file, by the MD5
+of its contents, the notebook it went to and the student it was for, to
+the GUID of the note that holds it.  Students are kept apart because
+they may hand in identical files (a shared cover sheet, a blank page),
+each of which goes into the student's own note.  Each upload is
+committed as soon as it succeeds, so after an interrupted run the next
+one can skip everything already done and pick up where the last one
+failed.
+"""
+import sqlite3
+import time
+
+
+class UploadManifest(object):
+    """
+    The uploads recorded in the SQLite database *path*.
+
+    >>> manifest = UploadManifest(':memory:')
+    >>> manifest.lookup('9e107d9d372bb6826bd81d3542a419d6','nb-guid','jfk35') is None
+    True
+    >>> manifest.record('9e107d9d372bb6826bd81d3542a419d6','nb-guid','note-guid',
+    ...     'quiz_001.pdf','Quiz 1 for John Kennedy',student='jfk35')
+    >>> print(manifest.lookup('9e107d9d372bb6826bd81d3542a419d6','nb-guid','jfk35'))
+    note-guid
+    >>> manifest.lookup('9e107d9d372bb6826bd81d3542a419d6','nb-guid','jqa6') is None
+    True
+    >>> manifest.lookup('9e107d9d372bb6826bd81d3542a419d6','other-notebook','jfk35') is None
+    True
+    >>> len(manifest)
+    1
+
+    With *readonly*, the database (which must exist) is only read, as
+    for a dry run: nothing can be recorded, and no table is created.
+    """
+
+    def __init__(self,path,readonly=False):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        if readonly:
+            self._db.execute('PRAGMA query_only = ON')
+            return
+        self._db.execute('''CREATE TABLE IF NOT EXISTS uploads (
+            md5 TEXT NOT NULL,
+            notebook TEXT NOT NULL,
+            student TEXT NOT NULL,
+            note TEXT NOT NULL,
+            filename TEXT,
+            title TEXT,
+            uploaded REAL,
+            PRIMARY KEY (md5,notebook,student))''')
+        self._db.commit()
+
+    def lookup(self,md5,notebook,student=None):
+        """
+        Return the GUID of the note holding the file with digest *md5* for
+        *student* in *notebook* (a GUID), or None if it has not been
+        uploaded there for them.
+        """
+        try:
+            row = self._db.execute('SELECT note FROM uploads WHERE md5 = ? AND notebook = ? AND student = ?',
+                (md5,notebook,student or '')).fetchone()
+        except sqlite3.OperationalError:
+            # a read-only manifest that nothing has been recorded in
+            if self._has_uploads():
+                raise
+            return None
+        if row is None:
+            return None
+        return row[0]
+
+    def record(self,md5,notebook,note,filename=None,title=None,student=None):
+        """
+        Record that the file with digest *md5* for *student* is now in the
+        note with GUID *note* in *notebook*.
+        """
+        self._db.execute('INSERT OR REPLACE INTO uploads VALUES (?,?,?,?,?,?,?)',
+            (md5,notebook,student or '',note,filename,title,time.time()))
+        self._db.commit()
+
+    def _has_uploads(self):
+        return self._db.execute("SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'uploads'").fetchone()[0] > 0
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM uploads').fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+What every note of an import shares, worked out once per run
+
+A NotePlan holds the notebook GUID, the title, tags and timestamps common
+to all the notes of a run, and the ENML skeleton, so that making each note
+(with build_note) only adds the student's name and tag and the attached
+files.  Notebook and
+tag GUIDs are looked up on the service at most once and remembered across
+runs in a GuidCache.
+
+Each note carries a token of its own, so that find_note can tell whether
+it was created when an upload fails without an answer from the service.
+"""
+import calendar
+import errno
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+import uuid
+
+#: The ENML document around a note's content
+ENML_TEMPLATE = ('<?xml version="1.0" encoding="UTF-8"?>'
+    '<!DOCTYPE en-note SYSTEM "http://xml.evernote.com/pub/enml2.dtd">'
+    '<en-note>%s</en-note>')
+
+#: How an attachment is shown in ENML
+MEDIA_TEMPLATE = '<en-media type="%s" hash="%s"/>'
+
+#: The sourceApplication of the notes made, before each note's token
+SOURCE_APPLICATION = 'plg.enimport'
+
+#: How many of the notebook's latest notes find_note looks through
+FIND_WINDOW = 100
+
+
+def note_content(media):
+    """
+    Return the ENML of a note showing the attachments in *media*, a list of
+    (mime_type,hex_digest) pairs.
+
+    >>> print(note_content([('application/pdf','9e107d9d372bb6826bd81d3542a419d6')]))
+    <?xml version="1.0" encoding="UTF-8"?><!DOCTYPE en-note SYSTEM "http://xml.evernote.com/pub/enml2.dtd"><en-note><en-media type="application/pdf" hash="9e107d9d372bb6826bd81d3542a419d6"/></en-note>
+    """
+    return ENML_TEMPLATE % ''.join(MEDIA_TEMPLATE % pair for pair in media)
+
+
+def timestamp(dt):
+    """
+    Return the Evernote Timestamp (milliseconds since the epoch) of the
+    datetime *dt*; naive datetimes are taken to be in local time.
+
+    >>> from datetime import datetime
+    >>> timestamp(datetime(2014,10,1,12,0)) == time.mktime((2014,10,1,12,0,0,0,0,-1)) * 1000
+    True
+    """
+    if dt.utcoffset() is None:
+        seconds = time.mktime(dt.timetuple())
+    else:
+        seconds = calendar.timegm((dt - dt.utcoffset()).timetuple())
+    return int(seconds) * 1000 + dt.microsecond // 1000
+
+
+def default_cache_file():
+    """
+    The GUID cache used when none is given.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),'.cache')
+    return os.path.join(base,'plg','enimport','guids.json')
+
+
+class GuidCache(object):
+    """
+    Notebook and tag GUIDs by name, saved in the JSON file *path*.
+
+    Each account (identified by a hash of *account*, such as the
+    authentication token, which is not itself stored) has its own entries.
+
+    >>> cache = GuidCache(None,'token')
+    >>> cache.get('tags','course: Calculus') is None
+    True
+    >>> cache.set('tags','course: Calculus','tag-guid')
+    >>> print(cache.get('tags','course: Calculus'))
+    tag-guid
+    """
+
+    def __init__(self,path,account):
+        self.path = path
+        self.account = hashlib.sha1(account.encode('utf-8')).hexdigest()
+        self._data = {}
+        self._dirty = False
+        if path is not None:
+            try:
+                with open(path) as fh:
+                    self._data = json.load(fh)
+            except (IOError,OSError):
+                pass
+            except ValueError:
+                logging.warning("Ignoring unreadable GUID cache %s",path)
+        self._entries = self._data.setdefault(self.account,{})
+
+    def get(self,kind,name):
+        guid = self._entries.get(kind,{}).get(name)
+        if guid is None:
+            return None
+        # json gives unicode under Python 2, which Thrift may not take
+        return str(guid)
+
+    def set(self,kind,name,guid):
+        self._entries.setdefault(kind,{})[name] = guid
+        self._dirty = True
+
+    def clear(self):
+        """
+        Forget this account's entries.
+        """
+        self._entries.clear()
+        self._dirty = True
+
+    def save(self):
+        """
+        Write the cache back to its file, if it has changed.
+        """
+        if self.path is None or not self._dirty:
+            return
+        directory = os.path.dirname(self.path) or os.curdir
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        (fd,temp) = tempfile.mkstemp(dir=directory,suffix='.tmp')
+        with os.fdopen(fd,'w') as fh:
+            json.dump(self._data,fh,indent=1,sort_keys=True)
+        os.rename(temp,self.path)
+        self._dirty = False
+
+
+def resolve_notebook(note_store,name,cache):
+    """
+    Return the GUID of the notebook called *name* (or of the default
+    notebook, if *name* is None), asking *note_store* only if *cache* does
+    not know it.  Raise KeyError if there is no such notebook.
+    """
+    key = name if name is not None else ''
+    guid = cache.get('notebooks',key)
+    if guid is not None:
+        logging.debug("Notebook '%s' has cached guid %s",key,guid)
+        return guid
+    if name is None:
+        notebook = note_store.getDefaultNotebook()
+    else:
+        for notebook in note_store.listNotebooks():
+            logging.debug("Notebook: name='%s' guid=%s",notebook.name,notebook.guid)
+            if notebook.name == name:
+                break
+        else:
+            raise KeyError(name)
+    cache.set('notebooks',key,notebook.guid)
+    return notebook.guid
+
+
+def resolve_tags(note_store,names,cache):
+    """
+    Split the tag *names* into (guids,unknown): the GUIDs of the tags that
+    exist, and the names of those that do not yet.  The service is asked
+    for its tags at most once, and only if *cache* is missing some.
+    """
+    guids = []
+    missing = []
+    for name in names:
+        guid = cache.get('tags',name)
+        if guid is None:
+            missing.append(name)
+        else:
+            guids.append(guid)
+    unknown = []
+    if missing:
+        # tag names are unique without regard to case
+        existing = dict((tag.name.lower(),tag.guid) for tag in note_store.listTags())
+        for name in missing:
+            guid = existing.get(name.lower())
+            if guid is None:
+                unknown.append(name)
+            else:
+                cache.set('tags',name,guid)
+                guids.append(guid)
+    return (guids,unknown)
+
+
+class NotePlan(object):
+    """
+    The parts shared by every note of a run.
+
+    >>> plan = NotePlan('nb-guid','Quiz 1','Calculus I','Fall 2014',created=1412164800000)
+    >>> print(plan.title('John Kennedy'))
+    Quiz 1 for John Kennedy from Calculus I, Fall 2014
+    >>> plan.tag_names
+    ['student work', 'term: Fall 2014', 'course: Calculus I']
+    """
+    __slots__ = ('notebook_guid','_title_prefix','_title_suffix','tag_guids','tag_names',
+        'created','updated')
+
+    def __init__(self,notebook_guid,doc_name,course,term=None,tags=(),created=None,updated=None):
+        self.notebook_guid = notebook_guid
+        self._title_prefix = "%s for " % (doc_name,)
+        self._title_suffix = " from %s" % (course,)
+        self.tag_guids = []
+        self.tag_names = list(tags)
+        self.tag_names.append('student work')
+        if term:
+            self._title_suffix += ", " + term
+            self.tag_names.append('term: ' + term)
+        self.tag_names.append('course: ' + course)
+        if updated is None:
+            updated = int(time.time() * 1000)
+        self.updated = updated
+        self.created = created if created is not None else updated
+
+    def title(self,student_name):
+        return self._title_prefix + student_name + self._title_suffix
+
+    def record_title(self,record):
+        """
+        The title of the note for *record*, a (filename,netid,Last__First_Names)
+        row from enimport's CSV.
+
+        >>> NotePlan(None,'Quiz 1','Calculus I').record_title(('q.pdf','jqa6','Adams__John_Quincy'))
+        'Quiz 1 for John Quincy Adams from Calculus I'
+        """
+        (student_lname,student_gnames) = record[2].split('__')
+        return self.title("%s %s" % (student_gnames.replace('_',' '),student_lname))
+
+    def record_tag(self,record):
+        """
+        The name of the student's own tag for *record*.
+
+        >>> NotePlan(None,'Quiz 1','Calculus I').record_tag(('q.pdf','jqa6','Adams__John_Quincy'))
+        'student: Adams; John Quincy <jqa6@nyu.edu>'
+        """
+        (student_lname,student_gnames) = record[2].split('__')
+        return "student: %s; %s <%s@nyu.edu>" % (student_lname,student_gnames.replace('_',' '),record[1])
+
+    def resolve_tags(self,note_store,cache):
+        """
+        Refer to the tags that already exist by GUID.
+        """
+        (guids,self.tag_names) = resolve_tags(note_store,self.tag_names,cache)
+        self.tag_guids.extend(guids)
+
+    def build_note(self,batch):
+        """
+        Make the note for a batch of (record,scanned) pairs, where each
+        record is a (filename,netid,Last__First_Names) row from enimport's
+        CSV, all for the same student, with each record's file attached.
+
+        Each file's ScannedFile already has its size and digest, so its bytes
+        are read only here, once, and are not hashed again.
+        """
+        # the SDK is slow to import, so it is left until a note is needed
+        import evernote.edam.type.ttypes as Types
+
+        # To create a new note, simply create a new Note object and fill in
+        # attributes such as the note's title.
+        note = Types.Note()
+        note.notebookGuid = self.notebook_guid
+        note.title = self.record_title(batch[0][0])
+        note.tagGuids = list(self.tag_guids)
+        note.tagNames = self.tag_names + [self.record_tag(batch[0][0])]
+        note.created = self.created
+        note.updated = self.updated
+        logging.debug("note.title: '%s'", note.title)
+        # a token of the note's own, for find_note
+        note.attributes = Types.NoteAttributes()
+        note.attributes.sourceApplication = '%s %s' % (SOURCE_APPLICATION,uuid.uuid4().hex)
+        ## TODO: add some more attributes with the NoteAttributes type
+        # https://dev.evernote.com/doc/reference/Types.html#Struct_NoteAttributes
+        # latitude
+        # longitude
+        # altitude
+        # author - student <email>
+        # source - progname
+        # placeName - "CIMS"? "Work"?
+
+        # To include an attachment such as an image in a note, first create a Resource
+        # for the attachment. At a minimum, the Resource contains the binary attachment
+        # data, an MD5 hash of the binary data, and the attachment MIME type.
+        # It can also include attributes such as filename and location.
+        note.resources = []
+        media = []
+        attached = set()
+        for (rec,scanned) in batch:
+            if scanned.digest in attached:
+                # the same file twice: attach and show it once
+                continue
+            attached.add(scanned.digest)
+            data = Types.Data()
+            data.size = scanned.size
+            data.bodyHash = scanned.digest
+            data.body = scanned.read()
+
+            resource = Types.Resource()
+            (resource.mime,encoding) = mimetypes.guess_type(rec[0])
+            resource.data = data
+
+            # adding a file name to the resource with a ResourceAttributes type.
+            resource_attributes=Types.ResourceAttributes()
+            resource_attributes.fileName=note.title
+            if len(batch) > 1:
+                resource_attributes.fileName += " (%d)" % (len(note.resources) + 1)
+            resource_attributes.fileName += mimetypes.guess_extension(resource.mime)
+            resource.attributes=resource_attributes
+
+            # Now, add the new Resource to the note's list of resources
+            note.resources.append(resource)
+            media.append((resource.mime,scanned.hexdigest))
+
+        # To display the Resources as part of the note's content, include an
+        # <en-media> tag for each in the note's ENML content. The en-media tag
+        # identifies the corresponding Resource using the MD5 hash.  The content
+        # of an Evernote note is represented using Evernote Markup Language
+        # (ENML). The full ENML specification can be found in the Evernote API
+        # Overview at http://dev.evernote.com/documentation/cloud/chapters/ENML.php
+        note.content = note_content(media)
+
+        return note
+
+    def find_note(self,note_store,note):
+        """
+        Return the metadata (GUID, title and attributes) of the note in the
+        notebook that carries the token of *note*, a note made by
+        build_note, or None if there is none: an Uploader's recover.
+
+        The notebook's notes are listed by update sequence number, latest
+        first, so a note created moments ago comes among the first
+        FIND_WINDOW, without waiting for it to be indexed for search.
+        """
+        from evernote.edam.notestore import NoteStore
+        import evernote.edam.type.ttypes as Types
+        token = note.attributes.sourceApplication
+        note_filter = NoteStore.NoteFilter(notebookGuid=self.notebook_guid,
+            order=Types.NoteSortOrder.UPDATE_SEQUENCE_NUMBER,ascending=False)
+        spec = NoteStore.NotesMetadataResultSpec(includeTitle=True,includeAttributes=True)
+        found = note_store.findNotesMetadata(note_filter,0,FIND_WINDOW,spec)
+        for metadata in found.notes:
+            if metadata.attributes is not None and metadata.attributes.sourceApplication == token:
+                return metadata
+        return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Size and hash files before uploading them
+
+Scans can run to hundreds of megabytes, so each file is hashed through a
+memory map (or, failing that, a chunk at a time) instead of being read
+whole.  Every file is sized (which takes only a stat) before any is
+hashed, so a file too big for the service is reported before any time is
+spent on the rest; then every file is hashed before any upload, so that
+building a note only needs the file's bytes once.
+"""
+import binascii
+import hashlib
+import mmap
+import os
+
+from plg.utils.decorators import memoize
+from plg.utils.timing import timed
+
+#: The largest attachment a free Evernote account may upload
+#: (EDAM_RESOURCE_SIZE_MAX_FREE; not imported, as the SDK is slow to load)
+RESOURCE_SIZE_MAX = 25 * 1024 * 1024
+
+#: Bytes hashed at a time when a file cannot be mapped
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ScannedFile(object):
+    """
+    The size and MD5 digest of a file.
+
+    >>> import tempfile
+    >>> (fd,filename) = tempfile.mkstemp()
+    >>> with os.fdopen(fd,'wb') as fh:
+    ...     _ = fh.write(b'The quick brown fox jumps over the lazy dog')
+    >>> scanned = scan_file(filename)
+    >>> scanned.size
+    43
+    >>> print(scanned.hexdigest)
+    9e107d9d372bb6826bd81d3542a419d6
+    >>> os.remove(filename)
+    """
+    __slots__ = ('filename','size','digest')
+
+    def __init__(self,filename,size,digest):
+        self.filename = filename
+        self.size = size
+        self.digest = digest
+
+    @property
+    def hexdigest(self):
+        return binascii.hexlify(self.digest).decode('ascii')
+
+    def read(self):
+        """
+        Return the contents of the file.
+        """
+        with open(self.filename,'rb') as fh:
+            return fh.read()
+
+
+def _scan_key(filename):
+    stat = os.stat(filename)
+    return (os.path.abspath(filename),stat.st_size,stat.st_mtime)
+
+
+@memoize(maxsize=4096,key=_scan_key)
+@timed('enimport.scan')
+def scan_file(filename):
+    """
+    Return the ScannedFile for *filename*.
+
+    A file named more than once (a cover sheet shared by every student,
+    say) is only hashed again if it has changed in the meantime.
+    """
+    md5 = hashlib.md5()
+    with open(filename,'rb') as fh:
+        size = os.fstat(fh.fileno()).st_size
+        try:
+            view = mmap.mmap(fh.fileno(),0,access=mmap.ACCESS_READ)
+        except (mmap.error,ValueError):
+            # empty, or not a regular file
+            view = None
+        if view is not None:
+            try:
+                md5.update(view)
+            finally:
+                view.close()
+        else:
+            size = 0
+            while True:
+                chunk = fh.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                md5.update(chunk)
+                size += len(chunk)
+    return ScannedFile(filename,size,md5.digest())
+
+
+def oversized(filenames,max_size=RESOURCE_SIZE_MAX):
+    """
+    Return (filename,size) for those of *filenames* bigger than *max_size*
+    bytes, without reading any of them.
+    """
+    sizes = ((filename,os.stat(filename).st_size) for filename in filenames)
+    return [(filename,size) for (filename,size) in sizes if size > max_size]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
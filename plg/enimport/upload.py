@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+Upload notes to Evernote concurrently
+
+An Uploader sends notes from a bounded pool of threads, each with its own
+note store connection (Thrift clients are not thread-safe).  When the
+service answers with its rate-limit error, every worker holds off for the
+duration the service asked for before trying again.  Results come back in
+the order the notes were given.
+
+Any other error from the service means the note was rejected, and it is
+not sent again.  An error without an answer from the service (a dropped
+connection, a timeout) leaves it unknown whether the note was created:
+such a note is sent again, with exponential backoff, only if the caller's
+recover function looks for it and does not find it.  Without recover,
+it is not retried, since sending it again could make a duplicate.
+
+Errors are recognized by their errorCode and rateLimitDuration attributes,
+so this module works without the Evernote SDK (for example against a
+FakeNoteStore).
+"""
+import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from plg.utils.timing import span
+
+#: EDAMErrorCode.RATE_LIMIT_REACHED
+RATE_LIMIT_REACHED = 19
+
+
+def rate_limit_duration(error):
+    """
+    Return how many seconds to wait if *error* is the rate-limit error, else None.
+    """
+    if getattr(error,'errorCode',None) == RATE_LIMIT_REACHED:
+        return getattr(error,'rateLimitDuration',None) or 0
+    return None
+
+
+def is_retryable(error):
+    """
+    Whether sending the same note again might succeed.
+
+    Errors from the service itself (which carry an errorCode) mean the note
+    was rejected and will be again; anything else, such as a dropped
+    connection, is worth another try, once it is known that the note was
+    not created after all.
+    """
+    return getattr(error,'errorCode',None) is None
+
+
+class UploadResult(object):
+    """
+    The outcome of uploading one item: the note created, or the error.
+    """
+    __slots__ = ('item','note','error','attempts')
+
+    def __init__(self,item,note=None,error=None,attempts=0):
+        self.item = item
+        self.note = note
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Uploader(object):
+    """
+    Create notes from a pool of worker threads.
+
+    *note_store_factory* is called once in each worker to get its note store
+    (EvernoteClient.get_note_store makes a new connection each time).
+    *build*, if given, turns each item into the note to send; it runs in the
+    worker, so at most one note per worker is in memory at a time.
+    *recover*, if given, is called as recover(note_store,note) after an
+    error that left the note's fate unknown, and returns the note if it
+    was created after all, or None if it was not (so that it is sent
+    again).
+
+    >>> from plg.enimport.fake import FakeNoteStore
+    >>> store = FakeNoteStore(rate_limit=3,window=0.1)
+    >>> uploader = Uploader(lambda: store,workers=2)
+    >>> results = list(uploader.upload(['note %d' % i for i in range(5)]))
+    >>> [result.item for result in results if result.ok]
+    ['note 0', 'note 1', 'note 2', 'note 3', 'note 4']
+    >>> sorted(store.notes)
+    ['note 0', 'note 1', 'note 2', 'note 3', 'note 4']
+    """
+
+    def __init__(self,note_store_factory,build=None,recover=None,workers=4,max_retries=3,backoff=1.0):
+        self.note_store_factory = note_store_factory
+        self.build = build
+        self.recover = recover
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # no worker sends before this time
+        self._resume_at = 0
+
+    def _note_store(self):
+        try:
+            return self._local.note_store
+        except AttributeError:
+            note_store = self._local.note_store = self.note_store_factory()
+            return note_store
+
+    def _hold(self,seconds):
+        """
+        Keep every worker from sending for *seconds*.
+        """
+        with self._lock:
+            self._resume_at = max(self._resume_at,time.time() + seconds)
+
+    def _wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.time()
+            if delay <= 0:
+                return
+            with span('enimport.wait'):
+                time.sleep(delay)
+
+    def _upload(self,item):
+        result = UploadResult(item)
+        try:
+            with span('enimport.build'):
+                note = item if self.build is None else self.build(item)
+        except Exception as e:
+            result.error = e
+            return result
+        failures = 0
+        while True:
+            self._wait()
+            result.attempts += 1
+            try:
+                with span('enimport.upload'):
+                    result.note = self._note_store().createNote(note)
+                return result
+            except Exception as e:
+                duration = rate_limit_duration(e)
+                if duration is not None:
+                    logging.warning("Rate limit reached, waiting %g seconds",duration)
+                    self._hold(duration)
+                    continue
+                failures += 1
+                if failures > self.max_retries or not is_retryable(e) or self.recover is None:
+                    result.error = e
+                    return result
+                try:
+                    with span('enimport.recover'):
+                        created = self.recover(self._note_store(),note)
+                except Exception as recover_error:
+                    logging.warning("Upload failed (%s), and cannot tell whether the note was created: %s",
+                        e,recover_error)
+                    result.error = e
+                    return result
+                if created is not None:
+                    logging.info("Upload failed (%s), but the note was created",e)
+                    result.note = created
+                    return result
+                delay = self.backoff * 2 ** (failures - 1)
+                logging.warning("Upload failed (%s), retrying in %g seconds",e,delay)
+                with span('enimport.wait'):
+                    time.sleep(delay)
+
+    def upload(self,items):
+        """
+        Send every item, yielding an UploadResult for each in input order.
+        """
+        if self.workers <= 1:
+            for item in items:
+                yield self._upload(item)
+            return
+        pool = ThreadPool(self.workers)
+        try:
+            for result in pool.imap(self._upload,items):
+                yield result
+            pool.close()
+        except:
+            # notes not yet started are not sent
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
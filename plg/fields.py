@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Exporters for form field choices
+
+Each exporter writes a list of (value,label) choices, such as the students
+of a roster for an Acrobat combo box, straight to its output as the choices
+arrive: as combo box options, FDF or XFDF form data, or JSON.  A FieldExporters object feeds several exporters at once, so one
+pass over a roster produces every format.
+
+>>> import io
+>>> combo = io.StringIO()
+>>> json_list = io.StringIO()
+>>> with FieldExporters([ComboBoxExporter(combo),JSONExporter(json_list)]) as exporters:
+...     exporters.write(u'jfk35',u'John Kennedy',email=u'jfk35@nyu.edu')
+...     exporters.write(u'jqa6',u'John Quincy Adams')
+>>> print(combo.getvalue().strip())
+[(jfk35)(John Kennedy)][(jqa6)(John Quincy Adams)]
+>>> import json
+>>> json.loads(json_list.getvalue())[0]['email'] == u'jfk35@nyu.edu'
+True
+"""
+import binascii
+import json
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+from plg.utils.timing import span
+
+
+def _pdf_string(text):
+    """
+    Return *text* as a PDF string object.
+
+    >>> print(_pdf_string(u'Smith (Jr.)'))
+    (Smith \\(Jr.\\))
+    >>> print(_pdf_string(u'Jos\\xe9'))
+    <FEFF004A006F007300E9>
+    """
+    if isinstance(text,bytes):
+        text = text.decode('utf-8')
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        return u'<FEFF%s>' % binascii.hexlify(text.encode('utf-16-be')).decode('ascii').upper()
+    return u'(%s)' % text.replace(u'\\',u'\\\\').replace(u'(',u'\\(').replace(u')',u'\\)')
+
+
+def _xml_text(text,quote=False):
+    """
+    Return *text* escaped for XML, with anything outside ASCII as a
+    character reference (so that it can be written to any file).
+
+    >>> print(_xml_text(u'Jos\xe9 <Pepe> & Co'))
+    Jos&#233; &lt;Pepe&gt; &amp; Co
+    >>> print(_xml_text(u'st"1',quote=True))
+    'st"1'
+    """
+    if isinstance(text,bytes):
+        text = text.decode('utf-8')
+    text = quoteattr(text) if quote else escape(text)
+    return text.encode('ascii','xmlcharrefreplace').decode('ascii')
+
+
+class FieldExporter(object):
+    """
+    Base class for exporters.
+
+    *output* is a file name, '-' for standard output, or an open file
+    (which is left open).  Subclasses write their preamble in begin(), each
+    choice in write(), and their closing text in end().
+    """
+
+    def __init__(self,output):
+        if output == '-':
+            self._fh = sys.stdout
+            self._owned = False
+        elif hasattr(output,'write'):
+            self._fh = output
+            self._owned = False
+        else:
+            self._fh = open(output,'w')
+            self._owned = True
+
+    def begin(self):
+        pass
+
+    def write(self,value,label,**info):
+        raise NotImplementedError
+
+    def end(self):
+        pass
+
+    def close(self):
+        if self._owned:
+            self._fh.close()
+        else:
+            self._fh.flush()
+
+
+class ComboBoxExporter(FieldExporter):
+    """
+    The options of an Acrobat combo box, as [(value)(label)] pairs on one line
+    """
+
+    def write(self,value,label,**info):
+        # no u'' here, so that byte strings stay byte strings under Python 2
+        self._fh.write("[(%s)(%s)]" % (value,label))
+
+    def end(self):
+        self._fh.write(u"\n")
+
+
+class FDFExporter(FieldExporter):
+    """
+    An FDF file setting the options (/Opt) of the form field *field_name*
+    """
+
+    def __init__(self,output,field_name='student'):
+        FieldExporter.__init__(self,output)
+        self.field_name = field_name
+
+    def begin(self):
+        self._fh.write(u"%%FDF-1.2\n1 0 obj\n<< /FDF << /Fields [ << /T %s /Opt [\n"
+            % _pdf_string(self.field_name))
+
+    def write(self,value,label,**info):
+        self._fh.write(u"[%s %s]\n" % (_pdf_string(value),_pdf_string(label)))
+
+    def end(self):
+        self._fh.write(u"] >> ] >> >>\nendobj\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n")
+
+
+class XFDFExporter(FieldExporter):
+    """
+    An XFDF file filling the fields *field_name*.0, *field_name*.1, ... of
+    a form with a row per student, with the labels in order
+
+    XFDF sets field values only, so it cannot give a combo box its
+    options the way FDFExporter does; it suits forms such as sign-in
+    sheets, with a text field for each student instead.
+    """
+
+    def __init__(self,output,field_name='student'):
+        FieldExporter.__init__(self,output)
+        self.field_name = field_name
+
+    def begin(self):
+        self._fh.write(u'<?xml version="1.0" encoding="UTF-8"?>\n'
+            u'<xfdf xmlns="http://ns.adobe.com/xfdf/" xml:space="preserve">\n'
+            u'<fields>\n<field name=%s>\n' % _xml_text(self.field_name,quote=True))
+        self.count = 0
+
+    def write(self,value,label,**info):
+        self._fh.write(u'<field name="%d"><value>%s</value></field>\n' % (self.count,_xml_text(label)))
+        self.count += 1
+
+    def end(self):
+        self._fh.write(u'</field>\n</fields>\n</xfdf>\n')
+
+
+class JSONExporter(FieldExporter):
+    """
+    A JSON array with one object per choice: its value, label and other info
+    """
+
+    def begin(self):
+        self._fh.write(u"[")
+        self.count = 0
+
+    def write(self,value,label,**info):
+        info['value'] = value
+        info['label'] = label
+        if self.count:
+            self._fh.write(u",")
+        self._fh.write(u"\n" + json.dumps(info,sort_keys=True))
+        self.count += 1
+
+    def end(self):
+        self._fh.write(u"\n]\n")
+
+
+class FieldExporters(object):
+    """
+    Several exporters fed together, in one pass
+    """
+
+    def __init__(self,exporters):
+        self.exporters = list(exporters)
+        for exporter in self.exporters:
+            exporter.begin()
+
+    def write(self,value,label,**info):
+        with span('fields.write'):
+            for exporter in self.exporters:
+                exporter.write(value,label,**info)
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.end()
+            exporter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+A column-oriented store for large rosters
+
+A ColumnarRoster keeps one array per Student field instead of one object
+per student.  Each column is dictionary-encoded: the distinct values of
+the field are stored once and every row holds a small integer code.
+Filtering compares codes and sorting ranks codes, so both run over
+machine integers, and Student objects are only built when asked for.
+"""
+from array import array
+from functools import partial
+from itertools import compress, count
+from operator import eq
+
+try:
+    from itertools import imap as map
+except ImportError:  # Python 3
+    pass
+
+from plg.model.enrollment import Student
+
+#: The Student fields stored, in constructor order
+STUDENT_FIELDS = ('last_name','first_name','other_names','phone_number',
+    'email_address','program','status','student_id')
+
+
+class Column(object):
+    """
+    A dictionary-encoded column.
+
+    >>> column = Column(['Enrolled','Dropped','Enrolled'])
+    >>> list(column.codes)
+    [0, 1, 0]
+    >>> column.values
+    ['Enrolled', 'Dropped']
+    >>> column[2]
+    'Enrolled'
+    """
+
+    def __init__(self,items=()):
+        self.values = []
+        self.codes = array('i')
+        self._lookup = {}
+        # whether values and _lookup may be another column's too (see take)
+        self._shared = False
+        for item in items:
+            self.append(item)
+
+    def code(self,value):
+        """
+        The code for *value*, or None if no row has it.
+        """
+        return self._lookup.get(value)
+
+    def append(self,value):
+        try:
+            code = self._lookup[value]
+        except KeyError:
+            if self._shared:
+                # copy the dictionary before adding to it
+                self.values = list(self.values)
+                self._lookup = dict(self._lookup)
+                self._shared = False
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self,row):
+        return self.values[self.codes[row]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ranks(self):
+        """
+        Return an array giving the sort position of each code's value.
+
+        Missing values (None) sort first.
+        """
+        order = sorted(range(len(self.values)),
+            key=lambda code: (self.values[code] is not None,self.values[code]))
+        ranks = array('i',[0]) * len(order)
+        for (rank,code) in enumerate(order):
+            ranks[code] = rank
+        return ranks
+
+    def take(self,rows):
+        """
+        Return a new column holding *rows* of this one, sharing its values.
+
+        The two share the dictionary until either is given a value new to
+        it, which it then adds to a copy of its own.
+
+        >>> column = Column(['Enrolled','Dropped'])
+        >>> taken = column.take([1])
+        >>> taken.append('Waitlisted')
+        >>> column.values
+        ['Enrolled', 'Dropped']
+        """
+        column = Column()
+        column.values = self.values
+        column._lookup = self._lookup
+        column._shared = self._shared = True
+        column.codes = array('i',map(self.codes.__getitem__,rows))
+        return column
+
+    def __getstate__(self):
+        # the lookup table is rebuilt from the values
+        return (self.values,self.codes)
+
+    def __setstate__(self,state):
+        (self.values,self.codes) = state
+        self._lookup = dict((value,code) for (code,value) in enumerate(self.values))
+        self._shared = False
+
+
+class ColumnarRoster(object):
+    """ A roster stored by column.
+
+    It offers the same add_student/lookup_student interface as Roster, but
+    indexing it or iterating over it builds Student objects on demand.
+    Those are copies: changing one does not change the roster.
+
+    >>> roster = ColumnarRoster()
+    >>> roster.add_student(Student('Kennedy','John',status='Enrolled'))
+    >>> roster.add_student(Student('Adams','John','Quincy',status='Dropped'))
+    >>> roster.add_student(Student('Adams','Samuel',status='Enrolled'))
+    >>> len(roster)
+    3
+    >>> [s.formatted_full_name for s in roster.filter(status='Enrolled')]
+    ['Kennedy, John', 'Adams, Samuel']
+    >>> [s.formatted_full_name for s in roster.sorted('last_name','first_name')]
+    ['Adams, John Quincy', 'Adams, Samuel', 'Kennedy, John']
+    >>> roster.lookup_student('other_names','Quincy').last_name
+    'Adams'
+    """
+
+    def __init__(self,section=None,students=None,fields=STUDENT_FIELDS):
+        self.section = section
+        self.fields = tuple(fields)
+        self.columns = dict((field,Column()) for field in self.fields)
+        if students is not None:
+            for student in students:
+                self.add_student(student)
+
+    @classmethod
+    def from_roster(cls,roster):
+        """
+        Build a columnar copy of a Roster.
+        """
+        return cls(section=roster.section,students=roster.students)
+
+    def add_student(self,student):
+        """
+        Add a student to the roster, one value to each column.
+        """
+        for field in self.fields:
+            self.columns[field].append(getattr(student,field))
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]])
+
+    def __getitem__(self,row):
+        return Student(**dict((field,self.columns[field][row]) for field in self.fields))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def students(self):
+        """
+        A list of every student on the roster
+        """
+        return list(self)
+
+    def select(self,field,*values):
+        """
+        Return an array of the rows whose *field* has any of *values*.
+        """
+        column = self.columns[field]
+        codes = set(column.code(value) for value in values)
+        codes.discard(None)
+        if not codes:
+            return array('i')
+        if len(codes) == 1:
+            matches = map(partial(eq,codes.pop()),column.codes)
+        else:
+            matches = map(codes.__contains__,column.codes)
+        return array('i',compress(count(),matches))
+
+    def argsort(self,*fields):
+        """
+        Return an array of rows in order of *fields* (a stable sort).
+        """
+        rows = list(range(len(self)))
+        for field in reversed(fields):
+            column = self.columns[field]
+            keys = list(map(column.ranks().__getitem__,column.codes))
+            rows.sort(key=keys.__getitem__)
+        return array('i',rows)
+
+    def take(self,rows):
+        """
+        Return a new roster holding *rows* of this one, in that order.
+
+        The new roster shares the value dictionaries of this one.
+        """
+        roster = ColumnarRoster(section=self.section,fields=self.fields)
+        for field in self.fields:
+            roster.columns[field] = self.columns[field].take(rows)
+        return roster
+
+    def filter(self,**criteria):
+        """
+        Return a new roster of the students matching every criterion.
+
+        Each keyword names a field and gives the value it must have.
+        """
+        rows = None
+        for (field,value) in criteria.items():
+            selected = self.select(field,value)
+            if rows is not None:
+                keep = set(selected)
+                selected = array('i',[row for row in rows if row in keep])
+            rows = selected
+        if rows is None:
+            rows = range(len(self))
+        return self.take(rows)
+
+    def sorted(self,*fields):
+        """
+        Return a new roster sorted by *fields*.
+        """
+        return self.take(self.argsort(*fields))
+
+    def lookup_students(self,field,value):
+        """
+        Return the list of all students whose *field* equals *value*.
+        """
+        return [self[row] for row in self.select(field,value)]
+
+    def lookup_student(self,field,value):
+        """
+        Return the one student whose *field* equals *value*.
+
+        Raise KeyError if there is no such student and ValueError if
+        there is more than one.
+        """
+        rows = self.select(field,value)
+        if not rows:
+            raise KeyError(value)
+        if len(rows) > 1:
+            raise ValueError("%d students have %s=%r" % (len(rows),field,value))
+        return self[rows[0]]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
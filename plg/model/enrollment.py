@@ -2,17 +2,68 @@
 """
 PLG data model for students and courses
 """
+import bisect
+import collections
 import datetime
+import locale
+import operator
+import weakref
 
-class Student:
+
+def collation_key(text):
+    """
+    The key sorting *text* by the rules of the current LC_COLLATE locale.
+    
+    Python starts in the C locale, which sorts by code point; a program
+    sorting for people should first call
+    ``locale.setlocale(locale.LC_COLLATE,'')``.  A missing name (None)
+    sorts as an empty one.
+    """
+    if text is None:
+        text = ''
+    try:
+        return locale.strxfrm(text)
+    except UnicodeError:
+        # Python 2 only transforms byte strings
+        return locale.strxfrm(text.encode(locale.getlocale(locale.LC_COLLATE)[1] or 'utf-8'))
+
+
+class Student(object):
     """A student"""
-    def __init__(self,last_name,first_name,other_names=None,phone_number=None,email_address=None):
-        """ constructor """
+    __slots__ = ('last_name','first_name','other_names','phone_number',
+        'email_address','program','status','student_id','_preferred_first_name','_names')
+    
+    def __init__(self,last_name,first_name,other_names=None,phone_number=None,email_address=None,
+        program=None,status=None,student_id=None):
+        """ constructor 
+        
+        *program* is the student's academic program and plan, *status*
+        their enrollment status in the section (e.g. 'Enrolled'), and
+        *student_id* their university ID number (the EMPLID in Albert).
+        """
         self.last_name = last_name
         self.first_name = first_name
         self.other_names = other_names
         self.phone_number = phone_number
         self.email_address = email_address
+        self.program = program
+        self.status = status
+        self.student_id = student_id
+        self._names = None
+        
+    def _name_forms(self):
+        """
+        [last name, first name, other names, full name, contact name, sort key]
+        
+        The forms of the name are each built on first use, and kept for the
+        names they were built from; when one of those has been replaced,
+        they are built again.
+        """
+        names = self._names
+        if (names is None or names[0] is not self.last_name or names[1] is not self.first_name
+            or names[2] is not self.other_names):
+            names = self._names = [self.last_name,self.first_name,self.other_names,None,None,None]
+        return names
         
     @property
     def preferred_first_name(self):
@@ -47,10 +98,13 @@ class Student:
         >>> student.formatted_full_name
         'Kennedy, John Fitzgerald'
         """
-        value = '%s, %s' % (self.last_name, self.first_name)
-        if self.other_names:
-            value += ' ' + self.other_names
-        return value
+        names = self._name_forms()
+        if names[3] is None:
+            value = '%s, %s' % (self.last_name, self.first_name)
+            if self.other_names:
+                value += ' ' + self.other_names
+            names[3] = value
+        return names[3]
         
     @property
     def formatted_contact_name(self):
@@ -63,30 +117,149 @@ class Student:
         >>> student.formatted_contact_name
         'John Fitzgerald Kennedy'
         """
-        names = [self.first_name]
-        if self.other_names:
-            names.append(self.other_names)
-        names.append(self.last_name)
-        return " ".join(names)             
+        names = self._name_forms()
+        if names[4] is None:
+            contact = [self.first_name]
+            if self.other_names:
+                contact.append(self.other_names)
+            contact.append(self.last_name)
+            names[4] = " ".join(contact)
+        return names[4]
+        
+    @property
+    def sort_key(self):
+        """
+        The key putting students in class-list order: by last name, then
+        first name, then other names, each collated by the current locale
+        (see collation_key).
+        
+        >>> names = [('Adams','John','Quincy'),('Adams','John',None),('Adamson','Abigail',None)]
+        >>> students = [Student(*name) for name in names]
+        >>> [s.formatted_full_name for s in sorted(students,key=Student.sort_key.fget)]
+        ['Adams, John', 'Adams, John Quincy', 'Adamson, Abigail']
+        """
+        names = self._name_forms()
+        if names[5] is None:
+            names[5] = (collation_key(self.last_name),collation_key(self.first_name),
+                collation_key(self.other_names))
+        return names[5]
+
+
+#: The key of class-list order
+by_name = operator.attrgetter('sort_key')
+
+
+def class_list(students,fields=('formatted_full_name','email_address'),separator='  '):
+    """
+    Render *students* as lines of aligned columns, one column per field.
+    
+    Each column is formatted in one pass and padded to its widest entry.
+    
+    >>> students = [Student('Kennedy','John',email_address='jfk35@harvard.edu'),
+    ...     Student('Adams','John','Quincy',email_address='jqa6@harvard.edu')]
+    >>> for line in class_list(students):
+    ...     print(line)
+    Kennedy, John       jfk35@harvard.edu
+    Adams, John Quincy  jqa6@harvard.edu
+    """
+    columns = []
+    for field in fields:
+        column = [value if value is not None else '' for value in map(operator.attrgetter(field),students)]
+        width = max(map(len,column)) if column else 0
+        columns.append([value.ljust(width) for value in column])
+    if not columns:
+        return []
+    return [separator.join(row).rstrip() for row in zip(*columns)]
                         
 
-class Course:
+class _Flyweight(object):
+    """
+    An immutable value object shared through a registry.
+    
+    Constructing an instance equal to one that is still alive returns that
+    instance, so equal objects are normally identical, and comparing or
+    hashing them is cheap.  Subclasses name their fields, in constructor
+    order, in ``_fields`` and check constructor arguments in ``_validate``,
+    which returns the field values as a tuple.
+    """
+    __slots__ = ('_hash','__weakref__')
+    _fields = ()
+    _registry = weakref.WeakValueDictionary()
+    
+    def __new__(cls,*args,**kwargs):
+        values = cls._validate(*args,**kwargs)
+        key = (cls,) + values
+        self = cls._registry.get(key)
+        if self is None:
+            self = object.__new__(cls)
+            for (name,value) in zip(cls._fields,values):
+                object.__setattr__(self,name,value)
+            object.__setattr__(self,'_hash',hash(key))
+            cls._registry[key] = self
+        return self
+        
+    def __init__(self,*args,**kwargs):
+        # everything was done in __new__
+        pass
+        
+    @classmethod
+    def _validate(cls,*args):
+        return args
+        
+    def _values(self):
+        return tuple(getattr(self,name) for name in self._fields)
+        
+    def __eq__(self,other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._hash == other._hash and self._values() == other._values()
+        
+    def __ne__(self,other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+        
+    def __hash__(self):
+        return self._hash
+        
+    def __setattr__(self,name,value):
+        raise AttributeError("%s objects are immutable" % type(self).__name__)
+        
+    def __delattr__(self,name):
+        raise AttributeError("%s objects are immutable" % type(self).__name__)
+        
+    def __reduce__(self):
+        # unpickling and copying go back through the registry
+        return (type(self),self._values())
+        
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,', '.join(repr(value) for value in self._values()))
+        
+
+class Course(_Flyweight):
     """A body of knowledge taught by a school."""
+    __slots__ = ('name','description')
+    _fields = __slots__
     
-    def __init__(self,name,description):
-        self.name = name
-        self.description = description
+    @classmethod
+    def _validate(cls,name,description):
+        return (name,description)
     
 
-class CourseOffering:
+class CourseOffering(_Flyweight):
     """An offering of a course in a particular session"""
+    __slots__ = ('course','session')
+    _fields = __slots__
     
-    def __init__(self,course,session):
-        self.course = course
-        self.session = session
+    @classmethod
+    def _validate(cls,course,session):
+        return (course,session)
     
 
-class CourseSection:
+class CourseSection(object):
     """
     one section of a course in a session
     
@@ -114,7 +287,21 @@ class CourseSection:
     'Fall'
     >>> course_section.term_year
     2014
+    
+    Courses, sessions, terms and offerings are interned, so sections of the
+    same offering share it.
+    
+    >>> other_section = CourseSection(
+    ...    offering=CourseOffering(
+    ...        course=Course('Calculus III','Multivariable Calculus'),
+    ...        session=AcademicSession(AcademicTerm('Fall',2014),
+    ...            datetime.date(2014,9,2),datetime.date(2014,12,19),
+    ...            'Regular Academic Session')),
+    ...    name='002')
+    >>> other_section.offering is course_section.offering
+    True
     """
+    __slots__ = ('offering','name')
     
     def __init__(self,offering,name=None):
         self.offering = offering
@@ -149,57 +336,102 @@ class CourseSection:
         return self.offering.session.term.year
     
     
-class AcademicSession:
+class AcademicSession(_Flyweight):
     """A period within a term during which courses are offered"""
+    __slots__ = ('term','start_date','end_date','name')
+    _fields = __slots__
     
-    def __init__(self,term,start_date,end_date,name=None):
-        """constructor
-        """
-        if (name is not None):
-            self.name=name
-        else:
+    @classmethod
+    def _validate(cls,term,start_date,end_date,name=None):
+        if (name is None):
             raise ValueError("'name' is a required attribute")
-        self.start_date = start_date
-        self.end_date = end_date
-        if (isinstance(term,AcademicTerm)):
-            self.term=term
-        else:
+        if not (isinstance(term,AcademicTerm)):
             raise TypeError("'term' must be an instance of type AcademicTerm")
-            
-        
+        return (term,start_date,end_date,name)
 
 
-class AcademicTerm:
-    """The largest portion of the academic calendar"""
+class AcademicTerm(_Flyweight):
+    """The largest portion of the academic calendar
     
-    def __init__(self,name=None,year=None):
-        """constructor
-        
-        >>> term=AcademicTerm("Fall",2014)
-        >>> term.name
-        'Fall'
-        >>> term.year
-        2014
-        
-        >>> term2=AcademicTerm(year=2014)
-        Traceback (most recent call last):
-        ValueError: 'name' is a required attribute
-        
-        >>> term3=AcademicTerm(2014,"Fall")
-        Traceback (most recent call last):
-        TypeError: 'year' must be an integer: Fall
-        """
-        if (name is not None):
-            self.name=name
-        else:
+    >>> term=AcademicTerm("Fall",2014)
+    >>> term.name
+    'Fall'
+    >>> term.year
+    2014
+    
+    >>> term2=AcademicTerm(year=2014)
+    Traceback (most recent call last):
+    ValueError: 'name' is a required attribute
+    
+    >>> term3=AcademicTerm(2014,"Fall")
+    Traceback (most recent call last):
+    TypeError: 'year' must be an integer: Fall
+    
+    Terms are immutable, and equal terms are one shared object.
+    
+    >>> AcademicTerm('Fall',2014) is term
+    True
+    >>> term.year = 2015
+    Traceback (most recent call last):
+    AttributeError: AcademicTerm objects are immutable
+    >>> term
+    AcademicTerm('Fall', 2014)
+    """
+    __slots__ = ('name','year')
+    _fields = __slots__
+    
+    @classmethod
+    def _validate(cls,name=None,year=None):
+        if (name is None):
             raise ValueError("'name' is a required attribute")
-        if (isinstance(year,int)):
-            self.year=year
-        else:
+        if not (isinstance(year,int)):
             raise TypeError("'year' must be an integer: %s" % year)
+        return (name,year)
             
 
-class Roster:
+class _SortedView(object):
+    """
+    Students kept in order of *key*, with their keys alongside.
+    
+    Students with equal keys stay in the order they were added.
+    """
+    __slots__ = ('key','keys','students')
+    
+    def __init__(self,key,students=()):
+        self.key = key
+        decorated = sorted(((key(student),i,student) for (i,student) in enumerate(students)),
+            key=operator.itemgetter(0,1))
+        self.keys = [entry[0] for entry in decorated]
+        self.students = [entry[2] for entry in decorated]
+        
+    def place(self,student):
+        """
+        The key of *student* and the place it goes, for insert.
+        """
+        k = self.key(student)
+        return (bisect.bisect_right(self.keys,k),k)
+        
+    def insert(self,student,place):
+        (i,k) = place
+        self.keys.insert(i,k)
+        self.students.insert(i,student)
+        
+    def find(self,student):
+        """
+        The place of *student*, which must have the key it was added with.
+        """
+        i = bisect.bisect_left(self.keys,self.key(student))
+        for j in range(i,len(self.students)):
+            if self.students[j] is student:
+                return j
+        raise ValueError("%r is not in the list" % (student,))
+        
+    def pop(self,j):
+        del self.keys[j]
+        del self.students[j]
+        
+        
+class Roster(object):
     """ The list of students in a section of a course.
     
     >>> roster = Roster()
@@ -210,39 +442,527 @@ class Roster:
     >>> student = roster.lookup_student('email_address','jqa6@harvard.edu')
     >>> student.other_names
     'Quincy'
+    
+    Indexes are multi-valued, so students sharing a value are all kept.
+    
+    >>> roster.add_student(Student('Adams','John',
+    ...     email_address='ja2@harvard.edu'))
+    >>> [s.email_address for s in roster.lookup_students('last_name','Adams')]
+    ['jqa6@harvard.edu', 'ja2@harvard.edu']
+    >>> roster.lookup_student('last_name','Adams')
+    Traceback (most recent call last):
+    ValueError: 2 students have last_name='Adams'
+    
+    A tuple of fields makes a composite index, looked up by a tuple of values.
+    
+    >>> roster.lookup_student(('last_name','other_names'),('Adams','Quincy')).email_address
+    'jqa6@harvard.edu'
+    >>> roster.lookup_students(('last_name','first_name'),('Lincoln','Abraham'))
+    []
+    
+    Removing or editing a student patches the indexes in place.
+    
+    >>> roster.remove_student(student)
+    >>> roster.lookup_student('last_name','Adams').email_address
+    'ja2@harvard.edu'
+    >>> kennedy = roster.lookup_student('email_address','jfk35@harvard.edu')
+    >>> roster.update_student(kennedy,email_address='jfk@whitehouse.gov')
+    >>> roster.lookup_student('email_address','jfk@whitehouse.gov').last_name
+    'Kennedy'
+    >>> roster.lookup_students('email_address','jfk35@harvard.edu')
+    []
+    
+    Sorted views keep the students in order as they come and go; by
+    default, the order is by name (see Student.sort_key).
+    
+    >>> [s.formatted_full_name for s in roster.sorted_students()]
+    ['Adams, John', 'Kennedy, John']
+    >>> roster.add_student(Student('Adams','Abigail'))
+    >>> [s.formatted_full_name for s in roster.sorted_students()]
+    ['Adams, Abigail', 'Adams, John', 'Kennedy, John']
     """
     
     def __init__(self,section=None,students=None):
         self.section = section
-        if students is None:
-            self.students = []
-        else:
-            self.students = students
         self._index = {}
+        self._views = {}
+        self.students = students or []
+        
+    @property
+    def students(self):
+        """
+        The students, in the order they were added.
+        
+        The roster is kept as an ordered mapping, so that taking a student
+        off it costs the same however long it is; this list is made from
+        it when first asked for after a change, and should not be changed
+        itself (use add_student and remove_student).
+        """
+        if self._students is None:
+            self._students = list(self._members.values())
+        return self._students
+        
+    @students.setter
+    def students(self,students):
+        # id(student) -> student
+        self._members = collections.OrderedDict()
+        self._students = None
+        for field in self._index:
+            self._index[field] = {}
+        for view in list(self._views):
+            self._views[view] = _SortedView(view)
+        for student in students:
+            self.add_student(student)
+        
+    @staticmethod
+    def _index_field(field):
+        """
+        Normalize a field specification to a hashable index name.
+        
+        A string names a single field; any other sequence of strings
+        names a composite index and is turned into a tuple.
+        """
+        if isinstance(field,str):
+            return field
+        return tuple(field)
+        
+    @staticmethod
+    def _index_value(student,field):
+        """
+        The key of *student* in the index on *field*.
+        """
+        if isinstance(field,tuple):
+            return tuple(getattr(student,name) for name in field)
+        return getattr(student,field)
+        
+    def _index_student(self,field,student):
+        # buckets are ordered mappings too, so students leave them directly
+        index = self._index[field]
+        value = self._index_value(student,field)
+        try:
+            bucket = index[value]
+        except KeyError:
+            bucket = index[value] = collections.OrderedDict()
+        bucket[id(student)] = student
+        
+    def _places(self,student):
+        """
+        Where *student* goes: its value in each index and its place in
+        each sorted view.
+        
+        Everything that can fail (a getter, an unhashable value, a key
+        that does not compare) fails here, before anything changes.
+        """
+        values = []
+        for (field,index) in self._index.items():
+            value = self._index_value(student,field)
+            hash(value)
+            values.append((index,value))
+        return (values,[(view,view.place(student)) for view in self._views.values()])
+        
+    def _entries(self,student):
+        """
+        Where *student* is: its bucket in each index, and its place in
+        each sorted view.
+        
+        Raise KeyError or ValueError, before anything changes, if it is
+        not where its current values say (say, because an indexed
+        attribute was assigned without update_student).
+        """
+        buckets = []
+        for (field,index) in self._index.items():
+            value = self._index_value(student,field)
+            bucket = index[value]
+            if bucket.get(id(student)) is not student:
+                raise KeyError(value)
+            buckets.append((index,value,bucket))
+        return (buckets,[(view,view.find(student)) for view in self._views.values()])
+        
+    @staticmethod
+    def _put(student,places):
+        (values,views) = places
+        for (index,value) in values:
+            try:
+                bucket = index[value]
+            except KeyError:
+                bucket = index[value] = collections.OrderedDict()
+            bucket[id(student)] = student
+        for (view,place) in views:
+            view.insert(student,place)
+            
+    @staticmethod
+    def _take(student,entries):
+        (buckets,views) = entries
+        for (index,value,bucket) in buckets:
+            del bucket[id(student)]
+            if not bucket:
+                del index[value]
+        for (view,j) in views:
+            view.pop(j)
+        
+    def _check_member(self,student):
+        if self._members.get(id(student)) is not student:
+            raise ValueError("%r is not on the roster" % (student,))
         
     def add_student(self,student):
         """
         Add a student to the roster.  
         
         For each indexed field, add an entry to the index on that field.
+        Raise ValueError if the student is on the roster already.  Every
+        index value and view key is found before the roster changes, so
+        if one of those fails the roster is as it was.
         """
-        self.students.append(student)
-        for field in self._index:
-            self._index[field][getattr(student,field)] = student
+        if id(student) in self._members:
+            raise ValueError("%r is on the roster already" % (student,))
+        places = self._places(student)
+        self._members[id(student)] = student
+        self._students = None
+        self._put(student,places)
+        
+    def remove_student(self,student):
+        """
+        Remove a student from the roster and from every index.
+        
+        Raise ValueError if the student is not on the roster; as with
+        any failure finding the student in an index or view, nothing has
+        changed then.
+        """
+        self._check_member(student)
+        entries = self._entries(student)
+        self._take(student,entries)
+        del self._members[id(student)]
+        self._students = None
+            
+    def update_student(self,student,**changes):
+        """
+        Change attributes of a student on the roster, keeping indexes current.
+        
+        The student is taken out of every index and sorted view and put
+        back in under its new values, so that indexes on properties
+        derived from the changed attributes (such as formatted_full_name)
+        stay current too.  Assigning to the attributes of an indexed
+        student directly leaves those indexes and views stale, so edits
+        should go through this method.
+        
+        Raise ValueError if the student is not on the roster and
+        AttributeError if a change names no attribute of the student's
+        class; either way, or if a change is refused, nothing has changed.
+        """
+        self._check_member(student)
+        for name in changes:
+            if not hasattr(type(student),name) and not hasattr(student,'__dict__'):
+                raise AttributeError("%s has no attribute %r" % (type(student).__name__,name))
+        entries = self._entries(student)
+        self._take(student,entries)
+        done = []
+        try:
+            for (name,value) in changes.items():
+                old = getattr(student,name,_UNSET)
+                setattr(student,name,value)
+                done.append((name,old))
+            places = self._places(student)
+        except Exception:
+            # a setter or a key refused: put the student back as they were
+            for (name,old) in reversed(done):
+                if old is _UNSET:
+                    delattr(student,name)
+                else:
+                    setattr(student,name,old)
+            self._put(student,self._places(student))
+            raise
+        self._put(student,places)
         
     def add_index(self,field):
         """
         Add an index on the field given.
+        
+        *field* is either the name of a student attribute or a tuple of
+        names for a composite index.  Each index maps a value to the list
+        of every student having it, in roster order.
         """
+        field = self._index_field(field)
         if not (field in self._index):
             self._index[field] = {}
-        for student in self.students:
-            self._index[field][getattr(student,field)] = student
+            for student in self.students:
+                self._index_student(field,student)
+                
+    def add_sorted_view(self,key=by_name):
+        """
+        Keep the students sorted by *key*, a function of a student.
+        
+        The view is sorted once, then each student added, removed or
+        updated is put in (or taken out of) its place.  Views are found
+        by their key function, so *key* should be one function kept for
+        the purpose (a module-level function, or an attrgetter made once),
+        not a lambda made anew at each call.
+        """
+        if not (key in self._views):
+            self._views[key] = _SortedView(key,self.students)
+            
+    def sorted_students(self,key=by_name):
+        """
+        Return the students in order of *key* (by default, by name).
+        
+        The view by name is built on first use; other keys are read from
+        the view added for them with add_sorted_view, or else sorted on
+        the spot, without keeping a view.
+        """
+        if not (key in self._views):
+            if key is not by_name:
+                return sorted(self.students,key=key)
+            self.add_sorted_view(key)
+        return list(self._views[key].students)
+        
+    def class_list(self,fields=('formatted_full_name','email_address'),key=by_name):
+        """
+        The class list: *fields* of the students, in aligned columns, in
+        order of *key* (see class_list).
+        """
+        return class_list(self.sorted_students(key),fields)
+        
+    def lookup_students(self,field,value):
+        """
+        Return the list of all students whose *field* equals *value*.
+        
+        The index on *field* is built on first use.
+        """
+        field = self._index_field(field)
+        if not (field in self._index):
+            self.add_index(field)
+        bucket = self._index[field].get(value)
+        if bucket is None:
+            return []
+        return list(bucket.values())
                 
     def lookup_student(self,field,value):
+        """
+        Return the one student whose *field* equals *value*.
+        
+        Raise KeyError if there is no such student and ValueError if
+        there is more than one (use lookup_students for those).
+        """
+        field = self._index_field(field)
         if not (field in self._index):
             self.add_index(field)
-        return self._index[field][value]
+        matches = self._index[field][value]
+        if len(matches) > 1:
+            raise ValueError("%d students have %s=%r" % (len(matches),field,value))
+        return next(iter(matches.values()))
+
+
+
+class Enrollment(object):
+    """ The students of every section in a term, indexed both ways.
+    
+    Each student is one Student object however many sections list them:
+    students are identified by student_id, or failing that by
+    email_address, and the first Student enrolled under an identity stands
+    for it from then on.  Sections are identified by object.
+    
+    >>> term = AcademicSession(AcademicTerm('Fall',2014),None,None,'Regular Academic Session')
+    >>> calc = CourseSection(CourseOffering(Course('MATH-UA 123','Calculus III'),term),'001')
+    >>> linalg = CourseSection(CourseOffering(Course('MATH-UA 140','Linear Algebra'),term),'001')
+    >>> enrollment = Enrollment()
+    >>> jqa = enrollment.enroll(calc,Student('Adams','John','Quincy',student_id='N1'))
+    >>> jfk = enrollment.enroll(calc,Student('Kennedy','John',student_id='N2'))
+    >>> enrollment.enroll(linalg,Student('Adams','John','Quincy',student_id='N1')) is jqa
+    True
+    >>> len(enrollment)
+    2
+    >>> [section.course_name for section in enrollment.sections_of(jqa)]
+    ['MATH-UA 123', 'MATH-UA 140']
+    >>> [s.last_name for s in enrollment.students_in_all(calc,linalg)]
+    ['Adams']
+    >>> [s.last_name for s in enrollment.students_only_in(calc,linalg)]
+    ['Kennedy']
+    
+    Students and sections come back in the order they were first enrolled.
+    Queries take the intersection or union of the sections' sets of
+    students, so they cost in proportion to those sections, not the term.
+    """
+    
+    def __init__(self,rosters=()):
+        # students and sections are numbered in order of enrollment, and
+        # the indexes hold sets of numbers
+        self._students = []
+        self._student_numbers = {}
+        self._sections = []
+        self._section_numbers = {}
+        self._students_by_section = []
+        self._sections_by_student = []
+        for roster in rosters:
+            self.add_roster(roster)
+    
+    @staticmethod
+    def _identity(student):
+        """
+        The key identifying *student* across sections.
+        """
+        if student.student_id is not None:
+            return ('student_id',student.student_id)
+        if student.email_address is not None:
+            return ('email_address',student.email_address)
+        return ('object',id(student))
+    
+    def _student_number(self,student,add=False):
+        key = self._identity(student)
+        try:
+            return self._student_numbers[key]
+        except KeyError:
+            if not add:
+                raise KeyError("%r is not enrolled" % (student,))
+        number = self._student_numbers[key] = len(self._students)
+        self._students.append(student)
+        self._sections_by_student.append(set())
+        return number
+    
+    def _section_number(self,section,add=False):
+        try:
+            return self._section_numbers[section]
+        except KeyError:
+            if not add:
+                raise KeyError("%r is not in the term" % (section,))
+        number = self._section_numbers[section] = len(self._sections)
+        self._sections.append(section)
+        self._students_by_section.append(set())
+        return number
+    
+    def add_section(self,section):
+        """
+        Add a section, with no students yet.
+        """
+        self._section_number(section,add=True)
+    
+    def enroll(self,section,student):
+        """
+        Enroll a student in a section, adding either if it is new.
+        
+        Return the Student standing for *student*'s identity, which is
+        *student* itself unless an equivalent one was enrolled before.
+        """
+        section_number = self._section_number(section,add=True)
+        student_number = self._student_number(student,add=True)
+        self._students_by_section[section_number].add(student_number)
+        self._sections_by_student[student_number].add(section_number)
+        return self._students[student_number]
+    
+    def drop(self,section,student):
+        """
+        Take a student out of a section.
+        
+        Raise KeyError if the student is not enrolled in the section.
+        """
+        section_number = self._section_number(section)
+        student_number = self._student_number(student)
+        self._students_by_section[section_number].remove(student_number)
+        self._sections_by_student[student_number].remove(section_number)
+    
+    def add_roster(self,roster):
+        """
+        Enroll every student of a roster in its section.
+        """
+        self.add_section(roster.section)
+        for student in roster.students:
+            self.enroll(roster.section,student)
+    
+    def roster(self,section):
+        """
+        A new Roster of the students of a section.
+        """
+        return Roster(section,self.students_of(section))
+    
+    def __len__(self):
+        return len(self._students)
+    
+    @property
+    def students(self):
+        """
+        Every student in the term.
+        """
+        return list(self._students)
+    
+    @property
+    def sections(self):
+        """
+        Every section in the term.
+        """
+        return list(self._sections)
+    
+    def student(self,student_id):
+        """
+        Return the student with *student_id*.
+        
+        Raise KeyError if there is no such student.
+        """
+        return self._students[self._student_numbers[('student_id',student_id)]]
+    
+    def _student_list(self,numbers):
+        students = self._students
+        return [students[number] for number in sorted(numbers)]
+    
+    def _section_list(self,numbers):
+        sections = self._sections
+        return [sections[number] for number in sorted(numbers)]
+    
+    def _section_sets(self,sections):
+        return [self._students_by_section[self._section_number(section)] for section in sections]
+    
+    def students_of(self,section):
+        """
+        The students enrolled in *section*.
+        """
+        return self._student_list(self._students_by_section[self._section_number(section)])
+    
+    def sections_of(self,student):
+        """
+        The sections *student* is enrolled in.
+        """
+        return self._section_list(self._sections_by_student[self._student_number(student)])
+    
+    def students_in_all(self,*sections):
+        """
+        The students enrolled in every one of *sections*.
+        """
+        if not sections:
+            return []
+        sets = sorted(self._section_sets(sections),key=len)
+        return self._student_list(sets[0].intersection(*sets[1:]))
+    
+    def students_in_any(self,*sections):
+        """
+        The students enrolled in at least one of *sections*.
+        """
+        return self._student_list(set().union(*self._section_sets(sections)))
+    
+    def students_only_in(self,section,*others):
+        """
+        The students of *section* enrolled in none of *others*.
+        """
+        sets = self._section_sets((section,) + others)
+        return self._student_list(sets[0].difference(*sets[1:]))
+    
+    def shared_sections(self,*students):
+        """
+        The sections every one of *students* is enrolled in.
+        """
+        if not students:
+            return []
+        sets = sorted([self._sections_by_student[self._student_number(student)] for student in students],key=len)
+        return self._section_list(sets[0].intersection(*sets[1:]))
+    
+    def classmates(self,student):
+        """
+        The other students sharing at least one section with *student*.
+        """
+        number = self._student_number(student)
+        numbers = set().union(*[self._students_by_section[section]
+            for section in self._sections_by_student[number]])
+        numbers.discard(number)
+        return self._student_list(numbers)
+
+# the value of an attribute not set
+_UNSET = object()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,41 @@
 #!/usr/bin/env python
 
+import collections
+import functools
+import itertools
 import logging
+import threading
+import time
 
-def debug_entry(f):
+DEBUG = logging.DEBUG
+
+
+def _sampler(sample):
+    """
+    Return a function that is true on one call in every *sample*, starting
+    with the first.
+    """
+    if sample <= 1:
+        return lambda: True
+    counter = itertools.count()
+    return lambda: next(counter) % sample == 0
+
+
+def _wrapped(new_f,f):
+    new_f = functools.wraps(f)(new_f)
+    # functools.wraps only sets this itself from Python 3.2
+    new_f.__wrapped__ = f
+    return new_f
+
+
+def debug_entry(f=None,sample=1):
     """
     debug the entry into a function
-        
+
     >>> import sys
     >>> import logging
-    
-    The stream configuration is just to make doctests work.  
+
+    The stream configuration is just to make doctests work.
     In practice, you'd probably want the default stream sys.stderr.
     >>> logging.basicConfig(level=logging.DEBUG,stream=sys.stdout)
 
@@ -20,18 +46,35 @@ def debug_entry(f):
     >>> f(2)
     DEBUG:f:Entering: arguments=(2,), keyword arguments={}
     4
+
+    The logger is looked up once, when the function is decorated, and when
+    it is not enabled for debugging the arguments are not even formatted,
+    so the decorator can stay on functions called in tight loops.  To log
+    only one call in every *sample*:
+
+    >>> @debug_entry(sample=3)
+    ... def h(x):
+    ...     return x+1
+    ...
+    >>> [h(x) for x in range(5)]
+    DEBUG:h:Entering: arguments=(0,), keyword arguments={}
+    DEBUG:h:Entering: arguments=(3,), keyword arguments={}
+    [1, 2, 3, 4, 5]
     """
+    if f is None:
+        return functools.partial(debug_entry,sample=sample)
+    logger=logging.getLogger(f.__name__)
+    sampled=_sampler(sample)
     def new_f(*args,**kwargs):
-        logger=logging.getLogger(f.__name__)
-        logger.debug("Entering: arguments=%s, keyword arguments=%s",args,kwargs)
+        if logger.isEnabledFor(DEBUG) and sampled():
+            logger.debug("Entering: arguments=%s, keyword arguments=%s",args,kwargs)
         return f(*args,**kwargs)
-    new_f.__name__ = f.__name__
-    return new_f
-    
-def debug_result(f):
+    return _wrapped(new_f,f)
+
+def debug_result(f=None,sample=1):
     """
     Debug the result of a function
-    
+
     >>> import sys
     >>> import logging
     >>> logging.basicConfig(level=logging.DEBUG,stream=sys.stdout)
@@ -42,27 +85,138 @@ def debug_result(f):
     >>> f(2)+10
     DEBUG:f:Result: 4
     14
-    
+
     Decorators can be chained (that's kind of the point!).
-    
+
     >>> @debug_entry
     ... @debug_result
     ... def g(x):
+    ...    "Double x"
     ...    return 2*x
     ...
     >>> g(3)+17
     DEBUG:g:Entering: arguments=(3,), keyword arguments={}
     DEBUG:g:Result: 6
     23
+
+    The decorated function keeps its name and docstring, and the original
+    is available as __wrapped__.
+
+    >>> print(g.__doc__)
+    Double x
+    >>> g.__wrapped__.__wrapped__(3)
+    6
+
+    As with debug_entry, nothing is formatted unless debugging is enabled,
+    and *sample* logs one result in every *sample*.
     """
+    if f is None:
+        return functools.partial(debug_result,sample=sample)
+    logger=logging.getLogger(f.__name__)
+    sampled=_sampler(sample)
     def new_f(*args,**kwargs):
-        logger=logging.getLogger(f.__name__)
         result=f(*args,**kwargs)
-        logger.debug("Result: %s",repr(result))
+        if logger.isEnabledFor(DEBUG) and sampled():
+            logger.debug("Result: %r",result)
         return result
-    new_f.__name__ = f.__name__
+    return _wrapped(new_f,f)
+
+
+CacheInfo = collections.namedtuple('CacheInfo',['hits','misses','evictions','maxsize','currsize'])
+
+# separates positional from keyword arguments in default cache keys
+_KWARGS = object()
+
+def _default_key(*args,**kwargs):
+    if kwargs:
+        return args + (_KWARGS,) + tuple(sorted(kwargs.items()))
+    return args
+
+def memoize(f=None,maxsize=128,ttl=None,key=None,clock=time.time):
+    """
+    Remember the results of a function
+
+    At most *maxsize* results are kept (any number, if it is None); when
+    there are more, the least recently used is dropped.  With *ttl*, a
+    result is recomputed once it is more than *ttl* seconds old.
+
+    >>> @memoize(maxsize=2)
+    ... def square(x):
+    ...     print("computing %d squared" % x)
+    ...     return x*x
+    ...
+    >>> square(2)
+    computing 2 squared
+    4
+    >>> square(2)
+    4
+    >>> square.cache_info()
+    CacheInfo(hits=1, misses=1, evictions=0, maxsize=2, currsize=1)
+
+    Results are cached by the function's arguments, which must then be
+    hashable.  Otherwise, or to cache by something else, *key* is called
+    with the same arguments as the function and returns the cache key:
+
+    >>> @memoize(key=lambda names: tuple(names))
+    ... def initials(names):
+    ...     return ''.join(name[0] for name in names)
+    ...
+    >>> print(initials(['John','Fitzgerald','Kennedy']))
+    JFK
+
+    cache_invalidate(*args,**kwargs) forgets the result for those
+    arguments, and cache_clear() forgets every result and the statistics.
+
+    >>> square.cache_invalidate(2)
+    True
+    >>> square(2)
+    computing 2 squared
+    4
+
+    The cache is safe to share between threads, though two threads
+    missing at once may both call the function.
+    """
+    if f is None:
+        return functools.partial(memoize,maxsize=maxsize,ttl=ttl,key=key,clock=clock)
+    make_key = key or _default_key
+    # key -> (expiry time or None,result), least recently used first
+    cache = collections.OrderedDict()
+    lock = threading.Lock()
+    # hits, misses, evictions
+    stats = [0,0,0]
+    def new_f(*args,**kwargs):
+        k = make_key(*args,**kwargs)
+        with lock:
+            entry = cache.pop(k,None)
+            if entry is not None and (entry[0] is None or clock() < entry[0]):
+                # put it back, as the most recently used
+                cache[k] = entry
+                stats[0] += 1
+                return entry[1]
+            stats[1] += 1
+        result = f(*args,**kwargs)
+        with lock:
+            cache[k] = (None if ttl is None else clock() + ttl,result)
+            while maxsize is not None and len(cache) > maxsize:
+                cache.popitem(last=False)
+                stats[2] += 1
+        return result
+    def cache_info():
+        with lock:
+            return CacheInfo(stats[0],stats[1],stats[2],maxsize,len(cache))
+    def cache_invalidate(*args,**kwargs):
+        with lock:
+            return cache.pop(make_key(*args,**kwargs),None) is not None
+    def cache_clear():
+        with lock:
+            cache.clear()
+            stats[:] = [0,0,0]
+    new_f = _wrapped(new_f,f)
+    new_f.cache_info = cache_info
+    new_f.cache_invalidate = cache_invalidate
+    new_f.cache_clear = cache_clear
     return new_f
-    
+
 
 if __name__ == "__main__":
     import doctest
@@ -73,6 +227,6 @@ if __name__ == "__main__":
     # @debug_result
     # @debug_entry
     # def f(x):
-    #    return x*x 
-    #    
-    #f(2)
\ No newline at end of file
+    #    return x*x
+    #
+    #f(2)
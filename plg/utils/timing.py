@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""
+Where the time goes: named stages timed into a registry
+
+Code marks a stage with a span (a context manager) or the timed
+decorator; each run of the stage adds its duration to the registry, which
+reports how many times each stage ran, for how long in all, and the
+percentiles of a single run.  The module-level registry is disabled until
+enable() is called, and while it is, spans cost next to nothing, so they
+can be left in library code.
+
+>>> registry = Registry(enabled=True)
+>>> with registry.span('parse'):
+...     pass
+>>> @registry.timed('hash')
+... def hash_file(name):
+...     return len(name)
+>>> hash_file('quiz.pdf')
+8
+>>> [(stage.name,stage.count) for stage in registry.stages()]
+[('hash', 1), ('parse', 1)]
+"""
+from __future__ import print_function
+
+import functools
+import json
+import sys
+import threading
+from timeit import default_timer
+
+#: Percentiles shown in reports
+PERCENTILES = (50,90,99)
+
+
+class Stage(object):
+    """
+    The durations recorded for one named stage.
+
+    >>> stage = Stage('upload')
+    >>> for seconds in (0.1,0.2,0.3,0.4):
+    ...     stage.add(seconds)
+    >>> stage.count
+    4
+    >>> stage.percentile(50)
+    0.2
+    >>> stage.percentile(99)
+    0.4
+    """
+    __slots__ = ('name','count','total','samples','_sorted')
+
+    def __init__(self,name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+        self._sorted = True
+
+    def add(self,seconds):
+        self.count += 1
+        self.total += seconds
+        if self.samples and seconds < self.samples[-1]:
+            self._sorted = False
+        self.samples.append(seconds)
+
+    def percentile(self,p):
+        """
+        The duration that *p* percent of runs took at most (nearest rank).
+        """
+        if not self.samples:
+            return None
+        if not self._sorted:
+            self.samples.sort()
+            self._sorted = True
+        rank = max(int(-(-p * len(self.samples) // 100)),1)
+        return self.samples[rank - 1]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """
+        The stage's statistics, as a dictionary.
+        """
+        result = {'count': self.count,'total': self.total,'mean': self.mean,
+            'min': self.percentile(0),'max': self.percentile(100)}
+        for p in PERCENTILES:
+            result['p%d' % p] = self.percentile(p)
+        return result
+
+
+class _Span(object):
+    __slots__ = ('registry','name','start')
+
+    def __init__(self,registry,name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self,*exc_info):
+        self.registry.record(self.name,default_timer() - self.start)
+
+
+class _NullSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+class Registry(object):
+    """
+    Stages by name.  Safe to share between threads.
+    """
+
+    def __init__(self,enabled=False):
+        self.enabled = enabled
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.started = default_timer()
+
+    def enable(self):
+        """
+        Start recording, from now.
+        """
+        self.reset()
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.started = default_timer()
+
+    def record(self,name,seconds):
+        """
+        Add a run of *seconds* to the stage *name*.
+        """
+        with self._lock:
+            try:
+                stage = self._stages[name]
+            except KeyError:
+                stage = self._stages[name] = Stage(name)
+            stage.add(seconds)
+
+    def span(self,name):
+        """
+        A context manager timing its body as a run of the stage *name*.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self,name)
+
+    def timed(self,name=None):
+        """
+        A decorator timing each call as a run of the stage *name* (by
+        default, the function's name).
+        """
+        def decorator(f):
+            stage = name or f.__name__
+            @functools.wraps(f)
+            def new_f(*args,**kwargs):
+                if not self.enabled:
+                    return f(*args,**kwargs)
+                start = default_timer()
+                try:
+                    return f(*args,**kwargs)
+                finally:
+                    self.record(stage,default_timer() - start)
+            return new_f
+        return decorator
+
+    def timed_iter(self,name,iterable):
+        """
+        Iterate over *iterable*, recording the time spent getting its items
+        (but not the time the caller spends on them) as one run of *name*.
+        """
+        if not self.enabled:
+            for item in iterable:
+                yield item
+            return
+        iterator = iter(iterable)
+        elapsed = 0.0
+        try:
+            while True:
+                start = default_timer()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += default_timer() - start
+                    return
+                elapsed += default_timer() - start
+                yield item
+        finally:
+            self.record(name,elapsed)
+
+    def stages(self):
+        """
+        The stages recorded so far, by name.
+        """
+        with self._lock:
+            return [self._stages[name] for name in sorted(self._stages)]
+
+    def as_dict(self):
+        return {'wall': default_timer() - self.started,
+            'stages': dict((stage.name,stage.summary()) for stage in self.stages())}
+
+    def report(self):
+        """
+        A table of the stages, in seconds.
+        """
+        lines = ["%-20s %8s %10s %10s" % ('stage','count','total','mean')
+            + ''.join(" %10s" % ('p%d' % p) for p in PERCENTILES)]
+        for stage in self.stages():
+            lines.append("%-20s %8d %10.4f %10.6f" % (stage.name,stage.count,stage.total,stage.mean)
+                + ''.join(" %10.6f" % stage.percentile(p) for p in PERCENTILES))
+        lines.append("%-20s %8s %10.4f" % ('(wall time)','',default_timer() - self.started))
+        return '\n'.join(lines)
+
+    def write(self,destination):
+        """
+        Print the report to standard error if *destination* is '' or '-',
+        otherwise write the statistics to the file *destination* as JSON.
+        """
+        if destination in ('','-'):
+            print(self.report(),file=sys.stderr)
+        else:
+            with open(destination,'w') as fh:
+                json.dump(self.as_dict(),fh,indent=1,sort_keys=True)
+
+
+#: The registry the plg modules record to
+registry = Registry()
+span = registry.span
+timed = registry.timed
+timed_iter = registry.timed_iter
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Writers for vCards
+
+Cards are anything with a serialize() method returning the card's text,
+such as the vCard components made by vobject.  A VCardStreamWriter
+concatenates them into one multi-card file, which address books import in
+one go; a VCardFileWriter writes one file per card.  Both close every file
+they open by the time they are closed themselves.  A card is deleted by
+name: a VCardFileWriter removes its file, while a VCardStreamWriter can
+only log that it should be removed.
+
+student_card makes the card for a student of a roster page, with vobject
+<http://vobject.skyhouseconsulting.com/>, which is imported only then.
+"""
+import logging
+import os
+import sys
+
+from plg.utils.timing import span
+
+#: Output buffer size of a VCardStreamWriter
+BUFFER_SIZE = 1024 * 1024
+
+
+def student_card(student,org,course,photo=None):
+    """
+    Return the vCard of *student*, a record parsed from a roster page.
+
+    *org* is the school, *course* the course and term as they should
+    appear on the card, and *photo* the student's Photo, if any.
+    """
+    import vobject # http://vobject.skyhouseconsulting.com/
+    card = vobject.vCard()
+    # first and last names
+    (family_name,given_names) = student['name'].split(',')
+    card.add('n')
+    card.n.value = vobject.vcard.Name(family=family_name,given=given_names)
+    # full name
+    card.add('fn')
+    card.fn.value="%s %s" % (given_names,family_name)
+    # email
+    card.add('email')
+    card.email.value=student['email']
+    card.email.type_param='INTERNET'
+    # student info
+    card.add('title').value = "Student"
+    card.add('org').value=[org,student['progplan'].replace('\n','')]
+    if photo is not None:
+        card.add('photo')
+        # identical photos share one encoding, which vobject is told not to redo
+        card.photo.value = photo.encoded
+        card.photo.encoded = True
+        card.photo.encoding_param = "b"
+        card.photo.type_param = "JPEG"
+    # course (use address book's "Related Names" fields)
+    item = 'item1'
+    card.add(item + '.X-ABLABEL').value="course"
+    card.add(item + '.X-ABRELATEDNAMES').value=course
+    return card
+
+
+class VCardStreamWriter(object):
+    """
+    Write cards one after another to a single file.
+
+    *output* is a file name, '-' for standard output, or an open file
+    (which is left open).
+
+    >>> import io
+    >>> class Card(object):
+    ...     def __init__(self,name):
+    ...         self.name = name
+    ...     def serialize(self):
+    ...         return u'BEGIN:VCARD\\r\\nFN:%s\\r\\nEND:VCARD\\r\\n' % self.name
+    >>> buf = io.StringIO()
+    >>> with VCardStreamWriter(buf) as writer:
+    ...     writer.write(Card('John Adams'))
+    ...     writer.write(Card('John Kennedy'))
+    >>> print(buf.getvalue().replace('\\r',''))
+    BEGIN:VCARD
+    FN:John Adams
+    END:VCARD
+    BEGIN:VCARD
+    FN:John Kennedy
+    END:VCARD
+    <BLANKLINE>
+    >>> writer.count
+    2
+    """
+
+    def __init__(self,output,buffer_size=BUFFER_SIZE):
+        if output == '-':
+            self._fh = sys.stdout
+            self._owned = False
+        elif hasattr(output,'write'):
+            self._fh = output
+            self._owned = False
+        else:
+            self._fh = open(output,'w',buffer_size)
+            self._owned = True
+        self.name = getattr(self._fh,'name',output)
+        self.count = 0
+
+    def write(self,card,name=None):
+        """
+        Append *card* to the output.  *name* is ignored.
+        """
+        with span('vcard.write'):
+            self._fh.write(card.serialize())
+        self.count += 1
+
+    def delete(self,name):
+        """
+        Cards already written elsewhere cannot be taken back from a stream,
+        so log that the card *name* is to be removed from the address book.
+        """
+        logging.warning("Remove %s from the address book",name)
+
+    def close(self):
+        if self._owned:
+            self._fh.close()
+        else:
+            self._fh.flush()
+        logging.info("Wrote %d cards to %s",self.count,self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+
+class VCardFileWriter(object):
+    """
+    Write each card to its own file, *name*.vcf, in *directory*
+    (by default, the current directory).
+    """
+
+    def __init__(self,directory=''):
+        self.directory = directory
+        self.count = 0
+
+    def write(self,card,name):
+        filename = os.path.join(self.directory,name + '.vcf')
+        logging.info("Saving %s",filename)
+        with span('vcard.write'):
+            with open(filename,'w') as fh:
+                fh.write(card.serialize())
+        self.count += 1
+
+    def delete(self,name):
+        """
+        Remove the file of the card *name*, if there is one.
+        """
+        filename = os.path.join(self.directory,name + '.vcf')
+        try:
+            os.remove(filename)
+        except OSError:
+            return
+        logging.info("Removed %s",filename)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import io
+import unittest
+
+from plg.albert import AlbertHTMLParser, FastAlbertHTMLParser
+
+STUDENT_ROW = (u'<tr><td><div id="win0divEMPL_PHOTO_EMPLOYEE_PHOTO$%(i)d"><img src="p%(i)d.jpg"></div></td>'
+    u'<td><span id="CLASS_ROSTER_VW_EMPLID$%(i)d">N%(i)08d</span></td>'
+    u'<td><span id="HCR_PERSON_NM_I_NAME$%(i)d">Last%(i)d,First%(i)d</span></td>'
+    u'<td><span id="DERIVED_SSSMAIL_EMAIL_ADDR$%(i)d">st%(i)d@nyu.edu</span></td>'
+    u'<td><span id="SCC_PREF_PHN_VW_PHONE$%(i)d">212/555-%(i)04d</span></td>'
+    u'<td><span id="PROGPLAN$%(i)d">CAS&amp;Math\nBS</span></td>'
+    u'<td><span id="PROGPLAN1$%(i)d">Junior</span></td>'
+    u'<td><span id="PSXLATITEM_XLATLONGNAME$%(i)d">Enrolled</span></td></tr>')
+
+
+def roster_page(count):
+    """A small roster page with *count* students"""
+    return (u'<html><body>'
+        u'<span id="DERIVED_SSR_FC_SSR_CLASSNAME_LONG">MATH-UA 123-001</span>'
+        u'<span id="DERIVED_SSR_FC_SSS_PAGE_KEYDESCR2">Fall 2014 | Regular Academic Session'
+        u' | College of Arts and Science | Undergraduate</span>'
+        u'<table>' + u''.join(STUDENT_ROW % {'i':i} for i in range(count)) +
+        u'</table></body></html>')
+
+
+class TestAlbertHTMLParser(unittest.TestCase):
+    """Unit tests for AlbertHTMLParser"""
+
+    def test_parse(self):
+        """Whole-page parsing"""
+        (course,students) = AlbertHTMLParser().parse(io.StringIO(roster_page(3)))
+        self.assertEqual(course['code'],'MATH-UA 123-001')
+        self.assertEqual(sorted(students),[0,1,2])
+        self.assertEqual(students[1]['name'],'Last1,First1')
+        self.assertEqual(students[1]['progplan'],'CAS&Math\nBS')
+        self.assertEqual(students[1]['photo'],'p1.jpg')
+
+    def test_iterparse(self):
+        """Incremental parsing yields the same records, in page order"""
+        page = roster_page(20)
+        (course,students) = AlbertHTMLParser().parse(io.StringIO(page))
+        for chunk_size in (1,7,100,len(page)):
+            parser = AlbertHTMLParser()
+            records = list(parser.iterparse(io.StringIO(page),chunk_size=chunk_size))
+            self.assertEqual(records,sorted(students.items()))
+            self.assertEqual(parser.course_data,course)
+            self.assertEqual(parser.student_data,{})
+
+    def test_iterparse_early(self):
+        """Records come out before the page has been read"""
+        parser = AlbertHTMLParser()
+        page = io.StringIO(roster_page(100))
+        records = parser.iterparse(page,chunk_size=1024)
+        (index,record) = next(records)
+        self.assertEqual(index,0)
+        self.assertTrue(page.tell() < len(page.getvalue()) // 10)
+        self.assertEqual(parser.course_data['code'],'MATH-UA 123-001')
+
+    def test_iterparse_missing_field(self):
+        """A student missing a field comes out when the next student starts"""
+        rows = [STUDENT_ROW % {'i':i} for i in range(50)]
+        rows[0] = rows[0].replace(u'<span id="SCC_PREF_PHN_VW_PHONE$0">212/555-0000</span>',u'')
+        page = io.StringIO(roster_page(0).replace(u'</table>',u''.join(rows) + u'</table>'))
+        records = AlbertHTMLParser().iterparse(page,chunk_size=1024)
+        (index,record) = next(records)
+        self.assertEqual(index,0)
+        self.assertNotIn('phone',record)
+        self.assertEqual(record['name'],'Last0,First0')
+        self.assertTrue(page.tell() < len(page.getvalue()) // 10)
+        self.assertEqual([index for (index,record) in records],list(range(1,50)))
+
+    def test_iterparse_incomplete(self):
+        """Incomplete records are yielded at the end of the page"""
+        page = (u'<span id="HCR_PERSON_NM_I_NAME$1">Last1,First1</span>'
+            u'<span id="HCR_PERSON_NM_I_NAME$0">Last0,First0</span>')
+        records = list(AlbertHTMLParser().iterparse(io.StringIO(page)))
+        self.assertEqual(records,[(0,{'name':'Last0,First0'}),(1,{'name':'Last1,First1'})])
+
+
+class TestFastAlbertHTMLParser(unittest.TestCase):
+    """The fast engine agrees with the standard one"""
+
+    def test_same_results(self):
+        page = roster_page(10) + (u'<span id="HCR_PERSON_NM_I_NAME$x">ignored</span>'
+            u'<span id="HCR_PERSON_NM_I_NAME$3$4">ignored</span>'
+            u'<span id="MTG_INSTR$0">Leingang &amp; Staff</span>')
+        standard = AlbertHTMLParser().parse(io.StringIO(page))
+        fast = FastAlbertHTMLParser().parse(io.StringIO(page))
+        self.assertEqual(fast,standard)
+        self.assertEqual(list(FastAlbertHTMLParser().iterparse(io.StringIO(page),chunk_size=13)),
+            list(AlbertHTMLParser().iterparse(io.StringIO(page),chunk_size=13)))
+
+
+if __name__ == "__main__":
+    unittest.main()
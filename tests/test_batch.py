@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import unittest
+
+from plg.enimport.batch import batches
+from plg.enimport.scan import ScannedFile
+
+
+def items(*sizes_and_netids):
+    return [(('quiz_%d.pdf' % i,netid,'Kennedy__John'),ScannedFile('quiz_%d.pdf' % i,size,None))
+        for (i,(size,netid)) in enumerate(sizes_and_netids)]
+
+
+def names(result):
+    return [[rec[0] for (rec,scanned) in batch] for batch in result]
+
+
+def by_netid(rec):
+    return rec[1]
+
+
+class TestBatches(unittest.TestCase):
+
+    def test_one_per_row(self):
+        result = batches(items((10,'jfk35'),(10,'jfk35')))
+        self.assertEqual(names(result),[['quiz_0.pdf'],['quiz_1.pdf']])
+
+    def test_by_student(self):
+        result = batches(items((10,'jfk35'),(10,'jqa6'),(10,'jfk35')),key=by_netid)
+        self.assertEqual(names(result),[['quiz_0.pdf','quiz_2.pdf'],['quiz_1.pdf']])
+
+    def test_max_count(self):
+        result = batches(items((10,'jfk35'),(10,'jfk35'),(10,'jfk35')),key=by_netid,max_count=2)
+        self.assertEqual(names(result),[['quiz_0.pdf','quiz_1.pdf'],['quiz_2.pdf']])
+
+    def test_max_size(self):
+        result = batches(items((30,'jfk35'),(10,'jfk35'),(10,'jfk35'),(10,'jfk35')),
+            key=by_netid,max_size=25)
+        self.assertEqual(names(result),[['quiz_0.pdf'],['quiz_1.pdf','quiz_2.pdf'],['quiz_3.pdf']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from plg.albert.cache import ParseCache
+from plg.albert.ingest import iter_pages, resolve_photo
+from tests.test_albert import roster_page
+
+
+class TestParseCache(unittest.TestCase):
+    """Unit tests for ParseCache"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.directory,'cache'))
+        self.page = os.path.join(self.directory,'roster.html')
+        with io.open(self.page,'w') as fh:
+            fh.write(roster_page(4))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        """Keys follow the page contents"""
+        key = self.cache.key(self.page)
+        self.assertEqual(self.cache.key(self.page),key)
+        with io.open(self.page,'a') as fh:
+            fh.write(u' ')
+        self.assertNotEqual(self.cache.key(self.page),key)
+
+    def test_parse(self):
+        """A second parse of an unchanged page comes from the cache"""
+        (course,students) = self.cache.parse(self.page)
+        self.assertEqual(len(students),4)
+        key = self.cache.key(self.page)
+        self.cache.put(key,(course,{}))
+        self.assertEqual(self.cache.parse(self.page),(course,{}))
+
+    def test_eviction(self):
+        """The least recently used entries go first"""
+        for key in ('a','b','c'):
+            self.cache.put(key,'x' * 1000)
+        past = time.time() - 100
+        for (age,key) in enumerate(('b','a','c')):
+            os.utime(self.cache._path(key),(past + age,past + age))
+        self.cache.get('b')
+        self.cache.max_bytes = 2500
+        self.cache.evict()
+        self.assertEqual([key for key in 'abc' if self.cache.get(key) is not None],['b','c'])
+
+    def test_iter_pages(self):
+        """Streamed pages are cached once read, with photos as the page names them"""
+        ((filename,course,records),) = iter_pages([self.page],cache=self.cache)
+        records = list(records)
+        key = self.cache.key(self.page)
+        (cached_course,student_data) = self.cache.get(key)
+        self.assertEqual(cached_course,course)
+        self.assertEqual([student_data[i]['photo'] for i in sorted(student_data)],
+            ['p%d.jpg' % i for i in range(4)])
+        self.assertEqual([resolve_photo(self.page,student_data[i]) for i in sorted(student_data)],records)
+        ((filename,cached_course,cached_records),) = iter_pages([self.page],cache=self.cache)
+        self.assertEqual((cached_course,list(cached_records)),(course,records))
+
+
+if __name__ == "__main__":
+    unittest.main()
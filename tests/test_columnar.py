@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import pickle
+import unittest
+
+from plg.model.columnar import ColumnarRoster
+from plg.model.enrollment import Roster, Student
+
+
+class TestColumnarRoster(unittest.TestCase):
+    """Unit tests for ColumnarRoster"""
+
+    def setUp(self):
+        roster = Roster()
+        for (i,status) in enumerate(['Enrolled','Dropped','Enrolled','Waitlisted']*5):
+            roster.add_student(Student('Last%02d' % (19-i),'First%02d' % i,
+                program='Program %d' % (i % 3),status=status))
+        self.roster = ColumnarRoster.from_roster(roster)
+
+    def test_students(self):
+        """Students are rebuilt from the columns"""
+        student = self.roster[3]
+        self.assertEqual(student.formatted_full_name,'Last16, First03')
+        self.assertEqual((student.program,student.status),('Program 0','Waitlisted'))
+        self.assertEqual(len(self.roster.students),20)
+
+    def test_dictionary_encoding(self):
+        """Each distinct value is stored once"""
+        self.assertEqual(self.roster.columns['status'].values,['Enrolled','Dropped','Waitlisted'])
+        self.assertEqual(len(self.roster.columns['status'].codes),20)
+
+    def test_filter(self):
+        """Filtering matches every criterion"""
+        enrolled = self.roster.filter(status='Enrolled')
+        self.assertEqual(len(enrolled),10)
+        both = self.roster.filter(status='Enrolled',program='Program 0')
+        self.assertEqual([s.first_name for s in both],['First00','First06','First12','First18'])
+        self.assertEqual(len(self.roster.filter(status='Graduated')),0)
+        self.assertEqual(list(self.roster.select('status','Dropped','Waitlisted'))[:4],[1,3,5,7])
+
+    def test_sort(self):
+        """Sorting is by rank and stable"""
+        names = [s.last_name for s in self.roster.sorted('last_name')]
+        self.assertEqual(names,sorted(names))
+        statuses = [(s.status,s.last_name) for s in self.roster.sorted('status','last_name')]
+        self.assertEqual(statuses,sorted(statuses))
+
+    def test_take_copies_on_write(self):
+        """Adding to a filtered roster leaves the one it came from alone"""
+        dropped = self.roster.filter(status='Dropped')
+        dropped.add_student(Student('Kennedy','John',status='Graduated'))
+        self.assertEqual(self.roster.columns['status'].values,['Enrolled','Dropped','Waitlisted'])
+        self.assertIsNone(self.roster.columns['status'].code('Graduated'))
+        self.roster.add_student(Student('Adams','John',status='Suspended'))
+        self.assertEqual([s.status for s in dropped][-1],'Graduated')
+        self.assertEqual(len(self.roster.filter(status='Suspended')),1)
+        self.assertEqual(len(self.roster.filter(status='Graduated')),0)
+        self.assertEqual(len(dropped.filter(status='Suspended')),0)
+
+    def test_pickle(self):
+        """Pickled rosters keep their contents and lookups"""
+        copy = pickle.loads(pickle.dumps(self.roster,pickle.HIGHEST_PROTOCOL))
+        self.assertEqual([s.formatted_full_name for s in copy],
+            [s.formatted_full_name for s in self.roster])
+        self.assertEqual(len(copy.filter(status='Dropped')),5)
+        copy.add_student(Student('Kennedy','John',status='Dropped'))
+        self.assertEqual(len(copy.filter(status='Dropped')),6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import logging
+import unittest
+
+from plg.utils.decorators import debug_entry, debug_result
+
+
+class Loud(object):
+    """Counts how often it is formatted"""
+
+    reprs = 0
+
+    def __repr__(self):
+        Loud.reprs += 1
+        return 'Loud()'
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self,record):
+        self.messages.append(record.getMessage())
+
+
+@debug_entry
+@debug_result
+def identity(x):
+    return x
+
+
+@debug_result(sample=10)
+def sampled(x):
+    return x
+
+
+class TestDebugDecorators(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        for name in ('identity','sampled'):
+            logger = logging.getLogger(name)
+            logger.addHandler(self.handler)
+            logger.propagate = False
+        Loud.reprs = 0
+
+    def tearDown(self):
+        for name in ('identity','sampled'):
+            logger = logging.getLogger(name)
+            logger.removeHandler(self.handler)
+            logger.setLevel(logging.NOTSET)
+            logger.propagate = True
+
+    def test_nothing_formatted_when_disabled(self):
+        logging.getLogger('identity').setLevel(logging.INFO)
+        identity(Loud())
+        self.assertEqual(Loud.reprs,0)
+        self.assertEqual(self.handler.messages,[])
+
+    def test_logged_when_enabled(self):
+        logging.getLogger('identity').setLevel(logging.DEBUG)
+        identity(Loud())
+        self.assertEqual(self.handler.messages,
+            ['Entering: arguments=(Loud(),), keyword arguments={}','Result: Loud()'])
+
+    def test_sampling(self):
+        logging.getLogger('sampled').setLevel(logging.DEBUG)
+        for i in range(25):
+            sampled(i)
+        self.assertEqual(self.handler.messages,['Result: 0','Result: 10','Result: 20'])
+
+    def test_metadata(self):
+        self.assertEqual(identity.__name__,'identity')
+        self.assertEqual(identity.__wrapped__.__wrapped__(5),5)
+
+
+if __name__ == '__main__':
+    unittest.main()
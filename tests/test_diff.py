@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from plg.albert.diff import SyncState, diff, fingerprint
+
+
+def record(i,**fields):
+    result = {'id': u'N%08d' % i,'name': u'Last%d,First%d' % (i,i),
+        'email': u'st%d@nyu.edu' % i,'progplan': u'CAS-Math BS'}
+    result.update(fields)
+    return result
+
+
+class TestRosterDiff(unittest.TestCase):
+    """Unit tests for roster diffs"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory,'state','roster.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def snapshot(self,records):
+        return dict((r['id'],fingerprint(r,u'MATH-UA 123, Fall 2014')) for r in records)
+
+    def test_diff(self):
+        """Students are added, dropped or changed by EMPLID"""
+        old = [record(i) for i in range(400)]
+        new = [record(i) for i in range(3,400)] + [record(400),record(401)]
+        new[10] = record(13,email=u'new@nyu.edu')
+        changes = diff(self.snapshot(old),self.snapshot(new))
+        self.assertEqual(changes.added,[u'N00000400',u'N00000401'])
+        self.assertEqual(changes.dropped,[u'N00000000',u'N00000001',u'N00000002'])
+        self.assertEqual(changes.changed,[u'N00000013'])
+        self.assertEqual(len(changes),6)
+
+    def test_context(self):
+        """The course is part of the fingerprint"""
+        self.assertNotEqual(fingerprint(record(1),u'MATH-UA 123'),fingerprint(record(1),u'MATH-UA 124'))
+
+    def test_sync(self):
+        """A second run sees only what changed since the first"""
+        state = SyncState(self.path)
+        for r in [record(i) for i in range(5)]:
+            self.assertTrue(state.update(r['id'],fingerprint(r),r['name']))
+        state.save()
+        state = SyncState(self.path)
+        changed = [r['id'] for r in [record(i) for i in range(1,4)] + [record(4,name=u'Other,First4')]
+            if state.update(r['id'],fingerprint(r),r['name'])]
+        self.assertEqual(changed,[u'N00000004'])
+        self.assertEqual(state.diff().dropped,[u'N00000000'])
+        self.assertEqual(state.stale(),[u'Last0,First0',u'Last4,First4'])
+
+
+if __name__ == "__main__":
+    unittest.main()
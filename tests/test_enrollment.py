@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import copy
+import datetime
+import pickle
+import unittest
+
+from plg.model.enrollment import (AcademicSession, AcademicTerm, Course,
+    CourseOffering, CourseSection, Enrollment, Roster, Student, by_name, class_list)
+
+
+class TestRosterIndex(unittest.TestCase):
+    """Unit tests for Roster indexes"""
+
+    def setUp(self):
+        self.roster = Roster()
+        self.jqa = Student('Adams','John','Quincy',email_address='jqa6@harvard.edu')
+        self.ja = Student('Adams','John',email_address='ja2@harvard.edu')
+        self.sa = Student('Adams','Samuel',email_address='sa@harvard.edu')
+        for student in (self.jqa,self.ja,self.sa):
+            self.roster.add_student(student)
+
+    def test_non_unique(self):
+        """Students sharing a value are all returned, in roster order"""
+        self.assertEqual(self.roster.lookup_students('last_name','Adams'),
+            [self.jqa,self.ja,self.sa])
+        self.assertRaises(ValueError,self.roster.lookup_student,'last_name','Adams')
+
+    def test_composite(self):
+        """Composite indexes are keyed by tuples"""
+        self.roster.add_index(('last_name','first_name'))
+        self.assertEqual(self.roster.lookup_students(('last_name','first_name'),('Adams','John')),
+            [self.jqa,self.ja])
+        self.assertIs(self.roster.lookup_student(['last_name','first_name'],('Adams','Samuel')),
+            self.sa)
+
+    def test_index_kept_current(self):
+        """Students added after an index is built are indexed"""
+        self.roster.add_index('first_name')
+        jfk = Student('Kennedy','John')
+        self.roster.add_student(jfk)
+        self.assertEqual(self.roster.lookup_students('first_name','John'),
+            [self.jqa,self.ja,jfk])
+
+    def test_missing(self):
+        """Missing values"""
+        self.assertEqual(self.roster.lookup_students('last_name','Lincoln'),[])
+        self.assertRaises(KeyError,self.roster.lookup_student,'last_name','Lincoln')
+
+
+class TestRosterChurn(unittest.TestCase):
+    """Unit tests for removing and editing students on an indexed Roster"""
+
+    def setUp(self):
+        self.roster = Roster()
+        self.jfk = Student('Kennedy','John',email_address='jfk35@harvard.edu')
+        self.rfk = Student('Kennedy','Robert',email_address='rfk@harvard.edu')
+        self.roster.add_student(self.jfk)
+        self.roster.add_student(self.rfk)
+        self.roster.add_index('last_name')
+        self.roster.add_index('email_address')
+        self.roster.add_index(('last_name','first_name'))
+
+    def test_remove(self):
+        """Removed students disappear from the list and every index"""
+        self.roster.remove_student(self.jfk)
+        self.assertEqual(self.roster.students,[self.rfk])
+        self.assertEqual(self.roster.lookup_students('last_name','Kennedy'),[self.rfk])
+        self.assertEqual(self.roster.lookup_students('email_address','jfk35@harvard.edu'),[])
+        self.assertEqual(self.roster.lookup_students(('last_name','first_name'),('Kennedy','John')),[])
+        self.assertRaises(ValueError,self.roster.remove_student,self.jfk)
+
+    def test_update(self):
+        """Updated students are found under their new values only"""
+        self.roster.update_student(self.rfk,first_name='Bobby',email_address='rfk@justice.gov')
+        self.assertEqual(self.rfk.first_name,'Bobby')
+        self.assertIs(self.roster.lookup_student('email_address','rfk@justice.gov'),self.rfk)
+        self.assertIs(self.roster.lookup_student(('last_name','first_name'),('Kennedy','Bobby')),self.rfk)
+        self.assertEqual(self.roster.lookup_students('email_address','rfk@harvard.edu'),[])
+        self.assertEqual(self.roster.lookup_students('last_name','Kennedy'),[self.jfk,self.rfk])
+
+    def test_failed_update(self):
+        """An update that fails changes nothing"""
+        self.roster.sorted_students()
+        self.assertRaises(AttributeError,self.roster.update_student,self.rfk,
+            email_address='rfk@justice.gov',bogus=1)
+        self.assertRaises(AttributeError,self.roster.update_student,self.rfk,
+            email_address='rfk@justice.gov',formatted_full_name='Bobby')
+        self.assertEqual(self.rfk.email_address,'rfk@harvard.edu')
+        self.assertIs(self.roster.lookup_student('email_address','rfk@harvard.edu'),self.rfk)
+        self.assertEqual(self.roster.sorted_students(),[self.jfk,self.rfk])
+        self.roster.remove_student(self.rfk)
+        self.assertEqual(self.roster.sorted_students(),[self.jfk])
+
+    def test_derived_index(self):
+        """Indexes on properties follow changes to the names they are made from"""
+        self.roster.add_index('formatted_full_name')
+        self.roster.update_student(self.jfk,first_name='Jack')
+        self.assertIs(self.roster.lookup_student('formatted_full_name','Kennedy, Jack'),self.jfk)
+        self.assertEqual(self.roster.lookup_students('formatted_full_name','Kennedy, John'),[])
+        self.roster.remove_student(self.jfk)
+        self.assertEqual(self.roster.students,[self.rfk])
+        self.assertEqual(self.roster.lookup_students('formatted_full_name','Kennedy, Jack'),[])
+
+    def test_stale_remove(self):
+        """A student edited behind the roster's back is not half removed"""
+        self.roster.sorted_students()
+        self.rfk.email_address = 'rfk@justice.gov'
+        self.assertRaises(KeyError,self.roster.remove_student,self.rfk)
+        self.assertEqual(self.roster.students,[self.jfk,self.rfk])
+        self.assertEqual(self.roster.lookup_students('last_name','Kennedy'),[self.jfk,self.rfk])
+        self.assertEqual(self.roster.sorted_students(),[self.jfk,self.rfk])
+
+    def test_not_on_roster(self):
+        """Students not on the roster cannot be removed or updated, nor added twice"""
+        stranger = Student('Kennedy','Ted',email_address='tk@harvard.edu')
+        self.assertRaises(ValueError,self.roster.remove_student,stranger)
+        self.assertRaises(ValueError,self.roster.update_student,stranger,first_name='Edward')
+        self.assertRaises(ValueError,self.roster.add_student,self.jfk)
+        self.assertEqual(self.roster.students,[self.jfk,self.rfk])
+        self.assertEqual(self.roster.lookup_students('last_name','Kennedy'),[self.jfk,self.rfk])
+
+    def test_churn_order(self):
+        """Roster order survives many removals"""
+        roster = Roster(students=[Student('Last%d' % i,'First',email_address='s%d@nyu.edu' % i)
+            for i in range(1000)])
+        roster.add_index('first_name')
+        for student in roster.students[::2]:
+            roster.remove_student(student)
+        self.assertEqual([s.last_name for s in roster.students],['Last%d' % i for i in range(1,1000,2)])
+        self.assertEqual(roster.lookup_students('first_name','First'),roster.students)
+
+
+class TestRosterOrder(unittest.TestCase):
+    """Unit tests for cached names and sorted views"""
+
+    def setUp(self):
+        self.roster = Roster()
+        for i in range(200):
+            self.roster.add_student(Student('Last%02d' % (i * 37 % 50),'First%03d' % i,
+                email_address='s%d@nyu.edu' % i))
+
+    def assertSorted(self):
+        expected = sorted(self.roster.students,key=lambda s: (s.last_name,s.first_name,s.other_names or ''))
+        self.assertEqual(self.roster.sorted_students(),expected)
+
+    def test_cached_names(self):
+        """Formatted names are built once, and again after a name changes"""
+        student = self.roster.students[0]
+        self.assertIs(student.formatted_full_name,student.formatted_full_name)
+        key = student.sort_key
+        student.other_names = 'Quincy'
+        self.assertEqual(student.formatted_full_name,'Last00, First000 Quincy')
+        self.assertEqual(student.formatted_contact_name,'First000 Quincy Last00')
+        self.assertNotEqual(student.sort_key,key)
+
+    def test_missing_first_name(self):
+        """A missing first name is formatted as before, without the other forms"""
+        self.assertEqual(Student('A',None).formatted_full_name,'A, None')
+
+    def test_missing_name_sorted(self):
+        """A student with a missing name sorts as if it were empty"""
+        self.roster.sorted_students()
+        student = Student('Aaron',None)
+        self.roster.add_student(student)
+        self.assertIs(self.roster.sorted_students()[0],student)
+        self.roster.remove_student(student)
+        self.assertEqual(len(self.roster.students),200)
+        self.assertSorted()
+
+    def test_failed_add(self):
+        """A student whose view key fails is not added at all"""
+        self.roster.sorted_students()
+        by_email = lambda s: s.email_address[:2]
+        self.roster.add_sorted_view(by_email)
+        self.assertRaises(TypeError,self.roster.add_student,Student('Aaron','Hank'))
+        self.assertEqual(len(self.roster.students),200)
+        self.assertEqual(len(self.roster.sorted_students()),200)
+        self.assertEqual(len(self.roster.sorted_students(by_email)),200)
+
+    def test_non_ascii(self):
+        """Names outside ASCII have sort keys too"""
+        students = [Student(u'\xc9mile',u'Zo\xeb'),Student(u'Adams',u'John')]
+        self.assertEqual(sorted(students,key=by_name)[0].last_name,u'Adams')
+
+    def test_view_follows_changes(self):
+        """The sorted view stays sorted as students come, go and change"""
+        self.assertSorted()
+        self.roster.add_student(Student('Aaron','Hank'))
+        self.roster.add_student(Student('Last25','First'))
+        for student in self.roster.students[::7]:
+            self.roster.remove_student(student)
+        self.roster.update_student(self.roster.students[3],last_name='Zz')
+        self.assertSorted()
+        self.assertEqual(self.roster.sorted_students()[-1].last_name,'Zz')
+
+    def test_other_keys(self):
+        """Views can be kept on any key, with ties in roster order"""
+        by_email = lambda s: s.email_address[:2]
+        self.assertEqual(self.roster.sorted_students(by_email),
+            sorted(self.roster.students,key=by_email))
+        self.assertNotIn(by_email,self.roster._views)
+        self.roster.add_sorted_view(by_email)
+        self.roster.add_student(Student('Aaron','Hank',email_address='aa@nyu.edu'))
+        self.assertEqual(self.roster.sorted_students(by_email),
+            sorted(self.roster.students,key=by_email))
+
+    def test_class_list(self):
+        """Class lists are aligned columns, in name order"""
+        lines = self.roster.class_list()
+        self.assertEqual(len(lines),200)
+        self.assertEqual(lines[0],'Last00, First000  s0@nyu.edu')
+        self.assertEqual(len(set(line.index('@') - len(line.split()[-1].split('@')[0]) for line in lines)),1)
+        self.assertEqual(class_list([],('last_name',)),[])
+
+
+class TestFlyweights(unittest.TestCase):
+    """Unit tests for the interned course and calendar objects"""
+
+    def make_offering(self):
+        return CourseOffering(
+            Course('Calculus I','Differential Calculus'),
+            AcademicSession(AcademicTerm('Spring',2015),
+                datetime.date(2015,1,26),datetime.date(2015,5,15),
+                'Regular Academic Session'))
+
+    def test_interned(self):
+        """Equal objects are identical"""
+        offering = self.make_offering()
+        self.assertIs(self.make_offering(),offering)
+        self.assertIs(offering.session.term,AcademicTerm('Spring',2015))
+        self.assertIsNot(AcademicTerm('Fall',2015),AcademicTerm('Spring',2015))
+
+    def test_hash_eq(self):
+        """Flyweights work as dictionary keys"""
+        groups = {}
+        for (name,year) in [('Fall',2014),('Spring',2015),('Fall',2014)]:
+            groups.setdefault(AcademicTerm(name,year),[]).append(year)
+        self.assertEqual(groups[AcademicTerm('Fall',2014)],[2014,2014])
+        self.assertEqual(AcademicTerm('Fall',2014),AcademicTerm('Fall',2014))
+        self.assertNotEqual(AcademicTerm('Fall',2014),AcademicTerm('Fall',2015))
+        self.assertNotEqual(Course('Fall',2014),AcademicTerm('Fall',2014))
+
+    def test_pickle_and_copy(self):
+        """Unpickled and copied objects rejoin the registry"""
+        offering = self.make_offering()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertIs(pickle.loads(pickle.dumps(offering,protocol)),offering)
+        self.assertIs(copy.deepcopy(offering),offering)
+
+    def test_immutable(self):
+        """Attributes cannot be changed"""
+        course = Course('Calculus I','Differential Calculus')
+        self.assertRaises(AttributeError,setattr,course,'name','Calculus II')
+        self.assertRaises(AttributeError,delattr,course,'name')
+
+
+class TestEnrollment(unittest.TestCase):
+    """Unit tests for the term-wide Enrollment"""
+
+    def setUp(self):
+        session = AcademicSession(AcademicTerm('Fall',2014),None,None,'Regular Academic Session')
+        # 300 sections of 40, student i in sections i % 300, (i + 7) % 300, ...
+        self.sections = [CourseSection(CourseOffering(Course('MATH-UA %d' % n,None),session),'001')
+            for n in range(300)]
+        self.enrollment = Enrollment()
+        for i in range(3000):
+            for k in range(4):
+                self.enrollment.enroll(self.sections[(i + 7 * k) % 300],
+                    Student('Last%d' % i,'First',student_id='N%08d' % i))
+
+    def test_deduplicated(self):
+        """Each identity is one Student, however many times it is enrolled"""
+        self.assertEqual(len(self.enrollment),3000)
+        student = self.enrollment.student('N00000005')
+        self.assertTrue(all(s is student for section in self.enrollment.sections_of(student)
+            for s in self.enrollment.students_of(section) if s.student_id == 'N00000005'))
+        no_id = Student('Adams','John',email_address='ja2@harvard.edu')
+        self.assertIs(self.enrollment.enroll(self.sections[0],Student('Adams','J.',email_address='ja2@harvard.edu')),
+            self.enrollment.enroll(self.sections[1],no_id))
+
+    def test_both_ways(self):
+        """Sections list their students and students their sections"""
+        self.assertEqual(len(self.enrollment.students_of(self.sections[3])),40)
+        student = self.enrollment.student('N00000003')
+        self.assertEqual(self.enrollment.sections_of(student),
+            [self.sections[3],self.sections[10],self.sections[17],self.sections[24]])
+
+    def test_set_operations(self):
+        """Intersections, unions and differences of sections"""
+        (a,b) = (self.sections[3],self.sections[10])
+        both = self.enrollment.students_in_all(a,b)
+        self.assertEqual(len(both),30)
+        self.assertEqual([s.student_id for s in both],sorted(s.student_id for s in both))
+        self.assertEqual(len(self.enrollment.students_in_any(a,b)),50)
+        self.assertEqual(len(self.enrollment.students_only_in(a,b)),10)
+        self.assertEqual(self.enrollment.students_in_all(*self.sections),[])
+        self.assertEqual(len(self.enrollment.students_in_any(*self.sections)),3000)
+        (s,t) = (self.enrollment.student('N00000003'),self.enrollment.student('N00000010'))
+        self.assertEqual(self.enrollment.shared_sections(s,t),[self.sections[10],self.sections[17],self.sections[24]])
+
+    def test_drop(self):
+        """A dropped student leaves the section, but not the term"""
+        student = self.enrollment.student('N00000003')
+        self.enrollment.drop(self.sections[3],student)
+        self.assertNotIn(student,self.enrollment.students_of(self.sections[3]))
+        self.assertNotIn(self.sections[3],self.enrollment.sections_of(student))
+        self.assertRaises(KeyError,self.enrollment.drop,self.sections[3],student)
+        self.assertEqual(len(self.enrollment),3000)
+
+    def test_rosters(self):
+        """Rosters go in and come out"""
+        enrollment = Enrollment([self.enrollment.roster(section) for section in self.sections[:2]])
+        self.assertEqual(len(enrollment),80)
+        self.assertEqual(enrollment.roster(self.sections[1]).students,self.enrollment.students_of(self.sections[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
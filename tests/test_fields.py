@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import io
+import json
+import unittest
+
+from xml.etree import ElementTree
+
+from plg.fields import ComboBoxExporter, FDFExporter, FieldExporters, JSONExporter, XFDFExporter
+
+
+class TestFieldExporters(unittest.TestCase):
+    """Unit tests for the field exporters"""
+
+    def export(self,choices):
+        outputs = dict((name,io.StringIO()) for name in ('combo','fdf','xfdf','json'))
+        with FieldExporters([ComboBoxExporter(outputs['combo']),FDFExporter(outputs['fdf'],u'who'),
+                XFDFExporter(outputs['xfdf'],u'who'),JSONExporter(outputs['json'])]) as exporters:
+            for (value,label) in choices:
+                exporters.write(value,label,email=value + u'@nyu.edu')
+        return dict((name,output.getvalue()) for (name,output) in outputs.items())
+
+    def test_one_pass(self):
+        """Every format comes out of the same pass"""
+        choices = [(u'st%d' % i,u'Student %d' % i) for i in range(100)]
+        outputs = self.export(choices)
+        self.assertEqual(outputs['combo'],u''.join(u'[(%s)(%s)]' % choice for choice in choices) + u'\n')
+        self.assertEqual([(item['value'],item['label']) for item in json.loads(outputs['json'])],choices)
+        self.assertTrue(outputs['fdf'].startswith(u'%FDF-1.2\n'))
+        self.assertTrue(u'/T (who) /Opt [' in outputs['fdf'])
+        self.assertEqual(outputs['fdf'].count(u'\n[('),100)
+        self.assertTrue(outputs['fdf'].endswith(u'%%EOF\n'))
+        self.assertEqual(self.xfdf_values(outputs['xfdf']),
+            [(u'who.%d' % i,label) for (i,(value,label)) in enumerate(choices)])
+
+    def xfdf_values(self,text):
+        """The (full field name,value) pairs of an XFDF document"""
+        ns = u'{http://ns.adobe.com/xfdf/}'
+        root = ElementTree.fromstring(text.encode('utf-8'))
+        return [(u'%s.%s' % (parent.get('name'),field.get('name')),field.find(ns + u'value').text)
+            for parent in root.find(ns + u'fields') for field in parent]
+
+    def test_xfdf_escaped(self):
+        """XFDF labels are escaped, whatever characters they have"""
+        outputs = self.export([(u'st1',u'Jos\xe9 <Pepe> & Co')])
+        self.assertEqual(self.xfdf_values(outputs['xfdf']),[(u'who.0',u'Jos\xe9 <Pepe> & Co')])
+
+    def test_empty(self):
+        """No choices still makes valid output"""
+        outputs = self.export([])
+        self.assertEqual(json.loads(outputs['json']),[])
+        self.assertEqual(outputs['combo'],u'\n')
+        self.assertEqual(self.xfdf_values(outputs['xfdf']),[])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from plg.albert.cache import ParseCache
+from plg.albert.ingest import ingest, iter_pages
+from tests.test_albert import roster_page
+
+
+class TestIngest(unittest.TestCase):
+    """Unit tests for parallel roster ingestion"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filenames = []
+        for (i,(code,count)) in enumerate([('MATH-UA 121-001',5),('MATH-UA 123-001',8),
+                ('MATH-UA 121-001',7),('MATH-UA 122-001',3)]):
+            filename = os.path.join(self.directory,'page%d.html' % i)
+            with io.open(filename,'w') as fh:
+                fh.write(roster_page(count).replace(u'MATH-UA 123-001',code))
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ingest(self):
+        """Pages merge by section and students by EMPLID"""
+        rosters = ingest(self.filenames,processes=2)
+        self.assertEqual([roster.section.name for roster in rosters],
+            ['MATH-UA 121-001','MATH-UA 123-001','MATH-UA 122-001'])
+        self.assertEqual([len(roster.students) for roster in rosters],[7,8,3])
+        self.assertEqual([student.student_id for student in rosters[0].students],
+            ['N%08d' % i for i in range(7)])
+        self.assertIs(rosters[0].lookup_student('student_id','N00000002'),
+            rosters[2].lookup_student('student_id','N00000002'))
+        self.assertIs(rosters[0].section.offering.session,rosters[1].section.offering.session)
+
+    def test_deterministic(self):
+        """The pool size does not change the result"""
+        def summary(rosters):
+            return [(roster.section.name,[s.student_id for s in roster.students]) for roster in rosters]
+        self.assertEqual(summary(ingest(self.filenames,processes=1)),
+            summary(ingest(self.filenames,processes=3)))
+
+    def test_iter_pages(self):
+        """Pages come back in input order"""
+        pages = [(filename,course['code'],len(list(records)))
+            for (filename,course,records) in iter_pages(self.filenames,processes=2)]
+        self.assertEqual(pages,[(self.filenames[0],'MATH-UA 121-001',5),
+            (self.filenames[1],'MATH-UA 123-001',8),(self.filenames[2],'MATH-UA 121-001',7),
+            (self.filenames[3],'MATH-UA 122-001',3)])
+        ((filename,course,records),) = iter_pages(self.filenames[:1])
+        self.assertEqual(course['code'],'MATH-UA 121-001')
+        self.assertEqual(len(list(records)),5)
+
+    def test_photos(self):
+        """Photos are found next to their page, not the working directory"""
+        pages = []
+        for section in ('sec1','sec2'):
+            os.mkdir(os.path.join(self.directory,section))
+            pages.append(os.path.join(self.directory,section,'roster.html'))
+            with io.open(pages[-1],'w') as fh:
+                fh.write(roster_page(2))
+        cache = ParseCache(os.path.join(self.directory,'cache'))
+        for processes in (1,2):
+            photos = [record['photo'] for (filename,course,records) in iter_pages(pages,processes=processes)
+                for record in records]
+            self.assertEqual(photos,[os.path.join(self.directory,section,'p%d.jpg' % i)
+                for section in ('sec1','sec2') for i in range(2)])
+        # streamed, then from the cache entry both copies of the page share
+        for page in pages + pages:
+            ((filename,course,records),) = iter_pages([page],cache=cache)
+            self.assertEqual([record['photo'] for record in records],
+                [os.path.join(os.path.dirname(page),'p%d.jpg' % i) for i in range(2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from plg.enimport.manifest import UploadManifest
+
+
+class TestUploadManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory,'enimport.manifest')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_survives_reopening(self):
+        manifest = UploadManifest(self.path)
+        manifest.record('abc','nb1','note1','quiz.pdf','Quiz 1')
+        manifest.close()
+        manifest = UploadManifest(self.path)
+        self.assertEqual(manifest.lookup('abc','nb1'),'note1')
+        self.assertIsNone(manifest.lookup('abc','nb2'))
+        manifest.close()
+
+    def test_rerecording_replaces(self):
+        manifest = UploadManifest(self.path)
+        manifest.record('abc','nb1','note1')
+        manifest.record('abc','nb1','note2')
+        self.assertEqual(manifest.lookup('abc','nb1'),'note2')
+        self.assertEqual(len(manifest),1)
+        manifest.close()
+
+    def test_shared_file(self):
+        """A file shared by students is uploaded for each, and a resumed run knows which"""
+        manifest = UploadManifest(self.path)
+        # the run failed after the cover sheet went into jfk35's note
+        manifest.record('cover','nb1','note1','cover.pdf','Quiz 1 for John Kennedy',student='jfk35')
+        manifest.close()
+        manifest = UploadManifest(self.path)
+        self.assertEqual(manifest.lookup('cover','nb1','jfk35'),'note1')
+        self.assertIsNone(manifest.lookup('cover','nb1','jqa6'))
+        manifest.record('cover','nb1','note2','cover.pdf','Quiz 1 for John Quincy Adams',student='jqa6')
+        self.assertEqual(manifest.lookup('cover','nb1','jqa6'),'note2')
+        self.assertEqual(len(manifest),2)
+        manifest.close()
+
+    def test_readonly(self):
+        """A read-only manifest is looked in, but neither written nor given a table"""
+        open(self.path,'wb').close()
+        manifest = UploadManifest(self.path,readonly=True)
+        self.assertIsNone(manifest.lookup('cover','nb1','jfk35'))
+        self.assertRaises(sqlite3.OperationalError,manifest.record,'cover','nb1','note1')
+        manifest.close()
+        self.assertEqual(os.path.getsize(self.path),0)
+        manifest = UploadManifest(self.path)
+        manifest.record('cover','nb1','note1',student='jfk35')
+        manifest.close()
+        manifest = UploadManifest(self.path,readonly=True)
+        self.assertEqual(manifest.lookup('cover','nb1','jfk35'),'note1')
+        manifest.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import unittest
+
+from plg.model.enrollment import Student
+from plg.utils.decorators import memoize
+
+
+class Clock(object):
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoize(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def counted(self,**options):
+        @memoize(**options)
+        def f(*args,**kwargs):
+            self.calls.append((args,kwargs))
+            return len(self.calls)
+        return f
+
+    def test_lru_eviction(self):
+        f = self.counted(maxsize=2)
+        f(1)
+        f(2)
+        f(1)
+        f(3)
+        # 2 was the least recently used
+        self.assertEqual(f(1),1)
+        self.assertEqual(f(2),4)
+        info = f.cache_info()
+        self.assertEqual((info.hits,info.misses,info.evictions,info.currsize),(2,4,2,2))
+
+    def test_ttl(self):
+        clock = Clock()
+        f = self.counted(ttl=10,clock=clock)
+        self.assertEqual(f(1),1)
+        clock.now = 9
+        self.assertEqual(f(1),1)
+        clock.now = 10
+        self.assertEqual(f(1),2)
+
+    def test_keyword_arguments(self):
+        f = self.counted()
+        self.assertEqual(f(1,b=2,c=3),f(1,c=3,b=2))
+        self.assertNotEqual(f(1,2),f(1,b=2))
+
+    def test_invalidation(self):
+        f = self.counted()
+        f(1)
+        f(2)
+        self.assertTrue(f.cache_invalidate(1))
+        self.assertFalse(f.cache_invalidate(1))
+        self.assertEqual(f(2),2)
+        f.cache_clear()
+        self.assertEqual(f(2),3)
+        self.assertEqual(f.cache_info().hits,0)
+
+    def test_key_function(self):
+        f = self.counted(key=lambda student: student.student_id)
+        f(Student('Kennedy','John',student_id='N123'))
+        f(Student('Kennedy','John F.',student_id='N123'))
+        self.assertEqual(len(self.calls),1)
+
+    def test_threads(self):
+        f = self.counted(maxsize=10)
+        def worker():
+            for i in range(1000):
+                f(i % 20)
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = f.cache_info()
+        self.assertEqual(info.hits + info.misses,4000)
+        self.assertEqual(info.currsize,10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+
+from plg.albert.photos import PhotoLoader
+
+
+class TestPhotoLoader(unittest.TestCase):
+    """Unit tests for PhotoLoader"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for (i,data) in enumerate([b'placeholder',b'photo1',b'placeholder']):
+            path = os.path.join(self.directory,'photo%d.jpg' % i)
+            with open(path,'wb') as fh:
+                fh.write(data)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_dedupe(self):
+        """Identical images load as one Photo"""
+        with PhotoLoader(threads=2) as loader:
+            photos = [loader.load(path) for path in self.paths]
+        self.assertIs(photos[0],photos[2])
+        self.assertIsNot(photos[0],photos[1])
+        self.assertEqual(photos[1].data,b'photo1')
+
+    def test_prefetched(self):
+        """Records keep their order and get their photos"""
+        records = [{'name':str(i),'photo':path} for (i,path) in enumerate(self.paths)]
+        records.insert(1,{'name':'no photo'})
+        records.append({'name':'missing','photo':os.path.join(self.directory,'missing.jpg')})
+        with PhotoLoader(threads=2) as loader:
+            results = list(loader.prefetched(records,window=2))
+        self.assertEqual([record['name'] for (record,photo) in results],
+            ['0','no photo','1','2','missing'])
+        self.assertEqual([photo and photo.data for (record,photo) in results],
+            [b'placeholder',None,b'photo1',b'placeholder',None])
+
+    def test_memory(self):
+        """Only images met more than once are kept once loaded"""
+        with PhotoLoader(threads=2) as loader:
+            for path in self.paths:
+                loader.load(path)
+            gc.collect()
+            self.assertEqual([photo.data for photo in loader._photos.values()],[b'placeholder'])
+            self.assertFalse([entry for entry in loader._reads.values() if hasattr(entry,'get')])
+            # a path let go is read again
+            self.assertEqual(loader.load(self.paths[1]).data,b'photo1')
+            self.assertIs(loader.load(self.paths[2]),loader.load(self.paths[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
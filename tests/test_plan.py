@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import evernote.edam.type.ttypes
+    HAVE_SDK = True
+except ImportError:
+    HAVE_SDK = False
+
+from plg.enimport.fake import FakeNoteStore
+from plg.enimport.scan import scan_file
+from plg.enimport.plan import GuidCache, NotePlan, resolve_notebook, resolve_tags
+
+
+class CountingNoteStore(FakeNoteStore):
+    """Counts the lookups made of it"""
+
+    def __init__(self,**kwargs):
+        FakeNoteStore.__init__(self,**kwargs)
+        self.lookups = 0
+
+    def listNotebooks(self):
+        self.lookups += 1
+        return FakeNoteStore.listNotebooks(self)
+
+    def getDefaultNotebook(self):
+        self.lookups += 1
+        return FakeNoteStore.getDefaultNotebook(self)
+
+    def listTags(self):
+        self.lookups += 1
+        return FakeNoteStore.listTags(self)
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory,'guids.json')
+        self.store = CountingNoteStore(notebooks=['Default','Calculus'],
+            tags=['student work','Course: Calculus I'])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_notebook_cached_across_runs(self):
+        cache = GuidCache(self.path,'token')
+        guid = resolve_notebook(self.store,'Calculus',cache)
+        self.assertEqual(guid,self.store.notebooks[1].guid)
+        cache.save()
+        cache = GuidCache(self.path,'token')
+        self.assertEqual(resolve_notebook(self.store,'Calculus',cache),guid)
+        self.assertEqual(self.store.lookups,1)
+
+    def test_accounts_kept_apart(self):
+        cache = GuidCache(self.path,'token')
+        resolve_notebook(self.store,None,cache)
+        cache.save()
+        cache = GuidCache(self.path,'other token')
+        self.assertIsNone(cache.get('notebooks',''))
+
+    def test_missing_notebook(self):
+        cache = GuidCache(None,'token')
+        self.assertRaises(KeyError,resolve_notebook,self.store,'Algebra',cache)
+
+    def test_resolve_tags(self):
+        cache = GuidCache(None,'token')
+        names = ['student work','course: Calculus I','term: Fall 2014']
+        (guids,unknown) = resolve_tags(self.store,names,cache)
+        self.assertEqual(guids,[tag.guid for tag in self.store.tags])
+        self.assertEqual(unknown,['term: Fall 2014'])
+        resolve_tags(self.store,names[:2],cache)
+        self.assertEqual(self.store.lookups,1)
+
+    def test_note_plan(self):
+        plan = NotePlan('nb-guid','Quiz 1','Calculus I',tags=['quiz'])
+        plan.resolve_tags(self.store,GuidCache(None,'token'))
+        self.assertEqual(plan.title('John Kennedy'),'Quiz 1 for John Kennedy from Calculus I')
+        self.assertEqual(plan.tag_names,['quiz'])
+        self.assertEqual(len(plan.tag_guids),2)
+        self.assertEqual(plan.created,plan.updated)
+
+    @unittest.skipUnless(HAVE_SDK,'the Evernote SDK is not installed')
+    def test_find_note(self):
+        """Notes are found by their own token"""
+        filename = os.path.join(self.directory,'quiz.pdf')
+        with open(filename,'wb') as fh:
+            fh.write(b'%PDF-1.4\n')
+        plan = NotePlan(self.store.notebooks[0].guid,'Quiz 1','Calculus I')
+        batch = [((filename,'jfk35','Kennedy__John'),scan_file(filename))]
+        (first,second) = (plan.build_note(batch),plan.build_note(batch))
+        self.assertNotEqual(first.attributes.sourceApplication,second.attributes.sourceApplication)
+        self.store.createNote(first)
+        self.assertIs(plan.find_note(self.store,first),first)
+        self.assertIsNone(plan.find_note(self.store,second))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from plg.enimport.scan import oversized, scan_file
+
+
+class TestScan(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self,name,data):
+        filename = os.path.join(self.directory,name)
+        with open(filename,'wb') as fh:
+            fh.write(data)
+        return filename
+
+    def test_scan_file(self):
+        data = b'%PDF-1.4\n' * 100000
+        scanned = scan_file(self.write('quiz.pdf',data))
+        self.assertEqual(scanned.size,len(data))
+        self.assertEqual(scanned.digest,hashlib.md5(data).digest())
+        self.assertEqual(scanned.hexdigest,hashlib.md5(data).hexdigest())
+        self.assertEqual(scanned.read(),data)
+
+    def test_empty_file(self):
+        scanned = scan_file(self.write('empty.pdf',b''))
+        self.assertEqual(scanned.size,0)
+        self.assertEqual(scanned.hexdigest,hashlib.md5(b'').hexdigest())
+
+    def test_oversized(self):
+        small = self.write('small.pdf',b'x' * 10)
+        big = self.write('big.pdf',b'x' * 11)
+        self.assertEqual(oversized([small,big],max_size=10),[(big,11)])
+
+
+if __name__ == '__main__':
+    unittest.main()
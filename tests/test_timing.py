@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from plg.utils.timing import Registry, Stage
+
+
+class TestStage(unittest.TestCase):
+
+    def test_percentiles(self):
+        stage = Stage('parse')
+        for i in range(100,0,-1):
+            stage.add(i / 1000.0)
+        self.assertEqual(stage.count,100)
+        self.assertAlmostEqual(stage.total,5.05)
+        self.assertEqual(stage.percentile(50),0.05)
+        self.assertEqual(stage.percentile(90),0.09)
+        self.assertEqual(stage.percentile(100),0.1)
+        self.assertEqual(stage.percentile(0),0.001)
+
+    def test_empty(self):
+        stage = Stage('parse')
+        self.assertIsNone(stage.percentile(50))
+        self.assertIsNone(stage.mean)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_disabled_records_nothing(self):
+        registry = Registry()
+        with registry.span('parse'):
+            pass
+        self.assertEqual(list(registry.timed_iter('read',[1,2])),[1,2])
+        self.assertEqual(registry.stages(),[])
+
+    def test_timed(self):
+        registry = Registry(enabled=True)
+        @registry.timed()
+        def scan(name):
+            "Scan a file"
+            return name
+        self.assertEqual(scan('quiz.pdf'),'quiz.pdf')
+        self.assertEqual(scan.__doc__,'Scan a file')
+        self.assertEqual([(stage.name,stage.count) for stage in registry.stages()],[('scan',1)])
+
+    def test_timed_iter_is_one_run(self):
+        registry = Registry(enabled=True)
+        self.assertEqual(list(registry.timed_iter('read',range(5))),list(range(5)))
+        self.assertEqual(registry.stages()[0].count,1)
+
+    def test_threads(self):
+        registry = Registry(enabled=True)
+        def worker():
+            for i in range(500):
+                with registry.span('upload'):
+                    pass
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.stages()[0].count,2000)
+
+    def test_write_json(self):
+        registry = Registry(enabled=True)
+        registry.record('upload',0.5)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory,'profile.json')
+            registry.write(path)
+            with open(path) as fh:
+                data = json.load(fh)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(data['stages']['upload']['count'],1)
+        self.assertEqual(data['stages']['upload']['p99'],0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
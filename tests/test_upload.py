@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import threading
+import unittest
+
+from plg.enimport.fake import FakeNoteStore
+from plg.enimport.upload import Uploader
+
+
+class Note(object):
+    """A stand-in for an Evernote note"""
+
+    def __init__(self,title):
+        self.title = title
+
+
+class FlakyNoteStore(FakeNoteStore):
+    """Fails the first attempt at each note in *flaky* with *error*"""
+
+    def __init__(self,flaky,error,**kwargs):
+        FakeNoteStore.__init__(self,**kwargs)
+        self.flaky = set(flaky)
+        self.error = error
+        self.failed = set()
+        self._flaky_lock = threading.Lock()
+
+    def createNote(self,note):
+        with self._flaky_lock:
+            if note.title in self.flaky and note.title not in self.failed:
+                self.failed.add(note.title)
+                raise self.error
+        return FakeNoteStore.createNote(self,note)
+
+
+def find_by_title(note_store,note):
+    """A recover function for the FakeNoteStore"""
+    found = note_store.findNotesMetadata(None,0,100,None)
+    for created in found.notes:
+        if created.title == note.title:
+            return created
+    return None
+
+
+class EDAMUserException(Exception):
+    errorCode = 2
+
+
+class TestUploader(unittest.TestCase):
+    """Unit tests for Uploader"""
+
+    def titles(self,count):
+        return ['note %02d' % i for i in range(count)]
+
+    def test_rate_limit(self):
+        """Rate-limited uploads all succeed once each, in order"""
+        store = FakeNoteStore(rate_limit=5,window=0.05)
+        uploader = Uploader(lambda: store,build=Note,workers=4)
+        results = list(uploader.upload(self.titles(23)))
+        self.assertEqual([result.item for result in results],self.titles(23))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(sorted(note.title for note in store.notes),self.titles(23))
+        self.assertTrue(store.calls > 23)
+
+    def test_retry(self):
+        """Transient failures are retried once the note is known not to exist"""
+        store = FlakyNoteStore(['note 03','note 07'],IOError('connection reset'))
+        uploader = Uploader(lambda: store,build=Note,recover=find_by_title,workers=3,backoff=0.001)
+        results = list(uploader.upload(self.titles(10)))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([result.attempts for result in results][3],2)
+        self.assertEqual(len(store.notes),10)
+
+    def test_lost_answer(self):
+        """A note created before the connection dropped is not sent again"""
+        store = FakeNoteStore(drop_after_create=[2,5])
+        uploader = Uploader(lambda: store,build=Note,recover=find_by_title,workers=1,backoff=0.001)
+        results = list(uploader.upload(self.titles(6)))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([result.attempts for result in results],[1] * 6)
+        self.assertEqual(sorted(note.title for note in store.notes),self.titles(6))
+        self.assertIs(results[1].note,store.notes[1])
+
+    def test_no_recover(self):
+        """Without a way to look for the note, a lost answer is not retried"""
+        store = FakeNoteStore(drop_after_create=[2])
+        uploader = Uploader(lambda: store,build=Note,workers=1,backoff=0.001)
+        results = list(uploader.upload(self.titles(3)))
+        self.assertEqual([result.ok for result in results],[True,False,True])
+        self.assertEqual(results[1].attempts,1)
+        self.assertEqual(len(store.notes),3)
+
+    def test_rejected(self):
+        """Notes the service rejects are not retried"""
+        store = FlakyNoteStore(['note 01'],EDAMUserException('bad ENML'))
+        uploader = Uploader(lambda: store,build=Note,workers=2,backoff=0.001)
+        results = list(uploader.upload(self.titles(3)))
+        self.assertEqual([result.ok for result in results],[True,False,True])
+        self.assertEqual(results[1].attempts,1)
+        self.assertTrue(isinstance(results[1].error,EDAMUserException))
+
+    def test_note_store_per_worker(self):
+        """Each worker thread gets its own note store"""
+        stores = []
+        def factory():
+            store = FakeNoteStore(latency=0.01)
+            stores.append(store)
+            return store
+        list(Uploader(factory,build=Note,workers=3).upload(self.titles(12)))
+        self.assertTrue(1 < len(stores) <= 3)
+        self.assertEqual(sum(len(store.notes) for store in stores),12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from plg.vcard import VCardFileWriter, VCardStreamWriter
+
+
+class Card(object):
+    """A stand-in for a vobject vCard"""
+
+    def __init__(self,name):
+        self.name = name
+
+    def serialize(self):
+        return u'BEGIN:VCARD\r\nVERSION:3.0\r\nFN:%s\r\nEND:VCARD\r\n' % self.name
+
+
+class TestVCardWriters(unittest.TestCase):
+    """Unit tests for the vCard writers"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cards = [Card(u'Student %d' % i) for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stream(self):
+        """All cards go to one file, closed with the writer"""
+        filename = os.path.join(self.directory,'section.vcf')
+        with VCardStreamWriter(filename) as writer:
+            for card in self.cards:
+                writer.write(card)
+        self.assertTrue(writer._fh.closed)
+        with io.open(filename,newline='') as fh:
+            self.assertEqual(fh.read(),u''.join(card.serialize() for card in self.cards))
+
+    def test_files(self):
+        """Each card goes to its own file"""
+        with VCardFileWriter(self.directory) as writer:
+            for card in self.cards:
+                writer.write(card,card.name.replace(u' ',u'_'))
+        self.assertEqual(writer.count,50)
+        self.assertEqual(len(os.listdir(self.directory)),50)
+        with io.open(os.path.join(self.directory,'Student_7.vcf'),newline='') as fh:
+            self.assertEqual(fh.read(),self.cards[7].serialize())
+
+    def test_delete(self):
+        """A deleted card's file is removed; a missing one is no error"""
+        with VCardFileWriter(self.directory) as writer:
+            writer.write(self.cards[0],'Student_0')
+            writer.delete('Student_0')
+            writer.delete('Student_1')
+        self.assertEqual(os.listdir(self.directory),[])
+
+
+if __name__ == "__main__":
+    unittest.main()